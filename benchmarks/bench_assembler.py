@@ -0,0 +1,160 @@
+"""
+Times the assembler and each stage of its pipeline on a synthetic program, and saves the results as JSON.
+
+The stages are those assemble_stream runs: preprocess (tokenizing every line), build (parsing statements into the IR,
+src.ir), layout (addresses and labels) and encode_row (encoding the instruction rows). The line cache (src.cache) is
+cleared before each run, so that repeated runs do not encode from the cache.
+
+Run from the repository root with:
+    uv run -m benchmarks.bench_assembler [--lines N] [--mix R=4,I=2,...] [-o results.json] [--compare baseline.json]
+"""
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Annotated, Callable
+
+import typer
+
+from benchmarks.generate import DEFAULT_MIX, generate_program, parse_mix
+from src.assemble import assemble
+from src.cache import line_cache
+from src.ir import NONE, build, encode_row, layout, operation_types
+from src.preprocess import preprocess
+
+app = typer.Typer(add_completion=False)
+
+def _best_time(
+    function: Callable[[], object],
+    repeat: int
+) -> float:
+    """Best wall time of several runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        line_cache.clear()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _peak_memory(
+    function: Callable[[], object]
+) -> int:
+    """Peak memory allocated while running a function, in bytes."""
+    line_cache.clear()
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run_benchmarks(
+    program: list[str],
+    repeat: int = 3
+) -> dict[str, dict]:
+    """
+    Times assemble and each stage of its pipeline separately over a program.
+
+    :param program: program lines
+    :type program: list[str]
+    :param repeat: number of runs, the best one is kept
+    :type repeat: int
+    :return: seconds, lines per second and peak memory in bytes for each benchmark
+    :rtype: dict[str, dict]
+    """
+    content = '\n'.join(program)
+
+    # Inputs of each stage, computed outside of the timed code
+    statements = list(preprocess(program))
+    parsed = build(statements)
+    addresses = layout(parsed)[0]
+    metadata = {'labels': {parsed.names[label]: addresses[row] for row, label in enumerate(parsed.labels) if label != NONE}}
+    rows = [row for row, op_id in enumerate(parsed.ops) if operation_types[op_id] not in [None, 'DIRECTIVE']]
+
+    def encode_rows() -> None:
+        for row in rows:
+            metadata['address'] = addresses[row]
+            encode_row(parsed, row, metadata)
+
+    benchmarks = {
+        'assemble': (len(program), lambda: assemble(content)),
+        'preprocess': (len(program), lambda: list(preprocess(program))),
+        'build': (len(statements), lambda: build(statements)),
+        'layout': (len(parsed), lambda: layout(parsed)),
+        'encode_row': (len(rows), encode_rows),
+    }
+
+    results = {}
+    for name, (count, function) in benchmarks.items():
+        seconds = _best_time(function, repeat)
+        results[name] = {
+            'lines': count,
+            'seconds': seconds,
+            'lines_per_second': count / seconds if seconds else 0.0,
+            'peak_bytes': _peak_memory(function),
+        }
+    return results
+
+def compare(
+    results: dict[str, dict],
+    baseline: dict[str, dict],
+    tolerance: float
+) -> list[str]:
+    """Names of the benchmarks whose throughput dropped by more than tolerance against the baseline."""
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result['lines_per_second'] < baseline[name]['lines_per_second'] * (1 - tolerance):
+            regressions.append(name)
+    return regressions
+
+@app.command()
+def main(
+    lines: Annotated[int, typer.Option('--lines', help="Number of instruction lines to generate")]=100_000,
+    mix: Annotated[str, typer.Option('--mix', help="Instruction mix, e.g. 'R=4,I=2,B=1'")]=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+    label_density: Annotated[float, typer.Option('--label-density', help="Labels per instruction line")]=0.1,
+    seed: Annotated[int, typer.Option('--seed', help="Random seed of the generated program")]=0,
+    repeat: Annotated[int, typer.Option('--repeat', min=1, help="Runs per benchmark, the best is kept")]=3,
+    output: Annotated[str | None, typer.Option('-o', '--output', help="JSON file to save the results to")]=None,
+    baseline: Annotated[str | None, typer.Option('--compare', help="JSON results of a previous run to compare against")]=None,
+    tolerance: Annotated[float, typer.Option('--tolerance', help="Allowed throughput drop against the baseline")]=0.1,
+) -> None:
+    """
+    Generates a synthetic program and reports the throughput and peak memory of each assembler stage.
+    """
+    program = generate_program(lines, parse_mix(mix), label_density, seed)
+    results = run_benchmarks(program, repeat)
+
+    print(f"{'benchmark':<16} {'lines':>10} {'seconds':>10} {'lines/s':>14} {'peak MiB':>10}")
+    for name, result in results.items():
+        print(f"{name:<16} {result['lines']:>10} {result['seconds']:>10.4f} {result['lines_per_second']:>14,.0f} {result['peak_bytes'] / 2**20:>10.2f}")
+
+    if output:
+        report = {
+            'meta': {
+                'lines': lines,
+                'mix': parse_mix(mix),
+                'label_density': label_density,
+                'seed': seed,
+                'repeat': repeat,
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+            },
+            'results': results,
+        }
+        with open(output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {output}")
+
+    if baseline:
+        with open(baseline) as file:
+            regressions = compare(results, json.load(file)['results'], tolerance)
+        if regressions:
+            print(f"Regressions beyond {tolerance:.0%}: {', '.join(regressions)}")
+            raise typer.Exit(code=1)
+        print(f"No regressions beyond {tolerance:.0%}")
+
+if __name__ == "__main__":
+    app()
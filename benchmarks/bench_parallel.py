@@ -0,0 +1,35 @@
+"""
+Compares serial and parallel (--jobs) assembly of a large generated program.
+
+Run from the repository root with:
+    uv run -m benchmarks.bench_parallel [lines] [jobs]
+"""
+import os
+import sys
+import time
+
+from benchmarks.generate import generate_program
+from src.assemble import assemble_parallel, assemble_words
+
+def main() -> None:
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 400_000
+    jobs = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    program = generate_program(lines)
+
+    start = time.perf_counter()
+    serial = assemble_words('\n'.join(program))
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel = []
+    assemble_parallel(program, parallel.extend, jobs)
+    parallel_time = time.perf_counter() - start
+
+    assert parallel == serial, "Parallel output differs from serial output"
+    print(f"{len(program)} lines, {len(serial)} words")
+    print(f"serial:            {serial_time:.3f}s ({len(program) / serial_time:,.0f} lines/s)")
+    print(f"parallel ({jobs} jobs): {parallel_time:.3f}s ({len(program) / parallel_time:,.0f} lines/s)")
+    print(f"speedup:           {serial_time / parallel_time:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Synthetic ORV program generator for the benchmarks.
+"""
+import random
+
+from src.constants import opcode, pseudo
+
+# Relative weight of each instruction type, 'PSEUDO' covers the pseudo table
+DEFAULT_MIX = {
+    'R': 4,
+    'I': 4,
+    'SI': 1,
+    'LI': 2,
+    'JI': 1,
+    'S': 2,
+    'B': 3,
+    'U': 1,
+    'J': 1,
+    'PSEUDO': 2,
+}
+
+# Branch targets are picked among the labels this close to the current one, so that offsets stay short
+LABEL_WINDOW = 32
+
+def parse_mix(
+    text: str
+) -> dict[str, int]:
+    """Parses an instruction mix such as 'R=4,I=2,B=1'."""
+    mix = {}
+    for item in text.split(','):
+        opcode_type, _, weight = item.partition('=')
+        opcode_type = opcode_type.strip().upper()
+        if opcode_type not in DEFAULT_MIX:
+            raise ValueError(f"Unknown instruction type in mix: {opcode_type}")
+        mix[opcode_type] = int(weight)
+    return mix
+
+def _mnemonics_by_type() -> dict[str, list[str]]:
+    by_type = {'PSEUDO': sorted(pseudo)}
+    for op, info in opcode.items():
+        by_type.setdefault(info[1], []).append(op)
+    return by_type
+
+def generate_program(
+    lines: int,
+    mix: dict[str, int] | None = None,
+    label_density: float = 0.1,
+    seed: int = 0
+) -> list[str]:
+    """
+    Generates a random but valid ORV program.
+
+    :param lines: number of instruction lines, label lines come on top
+    :type lines: int
+    :param mix: relative weight of each instruction type, see DEFAULT_MIX
+    :type mix: dict[str, int] | None
+    :param label_density: number of labels per instruction line
+    :type label_density: float
+    :param seed: random seed, the same arguments always give the same program
+    :type seed: int
+    :return: program lines
+    :rtype: list[str]
+    """
+    rng = random.Random(seed)
+    mix = {opcode_type: weight for opcode_type, weight in (mix or DEFAULT_MIX).items() if weight > 0}
+    types = list(mix)
+    weights = [mix[opcode_type] for opcode_type in types]
+    by_type = _mnemonics_by_type()
+
+    label_count = max(1, int(lines * label_density))
+    label_at = {}   # instruction index -> label number
+    for number, index in enumerate(sorted(rng.sample(range(lines), min(label_count, lines)))):
+        label_at[index] = number
+    label_count = len(label_at)
+
+    def reg() -> str:
+        return f'r{rng.randrange(32)}'
+
+    program = []
+    current = 0
+    for index, opcode_type in enumerate(rng.choices(types, weights, k=lines)):
+        if index in label_at:
+            current = label_at[index]
+            program.append(f'L{current}:')
+
+        def label() -> str:
+            return f'L{min(label_count - 1, max(0, current + rng.randint(-LABEL_WINDOW, LABEL_WINDOW)))}'
+
+        op = rng.choice(by_type[opcode_type])
+        if opcode_type == 'R':
+            line = f'{op} {reg()}, {reg()}, {reg()}'
+        elif opcode_type in ['I', 'JI']:
+            line = f'{op} {reg()}, {reg()}, {rng.randint(-2048, 2047)}'
+        elif opcode_type == 'SI':
+            line = f'{op} {reg()}, {reg()}, {rng.randrange(32)}'
+        elif opcode_type in ['LI', 'S']:
+            line = f'{op} {reg()}, {rng.randint(-2048, 2047)}({reg()})'
+        elif opcode_type == 'B':
+            line = f'{op} {reg()}, {reg()}, {label()}'
+        elif opcode_type == 'U':
+            line = f'{op} {reg()}, {rng.randrange(1 << 20)}'
+        elif opcode_type == 'J':
+            line = f'{op} {reg()}, {label()}'
+        elif op in ['nop', 'ret']:
+            line = op
+        elif op in ['mv', 'not', 'neg']:
+            line = f'{op} {reg()}, {reg()}'
+        elif op == 'li':
+            line = f'li {reg()}, {rng.choice([rng.randint(-2048, 2047), rng.randint(-(1 << 31), (1 << 31) - 1)])}'
+        elif op == 'la':
+            line = f'la {reg()}, {label()}'
+        else:
+            # j, call
+            line = f'{op} {label()}'
+        program.append(f'    {line}')
+
+    return program
@@ -1,9 +1,20 @@
 import re
 import sys
+from array import array
+from itertools import chain
+from typing import Callable, Iterable, Iterator, NamedTuple
 
-from src.constants import opcode, pseudo
-from src.errors import *
-from src.helpers import *
+from src.constants import symbol_directives
+from src.directives import DATA, TEXT, as_words, data_directives, encode_data, get_section
+from src.encoder import to_binary
+from src.errors import DirectiveError, DuplicateLabelError, UndefinedLabelError
+from src.helpers import get_opcode_type, handle_address_and_label, offset_ranges, tokenize
+# Legacy string API, re-exported for existing callers
+from src.helpers import get_args, get_imm, get_instruction, get_register, parse_op
+from src.ir import NONE, Program, build, concatenate, encode_parsed, layout, operation_types, operations, parsed_instruction_count
+from src.lexer import Statement
+from src.preprocess import preprocess
+from src.relax import inverted_branches, relax
 
 def assemble(
         content: str
@@ -16,39 +27,564 @@ def assemble(
     :return: assembled content in binary
     :rtype: str
     """
-    metadata = {
+    # Convert to text only at the output stage
+    return '\n'.join(map(to_binary, assemble_words(content)))
+
+def assemble_words(
+        content: str
+) -> list[int]:
+    """
+    Assembles plain text RISCV 32I ISA instructions into 32-bit words.
+    
+    :param content: .asm file content
+    :type content: str
+    :return: encoded words in program order
+    :rtype: list[int]
+    """
+    words = []
+    assemble_stream(content.splitlines(), words.extend)
+    return words
+
+class AssembledProgram(NamedTuple):
+    """Result of assemble_program."""
+    words: array            # encoded words, array('I'); np.frombuffer(words, dtype=np.uint32) is a zero-copy view
+    labels: dict[str, int]  # label -> address
+    lines: array            # 1-based source line number of each word, array('I')
+
+    def to_numpy(self):
+        """Zero-copy NumPy view of the encoded words."""
+        import numpy as np
+        return np.frombuffer(self.words, dtype=np.uint32)
+
+def assemble_program(
+        source: str | Iterable[str],
+        include_path: Iterable[str] = (),
+        optimize: bool = False
+) -> AssembledProgram:
+    """
+    Assembles a program into packed words, with its label table and the source line of every word.
+    
+    :param source: .asm file content, or its lines
+    :type source: str | Iterable[str]
+    :param include_path: directories searched for included files
+    :type include_path: Iterable[str]
+    :param optimize: remove redundant instructions first, see src.peephole
+    :type optimize: bool
+    :return: encoded words, labels and source line numbers
+    :rtype: AssembledProgram
+    """
+    if isinstance(source, str):
+        source = source.splitlines()
+
+    words = array('I')
+    lines = array('I')
+    metadata = assemble_stream(source, words.extend, line_out=lines.extend, include_path=include_path, optimize=optimize)
+    return AssembledProgram(words, metadata['labels'], lines)
+
+def assemble_stream(
+        lines: Iterable[str],
+        out: Callable[[list[int]], None],
+        flush_size: int = 4096,
+        line_out: Callable[[list[int]], None] | None = None,
+        include_path: Iterable[str] = (),
+        optimize: bool = False
+) -> dict:
+    """
+    Assembles lines and writes encoded words to a sink in chunks.
+
+    Lines are parsed and encoded as they are read, assuming every branch is in range. Only the label table, the pending
+    fixups and the words emitted since the oldest pending fixup are held in memory, plus the .data section, which is
+    written after .text once its address is known. .incbin data is passed to the sink as a memoryview of the mapped file
+    where it is word-aligned. If a conditional branch turns out to be out of range, the lines are read again (from the
+    start of a seekable file, or from a copy otherwise) into a whole program whose long branches are relaxed (see
+    src.relax), and the words after those already written are written from it. Optimized builds are always assembled as
+    a whole program.
+    
+    :param lines: .asm file lines, e.g. an open file
+    :type lines: Iterable[str]
+    :param out: sink called with each chunk of encoded words, in program order
+    :type out: Callable[[list[int]], None]
+    :param flush_size: number of buffered words after which they are written to the sink
+    :type flush_size: int
+    :param line_out: optional sink called with the 1-based source line number of each word, in program order
+    :type line_out: Callable[[list[int]], None] | None
+    :param include_path: directories searched for included files
+    :type include_path: Iterable[str]
+    :param optimize: remove redundant instructions first, see src.peephole
+    :type optimize: bool
+    :return: metadata with the resolved labels, the included files and the removed instructions
+    :rtype: dict
+    """
+    if optimize:
+        return _assemble_whole(lines, out, flush_size, line_out, include_path, optimize)
+
+    source = _Source(lines)
+    metadata = _new_metadata()
+    program = Program()
+    kept = set()
+    statements = preprocess(source, include_path, includes=metadata['includes'])
+    try:
+        return _emit(program, _parse_rows(program, statements, kept), out, flush_size, line_out, metadata, kept)
+    except _RelaxationNeeded as relaxation:
+        # The words written so far are final, the whole program gives the rest
+        return _assemble_whole(source.again(), _skip(out, relaxation.written), flush_size,
+                               None if line_out is None else _skip(line_out, relaxation.written), include_path, optimize)
+
+def _new_metadata() -> dict:
+    return {
         'labels': {},
         'address': 0,
+        'includes': [],
+        'removed': [],
     }
 
-    assembled_lines = []
+def _assemble_whole(
+        lines: Iterable[str],
+        out: Callable[[list[int]], None],
+        flush_size: int,
+        line_out: Callable[[list[int]], None] | None,
+        include_path: Iterable[str],
+        optimize: bool
+) -> dict:
+    """Parses lines into a whole program, optimizes it and relaxes its branches, then writes its words."""
+    metadata = _new_metadata()
+    program = build(preprocess(lines, include_path, includes=metadata['includes']))
+    if optimize:
+        from src.peephole import peephole
+        program, metadata['removed'] = peephole(program)
+    program = relax(program)
+    return _emit(program, map(program.row, range(len(program))), out, flush_size, line_out, metadata)
+
+class _RelaxationNeeded(Exception):
+    """Raised by _emit when a conditional branch is out of range, with the number of words already written."""
 
-    # Parse labels first
-    for line in content.splitlines():
-        # Comments or empty lines
-        if line == '' or line.startswith('#'):
-            continue 
-        
-        op, non_op = parse_op(line)
-        handle_address_and_label(op, metadata)
-    
-    # Reset address
-    metadata['address'] = 0
-
-    for line in content.splitlines():
-        # Comments or empty lines
-        if line == '' or line.startswith('#'):
-            continue 
-        
-        assembled_line = assemble_line(line, metadata)
-
-        if assembled_line:
-            if isinstance(assembled_line, list):
-                assembled_lines.extend(assembled_line)
+    def __init__(self, written: int) -> None:
+        super().__init__(written)
+        self.written = written
+
+class _Source:
+    """Lines that can be read again, from the start position of a seekable file or from a copy of what was read."""
+
+    def __init__(
+            self,
+            lines: Iterable[str]
+    ) -> None:
+        self.lines = lines
+        self.start = None
+        self.copy = None
+        if not isinstance(lines, (list, tuple)):
+            try:
+                if lines.seekable():
+                    self.start = lines.tell()
+            except (AttributeError, OSError):
+                pass
+            if self.start is None:
+                self.copy = []
+
+    def __iter__(self):
+        if self.copy is None:
+            return iter(self.lines)
+        return self._read()
+
+    def _read(self):
+        for line in self.lines:
+            self.copy.append(line)
+            yield line
+
+    def again(self) -> Iterable[str]:
+        """Every line, from the first one."""
+        if self.start is not None:
+            self.lines.seek(self.start)
+        elif self.copy is not None:
+            return chain(self.copy, self.lines)
+        return self.lines
+
+def _skip(
+        sink: Callable[[list[int]], None],
+        count: int
+) -> Callable[[list[int]], None]:
+    """Sink that drops the first count values, already written before a restart."""
+    remaining = count
+
+    def write(values: list[int]) -> None:
+        nonlocal remaining
+        if remaining:
+            dropped = min(remaining, len(values))
+            remaining -= dropped
+            values = values[dropped:]
+        sink(values)
+    return write
+
+def _parse_rows(
+        program: Program,
+        statements: Iterable[tuple[int, Statement]],
+        kept: set[int]
+) -> Iterator[tuple]:
+    """Parses statements into rows as they are read; the operands of directive rows are dropped once handled, unless kept."""
+    args = program.args
+    for line_number, statement in statements:
+        if statement.label is None and statement.mnemonic is None:
+            continue
+        row = program.parse(line_number, statement)
+        yield row
+        if operation_types[row[0]] == 'DIRECTIVE' and row[4] not in kept:
+            args.pop()
+
+def _emit(
+        program: Program,
+        rows: Iterable[tuple],
+        out: Callable[[list[int]], None],
+        flush_size: int,
+        line_out: Callable[[list[int]], None] | None,
+        metadata: dict,
+        kept: set[int] | None = None
+) -> dict:
+    """
+    Encodes rows of a program in order and writes their words to out, see assemble_stream.
+
+    With kept, rows are parsed as they are read and branches were not relaxed: _RelaxationNeeded is raised as soon as a
+    conditional branch is known to be out of range. Words are then only written once no relaxation can change them:
+    fixups patched while a branch to a label not yet defined is pending are held, as relaxing it would move their labels.
+    """
+    optimistic = kept is not None
+    low, high = offset_ranges['B']
+
+    buffer = []         # words not yet written to the sink
+    flushed = 0         # number of words already written to the sink
+    fixups = {}         # word index -> (row, address) of rows with forward label references, in index order
+    waiting = {}        # label -> word indices of the fixups referencing it
+    branches = {}       # word index -> address of the pending fixups of conditional branches, in index order
+    held = None         # first fixup patched while a branch was pending, not written until none is
+    line_numbers = []   # source line of each word in buffer
+    partial = b''       # .text bytes after the last full word
+
+    section = TEXT
+    data = Section()
+
+    def patch(label: str) -> None:
+        """Patches forward references to a label that was just defined."""
+        nonlocal held
+        address = metadata['address']
+        for index in waiting.pop(label, []):
+            row, metadata['address'] = fixups.pop(index)
+            if branches.pop(index, None) is not None and not low <= address - metadata['address'] <= high:
+                raise _RelaxationNeeded(flushed)
+            if branches:
+                held = index if held is None else min(held, index)
+            line_words = encode_parsed(program, row, metadata)
+            buffer[index - flushed:index - flushed + len(line_words)] = line_words
+        if not branches:
+            held = None
+        metadata['address'] = address
+
+    line_number = 0
+    for row in rows:
+        op_id, line_number = row[0], row[7]
+
+        label = row[6]
+        if label != NONE:
+            label = program.names[label]
+            if label in metadata['labels'] or label in data.labels:
+                raise DuplicateLabelError(f"Label defined more than once: {label}")
+            if section == DATA:
+                data.labels[label] = data.size
+            else:
+                handle_address_and_label(label + ':', metadata)
+                patch(label)
+
+        # Label-only rows, a whole program has no symbols to export
+        op = operations[op_id]
+        if op is None or op in symbol_directives:
+            continue
+
+        opcode_type = operation_types[op_id]
+        if opcode_type == 'DIRECTIVE':
+            args = program.args[row[4]]
+            new_section = get_section(op, args)
+            if new_section is not None:
+                section = new_section
+                continue
+
+        if section == DATA:
+            data.add(op, args, line_number, metadata)
+            continue
+
+        if op in data_directives and op != '.word':
+            # Bytes in .text, complete words join the output
+            emitted = encode_data(op, args, metadata['address'], metadata)
+            metadata['address'] += len(emitted)
+            if partial:
+                emitted = partial + emitted
+            full = len(emitted) - len(emitted) % 4
+            line_words = as_words(emitted[:full])
+            partial = bytes(emitted[full:])
+
+            if len(line_words) >= flush_size and not fixups:
+                # Large aligned blobs go to the sink as they are
+                out(buffer)
+                out(line_words)
+                flushed += len(buffer) + len(line_words)
+                buffer = []
+                if line_out is not None:
+                    line_out(line_numbers)
+                    line_out([line_number] * len(line_words))
+                    line_numbers = []
+            else:
+                buffer.extend(line_words)
+                if line_out is not None:
+                    line_numbers.extend([line_number] * len(line_words))
+            continue
+
+        if partial:
+            raise DirectiveError(f"Unaligned {op} at address {metadata['address']:#x}, use .align 2")
+
+        index = flushed + len(buffer)
+        symbol = row[5]
+        if optimistic and symbol != NONE and op in inverted_branches:
+            target = metadata['labels'].get(program.names[symbol])
+            if target is not None and not low <= target - metadata['address'] <= high:
+                raise _RelaxationNeeded(flushed)
+
+        try:
+            line_words = encode_parsed(program, row, metadata)
+        except UndefinedLabelError as e:
+            # Forward reference, reserve the words and patch once the label is defined
+            line_words = [0] * parsed_instruction_count(program, row)
+            fixups[index] = (row, metadata['address'])
+            waiting.setdefault(e.label, []).append(index)
+            if optimistic and opcode_type == 'DIRECTIVE':
+                kept.add(row[4])
+            elif optimistic and op in inverted_branches:
+                branches[index] = metadata['address']
+
+        buffer.extend(line_words)
+        metadata['address'] += 4 * len(line_words)
+        if line_out is not None:
+            line_numbers.extend([line_number] * len(line_words))
+
+        if len(buffer) >= flush_size:
+            if branches and metadata['address'] - next(iter(branches.values())) > high:
+                # The oldest pending branch cannot reach its label anymore
+                raise _RelaxationNeeded(flushed)
+            # Words before the oldest pending fixup are final, as are held words once no branch is pending
+            limit = min(next(iter(fixups), flushed + len(buffer)), flushed + len(buffer) if held is None else held) - flushed
+            if limit:
+                out(buffer[:limit])
+                del buffer[:limit]
+                flushed += limit
+                if line_out is not None:
+                    line_out(line_numbers[:limit])
+                    del line_numbers[:limit]
+
+    # .text ends on a word boundary
+    if partial:
+        buffer.append(int.from_bytes(partial.ljust(4, b'\0'), 'little'))
+        metadata['address'] += -len(partial) % 4
+        if line_out is not None:
+            line_numbers.append(line_number)
+
+    # .data follows, aligned to its largest .align
+    text_end = metadata['address']
+    data_base = text_end + -text_end % data.alignment
+    for label, offset in data.labels.items():
+        metadata['labels'][label] = data_base + offset
+        patch(label)
+
+    if fixups:
+        label = next(label for label in waiting)
+        raise UndefinedLabelError(f"Undefined label: {label}", label)
+
+    data.resolve(data_base, metadata)
+    metadata['address'] = data_base + data.size
+
+    out(buffer)
+    if line_out is not None:
+        line_out(line_numbers)
+    if data.size:
+        out([0] * ((data_base - text_end) // 4))
+        data.write(out, line_out, (data_base - text_end) // 4)
+    return metadata
+
+class Section:
+    """Bytes of a section held until its address is known, as bytearrays and views of mapped .incbin files."""
+
+    def __init__(self) -> None:
+        self.pieces = []        # bytearray or memoryview
+        self.size = 0
+        self.alignment = 4      # largest alignment requested, the section starts on a multiple of it
+        self.labels = {}        # label -> offset in the section
+        self.fixups = []        # (piece index, offset in piece, op, args, section offset) of .word with label operands
+        self.marks = []         # (offset, source line) of each directive
+
+    def add(
+        self,
+        op: str,
+        args: list[str],
+        line_number: int,
+        metadata: dict
+    ) -> None:
+        """Appends the bytes of a data directive, .word labels are resolved later by resolve()."""
+        if op not in data_directives:
+            raise DirectiveError(f"Only data directives are allowed in .data: {op}")
+
+        self.marks.append((self.size, line_number))
+        if op == '.word':
+            emitted = bytes(4 * len(args))
+            if not self.pieces or not isinstance(self.pieces[-1], bytearray):
+                self.pieces.append(bytearray())
+            self.fixups.append((len(self.pieces) - 1, len(self.pieces[-1]), op, args, self.size))
+        else:
+            emitted = encode_data(op, args, self.size, metadata)
+            if op == '.align':
+                self.alignment = max(self.alignment, 1 << int(args[0]))
+
+        if isinstance(emitted, memoryview):
+            self.pieces.append(emitted)
+        else:
+            if not self.pieces or not isinstance(self.pieces[-1], bytearray):
+                self.pieces.append(bytearray())
+            self.pieces[-1] += emitted
+        self.size += len(emitted)
+
+    def resolve(
+        self,
+        base: int,
+        metadata: dict
+    ) -> None:
+        """Encodes the .word directives once the section is placed at base and all labels are known."""
+        for piece, offset, op, args, section_offset in self.fixups:
+            emitted = encode_data(op, args, base + section_offset, metadata)
+            self.pieces[piece][offset:offset + len(emitted)] = emitted
+
+    def write(
+        self,
+        out: Callable[[list[int]], None],
+        line_out: Callable[[list[int]], None] | None,
+        padding: int
+    ) -> None:
+        """Writes the section as words after padding words, word-aligned .incbin views are written without a copy."""
+        pending = bytearray()
+        for piece in self.pieces:
+            if isinstance(piece, memoryview) and len(pending) % 4 == 0 and len(piece) % 4 == 0:
+                out(as_words(pending))
+                out(as_words(piece))
+                pending = bytearray()
             else:
-                assembled_lines.append(assembled_line)
+                pending += piece
+        pending += bytes(-len(pending) % 4)
+        out(as_words(pending))
+
+        if line_out is not None:
+            # Each word comes from the last directive starting at or before it
+            count = (self.size + 3) // 4
+            starts = [0] + [-(-offset // 4) for offset, _ in self.marks[1:]]
+            line_out([self.marks[0][1]] * padding)
+            for index, (_, line_number) in enumerate(self.marks):
+                end = starts[index + 1] if index + 1 < len(starts) else count
+                line_out([line_number] * max(0, end - starts[index]))
+
+# Sources of at least this many bytes are encoded with the batch encoder (src.vector) when NumPy is installed, even in one
+# process; smaller ones are streamed, as importing NumPy takes longer than encoding them. None always streams.
+BATCH_MIN_SIZE = 256 * 1024
+
+def use_batch_encoder(
+        size: int
+) -> bool:
+    """Whether a source of size bytes is assembled by assemble_parallel rather than streamed, with one process."""
+    if BATCH_MIN_SIZE is None or size < BATCH_MIN_SIZE:
+        return False
+    import importlib.util
+    return importlib.util.find_spec('numpy') is not None
+
+# A directive other than .word, .globl and .global, which the sequential assembler lays out; labels may start with a '.'
+_DIRECTIVE = re.compile(r'[ \t]*(?:[\w.\\@]+[ \t]*:)?[ \t]*\.(?!(?:word|globl|global)\b)[a-z_][\w.]*+(?![ \t]*:)', re.IGNORECASE)
+
+def assemble_parallel(
+        lines: Iterable[str],
+        out: Callable[[list[int]], None],
+        jobs: int = 1,
+        chunk_size: int | None = None,
+        flush_size: int = 65536,
+        include_path: Iterable[str] = (),
+        optimize: bool = False
+) -> dict:
+    """
+    Assembles lines with the batch encoder (src.vector) and writes encoded words to a sink in chunks, parsing chunks of
+    lines over a process pool with jobs > 1.
+
+    Each worker tokenizes and builds its chunk (see src.ir.build), the chunks are then joined and laid out once, so the
+    output is identical to assemble_words. Sources are scanned for directives before they are parsed: those with
+    directives other than .word, .globl and .global, whose data, sections, includes and macros can span chunks, are
+    streamed instead (see assemble_stream). With one process, a seekable file is read again rather than held in memory.
+    
+    :param lines: .asm file lines, e.g. an open file
+    :type lines: Iterable[str]
+    :param out: sink called with each chunk of encoded words, in program order
+    :type out: Callable[[list[int]], None]
+    :param jobs: number of worker processes, 1 parses in this process
+    :type jobs: int
+    :param chunk_size: number of lines per chunk, by default spread evenly over the workers
+    :type chunk_size: int | None
+    :param flush_size: number of instructions encoded in one batch and written to the sink
+    :type flush_size: int
+    :param include_path: directories searched for included files
+    :type include_path: Iterable[str]
+    :param optimize: remove redundant instructions first, see src.peephole
+    :type optimize: bool
+    :return: metadata with the resolved labels, the included files and the removed instructions
+    :rtype: dict
+    """
+    source = _Source(lines)
+    if any(_DIRECTIVE.match(line) for line in source if '.' in line):
+        return assemble_stream(source.again(), out, include_path=include_path, optimize=optimize)
+
+    metadata = _new_metadata()
+    if jobs == 1:
+        program = build(preprocess(source.again()))
+    else:
+        lines = list(source.again())
+        if chunk_size is None:
+            chunk_size = max(1, -(-len(lines) // (jobs * 4)))
+        chunks = [(lines[start:start + chunk_size], start) for start in range(0, len(lines), chunk_size)]
+        del lines
+
+        # Imported here, multiprocessing is slow to import and only needed with jobs
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(jobs) as executor:
+            program = concatenate(executor.map(_build_chunk, chunks))
 
-    return '\n'.join(assembled_lines)
+    if optimize:
+        from src.peephole import peephole
+        program, metadata['removed'] = peephole(program)
+    program = relax(program)
+
+    # Labels and the address of every instruction
+    addresses, metadata['address'], _ = layout(program)
+    for row, label in enumerate(program.labels):
+        if label != NONE:
+            metadata['labels'][program.names[label]] = addresses[row]
+    rows = [
+        row for row, op_id in enumerate(program.ops)
+        if operation_types[op_id] is not None and operations[op_id] not in symbol_directives
+    ]
+
+    # Imported here, NumPy is slow to import and only needed by the batch encoder
+    from src.vector import encode_batch
+    for start in range(0, len(rows), flush_size):
+        chunk = rows[start:start + flush_size]
+        out(encode_batch(program.take(chunk), array('q', map(addresses.__getitem__, chunk)), metadata['labels']).tolist())
+    return metadata
+
+def _build_chunk(
+        chunk: tuple[list[str], int]
+) -> Program:
+    """Parses a chunk of lines in a worker process, given the number of lines before it."""
+    lines, start = chunk
+    program = build(preprocess(lines))
+    if start:
+        program.lines = array('I', [line_number + start for line_number in program.lines])
+    return program
 
 def assemble_line(
         line: str,
@@ -64,72 +600,57 @@ def assemble_line(
     :return: assembled line in binary
     :rtype: str
     """
-    # Operation-handling ----------------------------
-    op, non_op = parse_op(line)            # Extract operation and non-operation parts
+    op = tokenize(line).mnemonic
 
-    if op.endswith(':'):
+    if op is None:
         return None  # Label-only line, no instruction to assemble
 
-    # Instruction-handling --------------------------
-    opcode_type = get_opcode_type(op)
-
-    if opcode_type == 'PSEUDO':
-        # Handle pseudo-instructions (and everything in this block) (resolved)
-        args = get_pseudo_args(op, non_op, metadata) # # includes actual registers and immediates
-        instructions = []
-        for pseudo_inst in pseudo[op]:                  # does not include actual registers and immediates
-            pseudo_inst = replace_args_in_pseudo(pseudo_inst, args)
-            pseudo_op, pseudo_non_op = parse_op(pseudo_inst)
-            pseudo_opcode_type = get_opcode_type(pseudo_op)
-            normal_args = get_args(pseudo_op, pseudo_non_op, pseudo_opcode_type, metadata)
-            instructions.append(get_instruction(pseudo_op, pseudo_opcode_type, normal_args))
-        return instructions # list of instructions
-    else:
-        # Normal instruction
-        args = get_args(op, non_op, opcode_type, metadata)
-        instruction = get_instruction(op, opcode_type, args)
-        return instruction
-
-def replace_args_in_pseudo(
-    pseudo_inst: str,
-    args: list
-) -> str:
-    """Replaces placeholders in pseudo-instruction with actual arguments."""
-    if len(args) == 0:
-        return pseudo_inst
-    elif len(args) == 1:
-        rd = args[0]
-        pseudo_inst = pseudo_inst.replace('x0', rd)
-        return pseudo_inst
-    elif len(args) == 2:
-        rd, imm_or_rs = args[0], args[1]
-        pseudo_inst = pseudo_inst.replace('x0', f'r{(int(rd,2))}').replace('IMM', f'{int(imm_or_rs, 2)}').replace('x1', f'r{(int(imm_or_rs,2))}')
-        print(pseudo_inst)
-        return pseudo_inst
-    else:
-        raise InvalidArgumentError(f"Invalid number of arguments for pseudo-instruction: {pseudo_inst} with args {args}")
+    words = encode_line(line, metadata)
+    if get_opcode_type(op) == 'PSEUDO':
+        return [to_binary(word) for word in words] # list of instructions
+    return to_binary(words[0])
 
-def get_pseudo_args(
-    op: str,
-    non_op: str,
-    metadata: dict
-) -> dict:
-    """Extracts arguments for pseudo-instructions."""
-    args = [args.strip() for args in non_op.split(',')]
-    if op in ['nop']:
-       print(args)
-       assert len(args) == 1 and args[0] == ''
-       args = []
-    elif op in ['not', 'neg']:
-       assert len(args) == 1
-       args = [get_register(args[0])]  # rd
-    elif op in ['li']:
-        assert len(args) == 2
-        args = [get_register(args[0]), get_imm(args[1], metadata)]  # rd, imm
-    elif op in ['mv']:
-        assert len(args) == 2
-        args = [get_register(args[0]), get_register(args[1])]  # rd, rs
-    return args
+def encode_line(
+        line: str,
+        metadata: dict
+) -> list[int]:
+    """
+    Encodes a single line of RISCV 32I ISA instruction into 32-bit words.
+    
+    :param line: single line of .asm file content
+    :type line: str
+    :param metadata: dictionary containing labels and address
+    :type metadata: dict
+    :return: encoded words, empty for label-only lines
+    :rtype: list[int]
+    """
+    # Operation-handling ----------------------------
+    statement = tokenize(line)            # Extract operation and arguments
+
+    if statement.mnemonic is None:
+        return []  # Label-only line, no instruction to assemble
+
+    return encode_op(statement.mnemonic, statement.operands, metadata)
+
+def encode_op(
+        op: str,
+        args: list[str],
+        metadata: dict
+) -> list[int]:
+    """
+    Encodes an already tokenized instruction into 32-bit words.
+    
+    :param op: operation, as returned by tokenize
+    :type op: str
+    :param args: operands, as returned by tokenize
+    :type args: list[str]
+    :param metadata: dictionary containing labels and address
+    :type metadata: dict
+    :return: encoded words
+    :rtype: list[int]
+    """
+    program = Program()
+    return encode_parsed(program, program.parse(0, Statement(None, op, args)), metadata)
 
 if __name__ == "__main__":
     assemble(sys.argv[1])
\ No newline at end of file
@@ -0,0 +1,211 @@
+import glob
+import logging
+import os
+from array import array
+
+from src import cache
+from src.assemble import assemble_parallel, assemble_stream, use_batch_encoder
+from src.errors import AssemblyError
+from src.output import OutputFormat, StreamWriter, extensions
+
+logger = logging.getLogger(__name__)
+
+def expand_inputs(
+    patterns: list[str]
+) -> list[str]:
+    """
+    Expands file names, glob patterns and directories into the list of files to assemble.
+
+    Directories are searched recursively for '.asm' files. Patterns that match nothing are kept as is, so that they are reported as missing files.
+
+    :param patterns: file names, glob patterns or directories
+    :type patterns: list[str]
+    :return: file names, in order and without duplicates
+    :rtype: list[str]
+    """
+    file_names = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, '**', '*.asm'), recursive=True))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]
+        file_names.extend(matches)
+    return list(dict.fromkeys(file_names))
+
+def get_output_file_name(
+    file_name: str,
+    format: OutputFormat = OutputFormat.LIST,
+    out_dir: str | None = None
+) -> str:
+    """Output file name for an input, next to it or in out_dir, with the extension of the output format."""
+    output_file_name = file_name.removesuffix('.asm') + extensions[format]
+    if out_dir is not None:
+        output_file_name = os.path.join(out_dir, os.path.basename(output_file_name))
+    return output_file_name
+
+def assemble_file(
+    file_name: str,
+    output_file_name: str,
+    format: OutputFormat = OutputFormat.LIST,
+    jobs: int = 1,
+    cache_dir: str | None = None,
+    include_path: list[str] | None = None,
+    optimize: bool = False
+) -> None:
+    """
+    Assembles a '.asm' file into an output file, streaming lines in and words out.
+
+    With a cache directory, unchanged sources are served from the cache without parsing. Sources that include other files
+    are not cached, as their key would not cover the included files. No partial output is left behind if assembly fails.
+    With optimize, the instructions removed are logged, unless the output is served from the cache.
+
+    :param file_name: '.asm' file path to be assembled
+    :type file_name: str
+    :param output_file_name: output file path
+    :type output_file_name: str
+    :param format: output format
+    :type format: OutputFormat
+    :param jobs: number of processes, more than one parses chunks of the file in parallel instead of streaming it; large
+        files are encoded in one batch even with one process, see src.assemble.BATCH_MIN_SIZE
+    :type jobs: int
+    :param cache_dir: build cache directory, None to disable the cache
+    :type cache_dir: str | None
+    :param include_path: directories searched for included files, after the directory of the file
+    :type include_path: list[str] | None
+    :param optimize: remove redundant instructions, see src.peephole
+    :type optimize: bool
+    """
+    # Check extension
+    if not file_name.endswith('.asm'):
+        raise AssemblyError("File must have a .asm extension")
+
+    key = cached = None
+    if cache_dir is not None:
+        key = cache.source_key(file_name, optimize)
+        cached = cache.load(key, cache_dir)
+
+    include_path = [os.path.dirname(file_name) or '.', *(include_path or [])]
+    includes = []
+    removed = []
+    words = None    # encoded words to store in the cache
+
+    with open(file_name, 'r') as file:
+        assembled = False
+        try:
+            with open(output_file_name, 'wb') as output_file:
+                writer = StreamWriter(output_file, format)
+                if cached is not None:
+                    writer.write(cached)
+                else:
+                    # Only kept for the cache, and not past what it can hold
+                    if key is not None:
+                        words = array('I')
+                    def out(chunk: list[int]) -> None:
+                        nonlocal words
+                        writer.write(chunk)
+                        if words is not None:
+                            words.extend(chunk)
+                            if 4 * len(words) > cache.CACHE_MAX_SIZE:
+                                words = None
+                    if jobs > 1 or use_batch_encoder(os.fstat(file.fileno()).st_size):
+                        metadata = assemble_parallel(file, out, jobs, include_path=include_path, optimize=optimize)
+                    else:
+                        metadata = assemble_stream(file, out, include_path=include_path, optimize=optimize)
+                    includes, removed = metadata['includes'], metadata['removed']
+                writer.close()
+            assembled = True
+        finally:
+            # Do not leave a partial output behind
+            if not assembled and os.path.exists(output_file_name):
+                os.remove(output_file_name)
+
+    if optimize and cached is None:
+        from src.peephole import format_report
+        logger.info(format_report(file_name, removed))
+
+    if words is not None and not includes:
+        cache.store(key, words, cache_dir)
+
+def try_assemble_file(
+    file_name: str,
+    output_file_name: str,
+    format: OutputFormat = OutputFormat.LIST,
+    jobs: int = 1,
+    cache_dir: str | None = None,
+    include_path: list[str] | None = None,
+    optimize: bool = False
+) -> str | None:
+    """Assembles a file as assemble_file does, returning an error message instead of raising."""
+    try:
+        assemble_file(file_name, output_file_name, format, jobs, cache_dir, include_path, optimize)
+    except FileNotFoundError:
+        return f"File not found: {file_name}"
+    except AssemblyError as ae:
+        return f"Assembly error: {ae}"
+    except AssertionError as ase:
+        return f"Assertion error during assembly: {ase}"
+    except Exception as e:
+        return f"An unexpected error occurred during assembly: {e}"
+    return None
+
+def assemble_batch(
+    file_names: list[str],
+    format: OutputFormat = OutputFormat.LIST,
+    out_dir: str | None = None,
+    jobs: int = 1,
+    cache_dir: str | None = None,
+    include_path: list[str] | None = None,
+    optimize: bool = False
+) -> list[tuple[str, str, str | None]]:
+    """
+    Assembles many files in one process, or in a pool of jobs processes, without stopping at the first failure.
+
+    :param file_names: '.asm' file paths to be assembled
+    :type file_names: list[str]
+    :param format: output format
+    :type format: OutputFormat
+    :param out_dir: directory to write outputs to, next to each input if None
+    :type out_dir: str | None
+    :param jobs: number of processes
+    :type jobs: int
+    :param cache_dir: build cache directory, None to disable the cache
+    :type cache_dir: str | None
+    :param include_path: directories searched for included files
+    :type include_path: list[str] | None
+    :param optimize: remove redundant instructions, see src.peephole
+    :type optimize: bool
+    :return: (file name, output file name, error message or None) for each file, in order
+    :rtype: list[tuple[str, str, str | None]]
+    """
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+
+    output_file_names = [get_output_file_name(file_name, format, out_dir) for file_name in file_names]
+
+    # Two inputs must not overwrite each other's output
+    errors = {}
+    owners = {}
+    for file_name, output_file_name in zip(file_names, output_file_names):
+        if output_file_name in owners:
+            errors[file_name] = f"Output {output_file_name} is already written by {owners[output_file_name]}"
+        else:
+            owners[output_file_name] = file_name
+
+    pending = [(file_name, output_file_name) for file_name, output_file_name in zip(file_names, output_file_names) if file_name not in errors]
+    if len(pending) == 1:
+        # A single file uses the jobs to encode in parallel
+        errors[pending[0][0]] = try_assemble_file(*pending[0], format, jobs, cache_dir, include_path, optimize)
+    elif jobs > 1 and pending:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(jobs) as executor:
+            count = len(pending)
+            results = executor.map(try_assemble_file, *zip(*pending), [format] * count, [1] * count, [cache_dir] * count, [include_path] * count, [optimize] * count)
+            for (file_name, _), error in zip(pending, results):
+                errors[file_name] = error
+    else:
+        for file_name, output_file_name in pending:
+            errors[file_name] = try_assemble_file(file_name, output_file_name, format, 1, cache_dir, include_path, optimize)
+
+    return [(file_name, output_file_name, errors[file_name]) for file_name, output_file_name in zip(file_names, output_file_names)]
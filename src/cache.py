@@ -0,0 +1,211 @@
+import glob
+import hashlib
+import os
+import sys
+from array import array
+from collections import OrderedDict
+from typing import NamedTuple
+
+from src.constants import opcode, pseudo, pseudo_long
+from src.output import to_bytes
+
+CACHE_DIR = '.orvasm_cache'
+CACHE_MAX_SIZE = 64 * 1024 * 1024   # bytes
+LINE_CACHE_SIZE = 4096  # lines
+
+_assembler_version = None
+
+def assembler_version() -> str:
+    """Hash of the ISA tables and the assembler sources, any change invalidates the whole cache."""
+    global _assembler_version
+    if _assembler_version is None:
+        digest = hashlib.sha256(repr((opcode, pseudo, pseudo_long)).encode())
+        for file_name in sorted(glob.glob(os.path.join(os.path.dirname(__file__), '*.py'))):
+            with open(file_name, 'rb') as file:
+                digest.update(file.read())
+        _assembler_version = digest.hexdigest()
+    return _assembler_version
+
+def source_key(
+    file_name: str,
+    optimize: bool = False
+) -> str:
+    """Cache key of a source file, from its bytes, the assembler version and whether it is optimized."""
+    with open(file_name, 'rb') as file:
+        digest = hashlib.file_digest(file, 'sha256')
+    digest.update(assembler_version().encode())
+    if optimize:
+        digest.update(b'-O')
+    return digest.hexdigest()
+
+def _entry_path(
+    key: str,
+    cache_dir: str
+) -> str:
+    return os.path.join(cache_dir, key + '.bin')
+
+def load(
+    key: str,
+    cache_dir: str = CACHE_DIR
+) -> array | None:
+    """
+    Loads the encoded words stored under a key, marking the entry as recently used.
+
+    :param key: cache key, see source_key
+    :type key: str
+    :param cache_dir: cache directory
+    :type cache_dir: str
+    :return: encoded words, or None on a miss
+    :rtype: array | None
+    """
+    path = _entry_path(key, cache_dir)
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+        os.utime(path)
+    except OSError:
+        return None
+
+    words = array('I')
+    words.frombytes(data)
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words
+
+def store(
+    key: str,
+    words: list[int] | array,
+    cache_dir: str = CACHE_DIR,
+    max_size: int = CACHE_MAX_SIZE
+) -> None:
+    """
+    Stores encoded words under a key, then evicts least recently used entries above max_size bytes.
+
+    Words that take more than max_size bytes are not stored, as they would evict every other entry and then themselves.
+
+    :param key: cache key, see source_key
+    :type key: str
+    :param words: encoded words
+    :type words: list[int] | array
+    :param cache_dir: cache directory
+    :type cache_dir: str
+    :param max_size: maximum total size of the cache in bytes
+    :type max_size: int
+    """
+    if 4 * len(words) > max_size:
+        return
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(key, cache_dir)
+
+    # Write then rename, so that concurrent builds never read a partial entry
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(to_bytes(words))
+    os.replace(temp_path, path)
+
+    evict(cache_dir, max_size)
+
+def evict(
+    cache_dir: str = CACHE_DIR,
+    max_size: int = CACHE_MAX_SIZE
+) -> None:
+    """Removes least recently used entries until the cache is at most max_size bytes."""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.bin'):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+class LineCacheStats(NamedTuple):
+    """Statistics of a line cache."""
+    hits: int
+    misses: int
+    size: int       # lines cached
+    max_size: int
+
+class LineCache:
+    """
+    In-process cache of encoded lines, evicting the least recently used line above max_size.
+
+    src.ir.encode_row stores the words of instructions that use no label, keyed on (op, reg1, reg2, reg3, imm) of their
+    row, so that a line repeated in a program, or across programs, is only encoded once.
+    """
+
+    def __init__(
+        self,
+        max_size: int = LINE_CACHE_SIZE
+    ) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lines = OrderedDict()
+
+    def get(
+        self,
+        key: tuple
+    ) -> tuple[int, ...] | None:
+        """Words of a line, marking it as recently used, or None on a miss."""
+        words = self._lines.get(key)
+        if words is None:
+            self.misses += 1
+            return None
+        try:
+            self._lines.move_to_end(key)
+        except KeyError:
+            pass    # evicted by another thread
+        self.hits += 1
+        return words
+
+    def put(
+        self,
+        key: tuple,
+        words: list[int]
+    ) -> None:
+        """Stores the words of a line, then evicts least recently used lines above max_size."""
+        if self.max_size <= 0:
+            return
+        self._lines[key] = tuple(words)
+        self._evict(self.max_size)
+
+    def resize(
+        self,
+        max_size: int
+    ) -> None:
+        """Changes the maximum number of lines, 0 disables the cache."""
+        self.max_size = max_size
+        self._evict(max(max_size, 0))
+
+    def _evict(
+        self,
+        max_size: int
+    ) -> None:
+        try:
+            while len(self._lines) > max_size:
+                self._lines.popitem(last=False)
+        except KeyError:
+            pass    # emptied by another thread
+
+    def clear(self) -> None:
+        """Removes every line and resets the statistics."""
+        self._lines.clear()
+        self.hits = self.misses = 0
+
+    def stats(self) -> LineCacheStats:
+        """Hits and misses since the cache was created or cleared, and the number of lines cached."""
+        return LineCacheStats(self.hits, self.misses, len(self._lines), self.max_size)
+
+line_cache = LineCache()
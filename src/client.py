@@ -0,0 +1,80 @@
+"""
+Thin client of the assembler server (src.server), importing nothing beyond the standard library so that it starts fast.
+
+Run with:
+    python -m src.client <socket path> <input_file.asm>... [-o <output_file>] [-f list|bin|hex|ihex]
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+
+class Client:
+    """Connection to an assembler server, requests are sent one at a time over it."""
+
+    def __init__(
+        self,
+        socket_path: str
+    ) -> None:
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(socket_path)
+        self.file = self.socket.makefile('rwb')
+        self.next_id = 0
+
+    def request(
+        self,
+        **request
+    ) -> dict:
+        """
+        Sends a request and waits for its response.
+
+        :param request: request fields, e.g. source='addi r1, r0, 1', format='hex'
+        :return: response object
+        :rtype: dict
+        """
+        self.next_id += 1
+        request['id'] = self.next_id
+        self.file.write(json.dumps(request).encode() + b'\n')
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("Server closed the connection")
+        return json.loads(line)
+
+    def close(self) -> None:
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self) -> 'Client':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m src.client', description="Assembles files with a running assembler server")
+    parser.add_argument('socket_path', help="Unix socket of the server")
+    parser.add_argument('file_names', nargs='+', help="'.asm' files to assemble")
+    parser.add_argument('-o', '--output', help="Output file name (single file only)")
+    parser.add_argument('-f', '--format', default='list', choices=['list', 'bin', 'hex', 'ihex'], help="Output format")
+    args = parser.parse_args(argv)
+
+    if args.output and len(args.file_names) != 1:
+        parser.error("--output can only be used with a single file")
+
+    failed = 0
+    with Client(args.socket_path) as client:
+        for file_name in args.file_names:
+            # The server may run in another directory
+            output = args.output or f'{os.path.splitext(file_name)[0]}.{args.format}'
+            response = client.request(path=os.path.abspath(file_name), output=os.path.abspath(output), format=args.format)
+            if response['ok']:
+                print(f"Assembly complete. Output written to {output}")
+            else:
+                failed += 1
+                print(f"{file_name}: {response['error']}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,26 @@
+registers = {f'r{i}': i for i in range(32)}
+
+# Directives exporting symbols to other modules, see src.objects
+symbol_directives = ['.globl', '.global']
+
+# {n} is the n-th operand of the pseudo-instruction, %hi/%lo split a 32-bit value for lui + addi
 pseudo = {
-    'nop': ['addi r0, r0, 0'], # nop
-    'mv': ['addi x0, x1, 0'],  # mv rd, rs -> addi rd, rs, 0
-    'li': ['addi x0, x0, IMM'],  # li rd, imm -> addi rd, x0, imm
-    'not': ['xori x0, x0, -1'], # not rd -> xori rd, rd, -1
-    'neg': ['sub x0, x0, x0'],  # neg rd -> sub rd, x0, rd
+    'nop': ['addi r0, r0, 0'],                  # nop
+    'mv': ['addi {0}, {1}, 0'],                 # mv rd, rs -> addi rd, rs, 0
+    'li': ['addi {0}, r0, {1}'],                # li rd, imm -> addi rd, r0, imm
+    'la': ['lui {0}, %hi({1})',                 # la rd, label -> lui rd, %hi(label)
+           'addi {0}, {0}, %lo({1})'],          #                 addi rd, rd, %lo(label)
+    'not': ['xori {0}, {1}, -1'],               # not rd, rs -> xori rd, rs, -1
+    'neg': ['sub {0}, r0, {1}'],                # neg rd, rs -> sub rd, r0, rs
+    'j': ['jal r0, {0}'],                       # j offset -> jal r0, offset
+    'call': ['jal r1, {0}'],                    # call offset -> jal r1, offset
+    'ret': ['jalr r0, r1, 0'],                  # ret -> jalr r0, r1, 0
+}
+
+# Used instead of pseudo when the last operand is not a literal that fits in a 12-bit immediate
+pseudo_long = {
+    'li': ['lui {0}, %hi({1})',                 # li rd, imm -> lui rd, %hi(imm)
+           'addi {0}, {0}, %lo({1})'],          #               addi rd, rd, %lo(imm)
 }
 
 opcode = {
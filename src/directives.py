@@ -0,0 +1,167 @@
+"""
+Data and section directives.
+
+    .text / .data / .section .text|.data    switch section, .data is placed right after .text
+    .word w, ...        32-bit words, may be labels
+    .half h, ...        16-bit values
+    .byte b, ...        8-bit values
+    .space n[, fill]    n bytes of fill (0 by default)
+    .align n            pads with zeros to a multiple of 2**n bytes
+    .incbin "file"[, skip[, count]]     bytes of a file, memory-mapped rather than read
+
+Instructions and .word must be 4-byte aligned in .text.
+"""
+import sys
+
+from src.errors import DirectiveError, InvalidArgumentError
+from src.helpers import get_imm_value
+
+TEXT = '.text'
+DATA = '.data'
+sections = [TEXT, DATA]
+
+# Directives that emit bytes
+data_directives = ['.word', '.half', '.byte', '.space', '.align', '.incbin']
+
+_value_sizes = {'.half': 2, '.byte': 1}
+
+def get_section(
+    op: str,
+    args: list[str]
+) -> str | None:
+    """Section selected by a section directive, None for other operations."""
+    if op in sections and not args:
+        return op
+    if op == '.section':
+        if len(args) != 1 or args[0] not in sections:
+            raise DirectiveError(f"Unsupported section: {', '.join(args)}")
+        return args[0]
+    return None
+
+def _int(
+    arg: str,
+    op: str
+) -> int:
+    try:
+        return int(arg)
+    except ValueError:
+        raise InvalidArgumentError(f"Invalid {op} value: {arg}")
+
+def _count(
+    args: list[str],
+    op: str,
+    minimum: int,
+    maximum: int
+) -> None:
+    if not minimum <= len(args) <= maximum:
+        raise InvalidArgumentError(f"Invalid number of arguments for {op}: {', '.join(args)}")
+
+def align_padding(
+    args: list[str],
+    address: int
+) -> int:
+    """Number of bytes .align adds at address."""
+    _count(args, '.align', 1, 1)
+    power = _int(args[0], '.align')
+    if not 0 <= power <= 16:
+        raise InvalidArgumentError(f"Invalid .align value: {args[0]}")
+    return -address % (1 << power)
+
+def map_file(
+    path: str
+) -> memoryview:
+    """Read-only view of a whole file, memory-mapped so that it is not copied into Python objects."""
+    import mmap
+    with open(path, 'rb') as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return memoryview(b'')
+    return memoryview(mapped)
+
+def incbin_view(
+    args: list[str]
+) -> memoryview:
+    """Bytes included by .incbin, the file name is resolved by src.preprocess."""
+    _count(args, '.incbin', 1, 3)
+    try:
+        view = map_file(args[0])
+    except OSError:
+        raise DirectiveError(f"Cannot read .incbin file: {args[0]}")
+    skip = _int(args[1], '.incbin') if len(args) > 1 else 0
+    count = _int(args[2], '.incbin') if len(args) > 2 else len(view) - skip
+    if skip < 0 or count < 0 or skip + count > len(view):
+        raise InvalidArgumentError(f"Invalid .incbin range: {', '.join(args)}")
+    return view[skip:skip + count]
+
+def data_size(
+    op: str,
+    args: list[str],
+    address: int
+) -> int:
+    """Number of bytes a data directive emits at address, without resolving labels."""
+    if op == '.word':
+        return 4 * len(args)
+    elif op in _value_sizes:
+        return _value_sizes[op] * len(args)
+    elif op == '.space':
+        _count(args, op, 1, 2)
+        return _int(args[0], op)
+    elif op == '.align':
+        return align_padding(args, address)
+    else:
+        return len(incbin_view(args))
+
+def encode_data(
+    op: str,
+    args: list[str],
+    address: int,
+    metadata: dict
+) -> bytes | memoryview:
+    """
+    Encodes a data directive into little-endian bytes.
+
+    :param op: data directive
+    :type op: str
+    :param args: operands, as returned by tokenize
+    :type args: list[str]
+    :param address: address of the first byte, for .align
+    :type address: int
+    :param metadata: dictionary containing labels and address, for .word labels
+    :type metadata: dict
+    :return: emitted bytes, a view of the mapped file for .incbin
+    :rtype: bytes | memoryview
+    """
+    if op == '.word':
+        return b''.join((get_imm_value(arg, metadata) & 0xFFFFFFFF).to_bytes(4, 'little') for arg in args)
+    elif op in _value_sizes:
+        size = _value_sizes[op]
+        data = bytearray()
+        for arg in args:
+            value = _int(arg, op)
+            if not -(1 << (8 * size - 1)) <= value < 1 << (8 * size):
+                raise InvalidArgumentError(f"{op} value out of range: {arg}")
+            data += (value & ((1 << 8 * size) - 1)).to_bytes(size, 'little')
+        return bytes(data)
+    elif op == '.space':
+        _count(args, op, 1, 2)
+        size = _int(args[0], op)
+        fill = _int(args[1], op) if len(args) > 1 else 0
+        if size < 0 or not -128 <= fill < 256:
+            raise InvalidArgumentError(f"Invalid .space arguments: {', '.join(args)}")
+        return bytes([fill & 0xFF]) * size
+    elif op == '.align':
+        return bytes(align_padding(args, address))
+    elif op == '.incbin':
+        return incbin_view(args)
+    raise DirectiveError(f"Unknown directive: {op}")
+
+def as_words(
+    data: bytes | memoryview
+) -> memoryview | list[int]:
+    """Little-endian bytes, a multiple of 4 long, as 32-bit words; a view of them on little-endian hosts."""
+    view = memoryview(data)
+    if sys.byteorder == 'little':
+        return view.cast('B').cast('I')
+    return [int.from_bytes(view[offset:offset + 4], 'little') for offset in range(0, len(view), 4)]
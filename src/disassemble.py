@@ -0,0 +1,206 @@
+import sys
+from typing import NamedTuple
+
+import numpy as np
+
+from src.constants import opcode
+
+# Mnemonics indexed by the ids returned by decode
+mnemonics = list(opcode)
+opcode_types = [opcode[op][1] for op in mnemonics]
+
+def _build_lookup() -> np.ndarray:
+    """
+    Reverse index of the opcode table, from the 17-bit key opcode | funct3 << 7 | funct7 << 10 to a mnemonic id.
+
+    Fields a type does not use (funct7 for most, funct3 for U and J) are immediate bits, so every value of them maps to the mnemonic.
+    """
+    lookup = np.full(1 << 17, -1, dtype=np.int16)
+    for mnemonic_id, op in enumerate(mnemonics):
+        info = opcode[op]
+        op_bits, opcode_type = int(info[0], 2), info[1]
+        if opcode_type in ['R', 'SI']:
+            funct3s, funct7s = [int(info[3], 2)], [int(info[2], 2)]
+        elif opcode_type in ['I', 'LI', 'JI', 'S', 'B']:
+            funct3s, funct7s = [int(info[2], 2)], range(128)
+        else:
+            funct3s, funct7s = range(8), range(128)
+        for funct3 in funct3s:
+            for funct7 in funct7s:
+                lookup[op_bits | funct3 << 7 | funct7 << 10] = mnemonic_id
+    return lookup
+
+# Built once at import
+_lookup = _build_lookup()
+_type_codes = {opcode_type: code for code, opcode_type in enumerate(['R', 'I', 'SI', 'LI', 'JI', 'S', 'B', 'U', 'J'])}
+_mnemonic_type_codes = np.array([_type_codes[opcode_type] for opcode_type in opcode_types], dtype=np.int8)
+
+class Decoded(NamedTuple):
+    """Fields of decoded words, as parallel arrays."""
+    mnemonic: np.ndarray    # mnemonic id, index into mnemonics, -1 for invalid words
+    rd: np.ndarray
+    rs1: np.ndarray
+    rs2: np.ndarray
+    imm: np.ndarray         # sign-extended immediate, shift amount for SI-type, imm[31:12] for U-type
+
+def decode(
+    words: np.ndarray
+) -> Decoded:
+    """
+    Decodes an array of 32-bit words at once, with field extraction and sign-extension vectorized over the array.
+
+    :param words: encoded words
+    :type words: np.ndarray
+    :return: decoded fields
+    :rtype: Decoded
+    """
+    words = np.asarray(words, dtype=np.uint32)
+    signed = words.view(np.int32)
+
+    mnemonic = _lookup[(words & 0x7F) | ((words >> 12) & 0x7) << 7 | (words >> 25) << 10]
+    type_code = np.where(mnemonic >= 0, _mnemonic_type_codes[mnemonic], -1)
+
+    rd = ((words >> 7) & 0x1F).astype(np.int8)
+    rs1 = ((words >> 15) & 0x1F).astype(np.int8)
+    rs2 = ((words >> 20) & 0x1F).astype(np.int8)
+
+    imm_i = signed >> 20
+    imm_s = (signed >> 25) << 5 | ((words >> 7) & 0x1F).astype(np.int32)
+    imm_b = ((signed >> 31) << 12
+             | ((words >> 7) & 0x1).astype(np.int32) << 11
+             | ((words >> 25) & 0x3F).astype(np.int32) << 5
+             | ((words >> 8) & 0xF).astype(np.int32) << 1)
+    imm_u = (words >> 12).astype(np.int32)
+    imm_j = ((signed >> 31) << 20
+             | ((words >> 12) & 0xFF).astype(np.int32) << 12
+             | ((words >> 20) & 0x1).astype(np.int32) << 11
+             | ((words >> 21) & 0x3FF).astype(np.int32) << 1)
+    imm_shamt = ((words >> 20) & 0x1F).astype(np.int32)
+
+    imm = np.select(
+        [
+            np.isin(type_code, [_type_codes['I'], _type_codes['LI'], _type_codes['JI']]),
+            type_code == _type_codes['SI'],
+            type_code == _type_codes['S'],
+            type_code == _type_codes['B'],
+            type_code == _type_codes['U'],
+            type_code == _type_codes['J'],
+        ],
+        [imm_i, imm_shamt, imm_s, imm_b, imm_u, imm_j],
+        0,
+    ).astype(np.int32)
+
+    return Decoded(mnemonic, rd, rs1, rs2, imm)
+
+def format_instruction(
+    decoded: Decoded,
+    index: int
+) -> str:
+    """Formats one decoded word as assembly text that assembles back to the same word."""
+    mnemonic_id = int(decoded.mnemonic[index])
+    if mnemonic_id < 0:
+        return '<invalid>'
+
+    op, opcode_type = mnemonics[mnemonic_id], opcode_types[mnemonic_id]
+    rd, rs1, rs2, imm = (int(field[index]) for field in decoded[1:])
+    if opcode_type == 'R':
+        return f'{op} r{rd}, r{rs1}, r{rs2}'
+    elif opcode_type in ['I', 'SI', 'JI']:
+        return f'{op} r{rd}, r{rs1}, {imm}'
+    elif opcode_type == 'LI':
+        return f'{op} r{rd}, {imm}(r{rs1})'
+    elif opcode_type == 'S':
+        return f'{op} r{rs2}, {imm}(r{rs1})'
+    elif opcode_type == 'B':
+        return f'{op} r{rs1}, r{rs2}, {imm}'
+    else:
+        # U and J
+        return f'{op} r{rd}, {imm}'
+
+def disassemble(
+    words: np.ndarray
+) -> list[str]:
+    """
+    Disassembles 32-bit words into assembly text, one line per word.
+
+    :param words: encoded words
+    :type words: np.ndarray
+    :return: assembly text of each word
+    :rtype: list[str]
+    """
+    decoded = decode(words)
+    return [format_instruction(decoded, index) for index in range(len(decoded.mnemonic))]
+
+def load_image(
+    file_name: str
+) -> np.ndarray:
+    """
+    Loads an assembled image as a uint32 array, without a Python loop per word.
+
+    '.bin' files are raw little-endian words, '.hex' files one hex word per line ($readmemh) and anything else one binary string per line ('.list').
+
+    :param file_name: image file path
+    :type file_name: str
+    :return: encoded words
+    :rtype: np.ndarray
+    """
+    if file_name.endswith('.bin'):
+        data = np.fromfile(file_name, dtype=np.uint8)
+        if len(data) % 4:
+            raise ValueError(f"{file_name}: size is not a multiple of 4 bytes")
+        return data.view('<u4').astype(np.uint32)
+
+    with open(file_name, 'rb') as file:
+        data = file.read()
+    if not data:
+        # Empty or label-only program
+        return np.zeros(0, np.uint32)
+    if not data.endswith(b'\n'):
+        data += b'\n'
+
+    # One fixed-width line per word: digits then a newline
+    is_hex = file_name.endswith('.hex')
+    width = 9 if is_hex else 33
+    if len(data) % width:
+        raise ValueError(f"{file_name}: expected lines of {width - 1} {'hex' if is_hex else 'binary'} digits")
+    records = np.frombuffer(data, dtype=np.uint8).reshape(-1, width)
+    digits = records[:, :-1]
+    if is_hex:
+        lower = digits | 0x20
+        valid = ((digits >= ord('0')) & (digits <= ord('9'))) | ((lower >= ord('a')) & (lower <= ord('f')))
+    else:
+        valid = (digits == ord('0')) | (digits == ord('1'))
+    invalid = np.flatnonzero(~valid.all(axis=1) | (records[:, -1] != ord('\n')))
+    if len(invalid):
+        raise ValueError(f"{file_name}: invalid word on line {invalid[0] + 1}")
+
+    if is_hex:
+        # '0'-'9' -> 0-9, 'a'-'f' and 'A'-'F' -> 10-15
+        values = np.where(digits <= ord('9'), digits - ord('0'), (digits | 0x20) - ord('a') + 10).astype(np.uint32)
+        return (values << np.arange(28, -1, -4, dtype=np.uint32)).sum(axis=1, dtype=np.uint32)
+
+    bits = (digits - ord('0')).astype(np.uint32)
+    return (bits << np.arange(31, -1, -1, dtype=np.uint32)).sum(axis=1, dtype=np.uint32)
+
+def verify(
+    words: np.ndarray,
+    reference: np.ndarray
+) -> np.ndarray:
+    """
+    Compares an image against reference encodings.
+
+    :param words: encoded words
+    :type words: np.ndarray
+    :param reference: expected words
+    :type reference: np.ndarray
+    :return: indices of the words that differ from the reference or do not decode to an instruction
+    :rtype: np.ndarray
+    """
+    words = np.asarray(words, dtype=np.uint32)
+    reference = np.asarray(reference, dtype=np.uint32)
+    if words.shape != reference.shape:
+        raise ValueError(f"Image has {len(words)} words, reference has {len(reference)}")
+    return np.flatnonzero((words != reference) | (decode(words).mnemonic < 0))
+
+if __name__ == "__main__":
+    print('\n'.join(disassemble(load_image(sys.argv[1]))))
@@ -0,0 +1,87 @@
+from src.constants import opcode
+from src.errors import InvalidOperationError
+
+def _base_word(
+    info: tuple
+) -> int:
+    """Packs the fixed opcode, funct3 and funct7 fields of an opcode table entry into a 32-bit word."""
+    opcode_type = info[1]
+    word = int(info[0], 2)
+    if opcode_type in ['R', 'SI']:
+        word |= int(info[2], 2) << 25 | int(info[3], 2) << 12
+    elif opcode_type in ['I', 'LI', 'JI', 'S', 'B']:
+        word |= int(info[2], 2) << 12
+    return word
+
+# Per-mnemonic base words, only register and immediate fields are left to fill in
+base_words = {op: _base_word(info) for op, info in opcode.items()}
+
+def encode_r(base: int, rd: int, rs1: int, rs2: int) -> int:
+    """funct7 | rs2 | rs1 | funct3 | rd | opcode"""
+    return base | rs2 << 20 | rs1 << 15 | rd << 7
+
+def encode_i(base: int, rd: int, rs1: int, imm: int) -> int:
+    """imm[11:0] | rs1 | funct3 | rd | opcode"""
+    return base | (imm & 0xFFF) << 20 | rs1 << 15 | rd << 7
+
+def encode_si(base: int, rd: int, rs1: int, shamt: int) -> int:
+    """funct7 | shamt[4:0] | rs1 | funct3 | rd | opcode"""
+    return base | (shamt & 0x1F) << 20 | rs1 << 15 | rd << 7
+
+def encode_s(base: int, rs2: int, rs1: int, imm: int) -> int:
+    """imm[11:5] | rs2 | rs1 | funct3 | imm[4:0] | opcode"""
+    return base | (imm >> 5 & 0x7F) << 25 | rs2 << 20 | rs1 << 15 | (imm & 0x1F) << 7
+
+def encode_b(base: int, rs1: int, rs2: int, imm: int) -> int:
+    """imm[12|10:5] | rs2 | rs1 | funct3 | imm[4:1|11] | opcode"""
+    return (base
+            | (imm >> 12 & 0x1) << 31
+            | (imm >> 5 & 0x3F) << 25
+            | rs2 << 20
+            | rs1 << 15
+            | (imm >> 1 & 0xF) << 8
+            | (imm >> 11 & 0x1) << 7)
+
+def encode_u(base: int, rd: int, imm: int) -> int:
+    """imm[31:12] | rd | opcode"""
+    return base | (imm & 0xFFFFF) << 12 | rd << 7
+
+def encode_j(base: int, rd: int, imm: int) -> int:
+    """imm[20|10:1|11|19:12] | rd | opcode"""
+    return (base
+            | (imm >> 20 & 0x1) << 31
+            | (imm >> 1 & 0x3FF) << 21
+            | (imm >> 11 & 0x1) << 20
+            | (imm >> 12 & 0xFF) << 12
+            | rd << 7)
+
+# Operands are passed in the order they appear in the assembly source
+encoders = {
+    'R': encode_r,      # rd, rs1, rs2
+    'I': encode_i,      # rd, rs1, imm
+    'SI': encode_si,    # rd, rs1, shamt
+    'LI': encode_i,     # rd, rs1, offset
+    'JI': encode_i,     # rd, rs1, offset
+    'S': encode_s,      # rs2, rs1, offset
+    'B': encode_b,      # rs1, rs2, offset
+    'U': encode_u,      # rd, imm
+    'J': encode_j,      # rd, offset
+}
+
+def encode(
+    op: str,
+    opcode_type: str,
+    operands: tuple[int, ...] | list[int],
+) -> int:
+    """Packs an instruction into a 32-bit word from its integer operands."""
+    try:
+        encoder = encoders[opcode_type]
+    except KeyError:
+        raise InvalidOperationError(f"Invalid opcode type: {opcode_type}")
+    return encoder(base_words[op], *operands)
+
+def to_binary(
+    word: int
+) -> str:
+    """Formats a 32-bit word as a binary string, as written to the output."""
+    return format(word, '032b')
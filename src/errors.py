@@ -16,4 +16,22 @@ class InvalidRegisterError(AssemblyError):
 
 class InvalidArgumentError(AssemblyError):
     """Exception raised for invalid arguments."""
-    pass
\ No newline at end of file
+    pass
+
+class UndefinedLabelError(InvalidArgumentError):
+    """Exception raised for references to labels that are not defined."""
+    def __init__(self, message: str, label: str = ''):
+        super().__init__(message)
+        self.label = label
+
+class DuplicateLabelError(AssemblyError):
+    """Exception raised for labels defined more than once."""
+    pass
+
+class DirectiveError(AssemblyError):
+    """Exception raised for invalid directives."""
+    pass
+
+class LinkError(AssemblyError):
+    """Exception raised for errors while linking objects."""
+    pass
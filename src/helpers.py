@@ -1,7 +1,7 @@
-import re
-
 from src.constants import *
+from src.encoder import encode, encoders, to_binary
 from src.errors import *
+from src.lexer import split_memory_operand, tokenize
 
 def get_instruction(
     op: str,
@@ -9,109 +9,113 @@ def get_instruction(
     args: list[str],    
 ) -> str:
     """Generates the binary instruction based on opcode type and arguments."""
-    # fix imm parsing (resolved)
+    # args are binary strings as returned by get_args, immediates are sign-extended before packing
     if opcode_type == 'R':
-        funct7 = opcode[op][2]
-        funct3 = opcode[op][3]
-        rd, rs1, rs2 = args[1], args[2], args[3]
-        instruction = funct7 + rs2 + rs1 + funct3 + rd + opcode[op][0]
-    
-    elif opcode_type == 'I':
-        funct3 = opcode[op][2]
-        rd, rs1, imm = args[1], args[2], args[3]
-        assert len(imm) == 12, "Immediate must be 12 bits for I-type"
-        instruction = imm + rs1 + funct3 + rd + opcode[op][0]
-    
-    elif opcode_type == 'SI':
-        funct7 = opcode[op][2]
-        funct3 = opcode[op][3]
-        rd, rs1, imm = args[1], args[2], args[3][-5:] # shamt
-        assert len(imm) == 5, "Shift amount must be 5 bits for SI-type"
-        instruction = funct7 + imm + rs1 + funct3 + rd + opcode[op][0]
-    
-    elif opcode_type in ['LI', 'JI']: # add JI-type too (resolved)
-        funct3 = opcode[op][2]
-        rd, rs1, imm = args[1], args[2], args[3]
-        instruction = imm + rs1 + funct3 + rd + opcode[op][0]
-    
-    elif opcode_type == 'S':
-        funct3 = opcode[op][2]
-        rs2, rs1, imm = args[1], args[2], args[3]
-        imm_high = imm[:7] # imm[11:5]
-        imm_low = imm[7:] # imm[4:0]
-        instruction = imm_high + rs2 + rs1 + funct3 + imm_low + opcode[op][0]
-    
-    elif opcode_type == 'B':
-        funct3 = opcode[op][2]
-        rs1, rs2, imm = args[1], args[2], args[3]
-        imm_bits = imm
-        imm_12 = imm_bits[0]          # imm[12]
-        imm_10_5 = imm_bits[1:7]      # imm[10:5]
-        imm_4_1 = imm_bits[7:11]      # imm[4:1]
-        imm_11 = imm_bits[11]         # imm[11]
-        instruction = imm_12 + imm_10_5 + rs2 + rs1 + funct3 + imm_4_1 + imm_11 + opcode[op][0]
-
-    elif opcode_type == 'U':
-        rd, imm = args[1], args[2]
-        instruction = imm + rd + opcode[op][0]
-    
-    elif opcode_type == 'J':
-        rd, imm = args[1], args[2]
-        instruction = imm + rd + opcode[op][0]
-    
+        operands = [int(arg, 2) for arg in args[1:]]
+    elif opcode_type in encoders:
+        *registers, imm = args[1:]
+        operands = [int(reg, 2) for reg in registers] + [_signed(imm)]
     else:
         raise InvalidOperationError(f"Invalid opcode type: {opcode_type}")
 
-    return instruction
-    
-def get_args(
+    return to_binary(encode(op, opcode_type, operands))
+
+def _signed(
+    bits: str
+) -> int:
+    """Interprets a binary string as a two's complement value."""
+    value = int(bits, 2)
+    if bits[0] == '1':
+        value -= 1 << len(bits)
+    return value
+
+def check_args(
     op: str,
-    non_op: str,
+    args: list[str],
     opcode_type: str,
-    metadata: dict,
-) -> list[str]: # include opcode too
-    """Parses the all the parts into arguments based on opcode type."""
-    args = [arg.strip() for arg in non_op.split(',')]
-
+) -> list[str]:
+    """Validates the arguments of an instruction and returns them in operand order (registers..., imm)."""
     # Valid number of arguments
     if opcode_type in ['R', 'I', 'SI', 'JI', 'B']:
         if len(args) != 3:
-            raise InvalidArgumentError(f"Invalid number of arguments for {opcode_type}-type instruction: {op} {non_op}")
+            raise InvalidArgumentError(f"Invalid number of arguments for {opcode_type}-type instruction: {op} {', '.join(args)}")
 
-    elif opcode_type in ['LI', 'S', 'J']:
+    elif opcode_type in ['LI', 'S', 'U', 'J']:
         if len(args) != 2:
-            raise InvalidArgumentError(f"Invalid number of arguments for {opcode_type}-type instruction: {op} {non_op}")
+            raise InvalidArgumentError(f"Invalid number of arguments for {opcode_type}-type instruction: {op} {', '.join(args)}")
 
-    # handling for labels and using metadata (resolved using get_imm)
-    # completely wrong, handle funct7, funct3, opcode properly (resolved, do this in get_instruction)
+    else:
+        raise InvalidOperationError(f"Invalid opcode type: {opcode_type}")
 
     # Modify for S-type and LI-type
     if opcode_type in ['S', 'LI']:
         # args: rs2, offset(rs1)
-        match = re.match(r'(-?\d+)\s*\(\s*(r[0-9]|1[0-9]|2[0-9]|3[0-1])\s*\)', args[1])
-        if not match:
-            raise InvalidArgumentError(f"Invalid S-type or LI-type argument format: {args[1]}")
-        offset = match.group(1)
-        rs1 = match.group(2)
+        offset, rs1 = split_memory_operand(args[1])
         args = [args[0], rs1, offset]  # rs2, rs1, offset
 
-        return [opcode[op][0]] + [get_register(args[0]), get_register(args[1]), get_imm(args[2], metadata, type=opcode_type)]
-    
-    elif opcode_type in ['J']:
-        # args: rd, label
-        return [opcode[op][0]] + [get_register(args[0]), get_imm(args[1], metadata, type=opcode_type)]
-    
-    elif opcode_type in ['R']:
+    return args
+
+def get_args(
+    op: str,
+    non_op: str,
+    opcode_type: str,
+    metadata: dict,
+) -> list[str]: # include opcode too
+    """Parses the all the parts into arguments based on opcode type."""
+    args = check_args(op, [arg.strip() for arg in non_op.split(',')], opcode_type)
+
+    if opcode_type == 'R':
         # args: rd, rs1, rs2
-        return [opcode[op][0]] + [get_register(args[0]), get_register(args[1]), get_register(args[2])]
+        return [opcode[op][0]] + [get_register(arg) for arg in args]
 
-    elif opcode_type in ['I', 'SI', 'JI', 'B']:
-        # args: rd, rs1, imm
-        return [opcode[op][0]] + [get_register(args[0]), get_register(args[1]), get_imm(args[2], metadata, type=opcode_type)]
-    
+    # args: registers..., imm
+    *regs, imm = args
+    return [opcode[op][0]] + [get_register(reg) for reg in regs] + [get_imm(imm, metadata, type=opcode_type)]
+
+def get_imm_value(
+    imm_str: str,
+    metadata: dict,
+) -> int:
+    """Resolves an immediate value or label to an integer."""
+    try:
+        return int(imm_str)
+    except ValueError:
+        if imm_str in metadata['labels']:
+            return metadata['labels'][imm_str]
+        elif imm_str.isidentifier():
+            raise UndefinedLabelError(f"Undefined label: {imm_str}", imm_str)
+        else:
+            raise InvalidArgumentError(f"Invalid immediate value: {imm_str}")
+
+# Byte offset range of B and J-type immediates, relative to the address of the instruction
+offset_ranges = {'B': (-4096, 4094), 'J': (-(1 << 20), (1 << 20) - 2)}
+
+def get_offset(
+    imm_str: str,
+    metadata: dict,
+    opcode_type: str,
+    address: int
+) -> int:
+    """Resolves a B or J-type target to an offset from address, labels are made relative and literals are offsets already."""
+    labels = metadata.get('labels', {})
+    if imm_str in labels:
+        offset = labels[imm_str] - address
     else:
-        raise InvalidOperationError(f"Invalid opcode type: {opcode_type}")
-    
+        offset = get_imm_value(imm_str, metadata)   # a literal, or raises for an undefined label
+    return check_offset(offset, opcode_type, imm_str)
+
+def check_offset(
+    offset: int,
+    opcode_type: str,
+    imm_str: str
+) -> int:
+    """Validates a B or J-type offset, imm_str is the operand it comes from, for errors."""
+    low, high = offset_ranges[opcode_type]
+    if not low <= offset <= high:
+        raise InvalidArgumentError(f"{opcode_type}-type offset out of range: {imm_str} ({offset:+d} bytes)")
+    if offset % 2:
+        raise InvalidArgumentError(f"{opcode_type}-type offset is odd: {imm_str} ({offset:+d} bytes)")
+    return offset
 
 def get_imm(
     imm_str: str,
@@ -119,17 +123,13 @@ def get_imm(
     type: str = 'I'
 ) -> str:
     """Validates an immediate value"""
-    # handle different bit-widths based on instruction type (resolved)
     # I-type: 12 bits, S-type: 12 bits, B-type: 12 bits, U-type: 20 bits, J-type: 20 bits
-    try:
-        imm = int(imm_str)
-    except ValueError:
-        if imm_str in metadata['labels']:
-            return format(metadata['labels'][imm_str], '012b')
-        else:
-            raise InvalidArgumentError(f"Invalid immediate value: {imm_str}")
+    if type in offset_ranges:
+        imm = get_offset(imm_str, metadata, type, metadata.get('address', 0))
+    else:
+        imm = get_imm_value(imm_str, metadata)
     
-    if type in ['I', 'S', 'B', 'LI', 'SI']: # handle splitting in two parts in get_instruction
+    if type in ['I', 'S', 'B', 'LI', 'SI', 'JI']: # handle splitting in two parts in get_instruction
         # 12-bit immediate
         bits = 12
     elif type in ['U', 'J']:
@@ -141,13 +141,20 @@ def get_imm(
     imm = imm & ((1 << bits) - 1)  # Mask to required bits
     return format(imm, f'0{bits}b')
 
-def get_register(
+def get_register_num(
     reg_str: str
 ) -> int:
-    """Converts a register string to its integer representation."""
-    if not re.match(r'r[0-9]|1[0-9]|2[0-9]|3[0-1]', reg_str):
+    """Converts a register string to its register number."""
+    try:
+        return registers[reg_str]
+    except KeyError:
         raise InvalidRegisterError(f"Invalid register: {reg_str}")
-    return format(int(reg_str[1:]), '05b')
+
+def get_register(
+    reg_str: str
+) -> str:
+    """Converts a register string to its 5-bit binary representation."""
+    return format(get_register_num(reg_str), '05b')
 
 def get_opcode_type(
     op: str
@@ -165,16 +172,13 @@ def parse_op(
     line: str
 ) -> tuple[str, str]:
     """Parses a line into operation and non-operation parts."""
-
-    line = line.strip()
-    match = re.search(r'\s*(\w+)\s+([^#]*)', line)
-    if not match:
-        label = re.match(r'\s*(\w+:)', line)
-        if label:
-            return label.group(1).lower(), ''
-        else:
-            raise MissingOperationError(f"Missing operation in line: {line}")
-    return match.group(1).lower(), match.group(2).lower()
+    statement = tokenize(line)
+    if statement.mnemonic:
+        return statement.mnemonic, ', '.join(statement.operands)
+    elif statement.label is not None:
+        return statement.label + ':', ''
+    else:
+        raise MissingOperationError(f"Missing operation in line: {line.strip()}")
 
 def handle_address_and_label(
     op: str,
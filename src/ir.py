@@ -0,0 +1,462 @@
+"""
+Compact intermediate representation of a parsed program.
+
+A Program holds one row per statement in parallel array columns instead of one object per line: the operation id, up
+to three register numbers, the immediate, the symbol the immediate refers to, the label defined on the row and the
+source line. Registers are in encoder order (the base register second for S and LI-type), pseudo-instructions keep
+theirs in operand order and are expanded when encoded. Directive operands are kept as text, in a list the immediate
+column indexes.
+
+build parses the statements yielded by src.preprocess once, raising operand errors in line order. The peephole
+optimizer, branch relaxation, the assemblers and the batch encoder then read integers back from the columns.
+"""
+from array import array
+from typing import Iterable
+
+from src.cache import line_cache
+from src.constants import opcode, pseudo, symbol_directives
+from src.directives import TEXT, data_directives, data_size, get_section, sections
+from src.encoder import encode
+from src.errors import DuplicateLabelError, InvalidArgumentError, InvalidOperationError, UndefinedLabelError
+from src.helpers import check_args, check_offset, get_imm_value, get_register_num, offset_ranges
+from src.lexer import Statement
+from src.pseudo import expand_operands, expansions, expansions_long, get_expansion, select_expansion
+
+# Operation id -> operation, 0 for rows that only define a label
+operations = [None, *opcode, *pseudo, *data_directives, *sections, '.section', *symbol_directives]
+operation_ids = {op: id for id, op in enumerate(operations)}
+
+# Operation id -> opcode type, 'PSEUDO' or 'DIRECTIVE'
+operation_types = [None] + [
+    opcode[op][1] if op in opcode else 'PSEUDO' if op in pseudo else 'DIRECTIVE'
+    for op in operations[1:]
+]
+
+# Opcode type -> number of register operands
+register_counts = {'R': 3, 'I': 2, 'SI': 2, 'LI': 2, 'JI': 2, 'S': 2, 'B': 2, 'U': 1, 'J': 1}
+
+NONE = -1   # symbol of a literal immediate, label of a row without one
+
+# Column attributes, in the order of the row tuples returned by Program.row
+_columns = ('ops', 'reg1', 'reg2', 'reg3', 'imms', 'symbols', 'labels', 'lines')
+_typecodes = ('H', 'B', 'B', 'B', 'q', 'i', 'i', 'I')
+
+_BUILD_CHUNK = 4096     # rows parsed before they are moved into the columns
+
+class Program:
+    """A parsed program, one row per statement in array columns."""
+    __slots__ = (*_columns, 'names', 'symbol_ids', 'args')
+
+    def __init__(
+        self,
+        names: list[str] | None = None,
+        symbol_ids: dict[str, int] | None = None,
+        args: list[list[str]] | None = None
+    ) -> None:
+        self.ops = array('H')       # operation id
+        self.reg1 = array('B')      # register operands, 0 when unused
+        self.reg2 = array('B')
+        self.reg3 = array('B')
+        self.imms = array('q')      # literal immediate, index into args for directives
+        self.symbols = array('i')   # symbol id of a label immediate, NONE for literals
+        self.labels = array('i')    # symbol id of the label defined on the row, or NONE
+        self.lines = array('I')     # 1-based source line
+        self.names = [] if names is None else names                 # symbol id -> name
+        self.symbol_ids = {} if symbol_ids is None else symbol_ids  # name -> symbol id
+        self.args = [] if args is None else args                    # operands of directives, as tokenized
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def symbol_id(
+        self,
+        name: str
+    ) -> int:
+        """Id of a symbol, added on first use."""
+        id = self.symbol_ids.get(name)
+        if id is None:
+            id = self.symbol_ids[name] = len(self.names)
+            self.names.append(name)
+        return id
+
+    def append(
+        self,
+        row: tuple[int, int, int, int, int, int, int, int]
+    ) -> None:
+        """Appends a row, as returned by row."""
+        op, reg1, reg2, reg3, imm, symbol, label, line = row
+        self.ops.append(op)
+        self.reg1.append(reg1)
+        self.reg2.append(reg2)
+        self.reg3.append(reg3)
+        self.imms.append(imm)
+        self.symbols.append(symbol)
+        self.labels.append(label)
+        self.lines.append(line)
+
+    def extend(
+        self,
+        rows: list[tuple[int, int, int, int, int, int, int, int]]
+    ) -> None:
+        """Appends rows, a column at a time."""
+        for name, column in zip(_columns, zip(*rows)):
+            getattr(self, name).extend(column)
+
+    def row(
+        self,
+        index: int
+    ) -> tuple[int, int, int, int, int, int, int, int]:
+        """(op, reg1, reg2, reg3, imm, symbol, label, line) of a row."""
+        return tuple(getattr(self, name)[index] for name in _columns)
+
+    def parse(
+        self,
+        line_number: int,
+        statement: Statement
+    ) -> tuple[int, int, int, int, int, int, int, int]:
+        """Parses a statement into a row, adding its symbols and directive operands to the program."""
+        label, op, args, _ = statement
+        label_id = NONE if label is None else self.symbol_id(label)
+        if op is None:
+            return (0, 0, 0, 0, 0, NONE, label_id, line_number)
+
+        op_id = operation_ids.get(op)
+        if op_id is None:
+            raise InvalidOperationError(f"Invalid operation: {op}")
+        opcode_type = operation_types[op_id]
+        if opcode_type == 'DIRECTIVE':
+            self.args.append(args)
+            return (op_id, 0, 0, 0, len(self.args) - 1, NONE, label_id, line_number)
+
+        if opcode_type == 'PSEUDO':
+            kinds = get_expansion(op, args).kinds
+            if len(args) != len(kinds):
+                raise InvalidArgumentError(f"Invalid number of arguments for pseudo-instruction: {op} {', '.join(args)}")
+            regs = [get_register_num(arg) for arg, kind in zip(args, kinds) if kind == 'reg']
+            imm_str = args[-1] if kinds and kinds[-1] == 'imm' else None
+        else:
+            args = check_args(op, args, opcode_type)
+            count = register_counts[opcode_type]
+            regs = [get_register_num(arg) for arg in args[:count]]
+            imm_str = args[count] if count < len(args) else None
+
+        imm, symbol = 0, NONE
+        if imm_str is not None:
+            try:
+                imm = int(imm_str)
+            except ValueError:
+                symbol = self.symbol_id(imm_str)
+            if not -(1 << 63) <= imm < 1 << 63:
+                raise InvalidArgumentError(f"Invalid immediate value: {imm_str}")
+            # Loaded as a 32-bit constant, signed or unsigned
+            if op in expansions_long and not -(1 << 31) <= imm < 1 << 32:
+                raise InvalidArgumentError(f"Immediate out of range for {op}: {imm_str}")
+        regs += [0] * (3 - len(regs))
+        return (op_id, *regs, imm, symbol, label_id, line_number)
+
+    def splice(
+        self,
+        replacements: dict[int, list[tuple]]
+    ) -> 'Program':
+        """Copy of the program with the rows at some indices replaced by other rows, none to remove them; symbols are shared."""
+        program = Program(self.names, self.symbol_ids, self.args)
+        start = 0
+        for index in sorted(replacements):
+            for name in _columns:
+                getattr(program, name).extend(getattr(self, name)[start:index])
+            for row in replacements[index]:
+                program.append(row)
+            start = index + 1
+        for name in _columns:
+            getattr(program, name).extend(getattr(self, name)[start:])
+        return program
+
+    def replace(
+        self,
+        start: int,
+        stop: int,
+        rows: list[tuple]
+    ) -> 'Program':
+        """Copy of the program with the rows from start to stop replaced by other rows; symbols are shared."""
+        program = Program(self.names, self.symbol_ids, self.args)
+        for name in _columns:
+            getattr(program, name).extend(getattr(self, name)[:start])
+        program.extend(rows)
+        for name in _columns:
+            getattr(program, name).extend(getattr(self, name)[stop:])
+        return program
+
+    def take(
+        self,
+        indices: Iterable[int]
+    ) -> 'Program':
+        """Copy of the program with only some rows, in the given order; symbols are shared."""
+        program = Program(self.names, self.symbol_ids, self.args)
+        indices = list(indices)
+        for name, typecode in zip(_columns, _typecodes):
+            setattr(program, name, array(typecode, map(getattr(self, name).__getitem__, indices)))
+        return program
+
+    def operation(
+        self,
+        index: int
+    ) -> str | None:
+        """Operation of a row, None for label-only rows."""
+        return operations[self.ops[index]]
+
+    def operands(
+        self,
+        index: int
+    ) -> list[str]:
+        """Operands of a row as text, in source order."""
+        op_id = self.ops[index]
+        opcode_type = operation_types[op_id]
+        if opcode_type is None:
+            return []
+        if opcode_type == 'DIRECTIVE':
+            return self.args[self.imms[index]]
+
+        symbol = self.symbols[index]
+        imm = self.names[symbol] if symbol != NONE else str(self.imms[index])
+        regs = [f'r{self.reg1[index]}', f'r{self.reg2[index]}', f'r{self.reg3[index]}']
+        if opcode_type == 'PSEUDO':
+            regs = iter(regs)
+            return [next(regs) if kind == 'reg' else imm for kind in expansions[operations[op_id]].kinds]
+        if opcode_type == 'R':
+            return regs
+        if opcode_type in ['S', 'LI']:
+            return [regs[0], f'{imm}({regs[1]})']
+        return regs[:register_counts[opcode_type]] + [imm]
+
+def build(
+    statements: Iterable[tuple[int, Statement]]
+) -> Program:
+    """
+    Parses statements into a program.
+
+    :param statements: (line number, statement), as yielded by src.preprocess
+    :type statements: Iterable[tuple[int, Statement]]
+    :return: program with a row per label or operation, empty lines are dropped
+    :rtype: Program
+    """
+    program = Program()
+    rows = []
+    defined = set()     # symbol ids of the labels defined so far
+    for line_number, statement in statements:
+        if statement.label is not None or statement.mnemonic is not None:
+            row = program.parse(line_number, statement)
+            label = row[6]
+            if label != NONE:
+                if label in defined:
+                    raise DuplicateLabelError(f"Label defined more than once: {statement.label}")
+                defined.add(label)
+            rows.append(row)
+            if len(rows) == _BUILD_CHUNK:
+                program.extend(rows)
+                rows = []
+    program.extend(rows)
+    return program
+
+def concatenate(
+    programs: Iterable[Program]
+) -> Program:
+    """
+    Joins programs built from consecutive parts of a source, as build would have built the whole source.
+
+    :param programs: programs in source order, each with its own symbols and directive operands
+    :type programs: Iterable[Program]
+    :return: program with the rows of every program, symbols renumbered
+    :rtype: Program
+    """
+    program = Program()
+    defined = set()     # symbol ids of the labels defined so far
+    for part in programs:
+        # Symbol id in part -> symbol id in program, NONE (-1) indexes the NONE appended last
+        ids = [program.symbol_id(name) for name in part.names] + [NONE]
+        labels = array('i', map(ids.__getitem__, part.labels))
+        new = set(labels)
+        new.discard(NONE)
+        if not new.isdisjoint(defined):
+            label = next(label for label in labels if label in defined)
+            raise DuplicateLabelError(f"Label defined more than once: {program.names[label]}")
+        defined |= new
+
+        imms = part.imms
+        if part.args:
+            # Directive rows index the operands of part
+            imms = array('q', imms)
+            offset = len(program.args)
+            for index, op_id in enumerate(part.ops):
+                if operation_types[op_id] == 'DIRECTIVE':
+                    imms[index] += offset
+            program.args.extend(part.args)
+
+        for name, column in zip(_columns, (part.ops, part.reg1, part.reg2, part.reg3, imms,
+                                           array('i', map(ids.__getitem__, part.symbols)), labels, part.lines)):
+            getattr(program, name).extend(column)
+    return program
+
+def instruction_count(
+    program: Program,
+    index: int
+) -> int:
+    """Number of words an instruction or .word row assembles into."""
+    return _count(program, program.ops[index], program.imms[index], program.symbols[index])
+
+def parsed_instruction_count(
+    program: Program,
+    row: tuple[int, int, int, int, int, int, int, int]
+) -> int:
+    """Number of words a row returned by Program.parse assembles into, as instruction_count."""
+    return _count(program, row[0], row[4], row[5])
+
+def _count(
+    program: Program,
+    op_id: int,
+    imm: int,
+    symbol: int
+) -> int:
+    opcode_type = operation_types[op_id]
+    if opcode_type == 'PSEUDO':
+        return len(select_expansion(operations[op_id], imm, symbol == NONE).instructions)
+    if opcode_type == 'DIRECTIVE':
+        return len(program.args[imm])
+    return 1
+
+def layout(
+    program: Program,
+    lengthened: set[int] = frozenset()
+) -> tuple[array, int, bool]:
+    """
+    Lays out the .text rows of a program.
+
+    :param program: program to lay out
+    :type program: Program
+    :param lengthened: indices of branches that take 8 bytes, see src.relax
+    :type lengthened: set[int]
+    :return: address of each row (-1 outside .text), the end of .text and whether .text has .align padding
+    :rtype: tuple[array, int, bool]
+    """
+    addresses = array('q')
+    address = 0
+    aligned = False
+    section = TEXT
+    ops, imms, args = program.ops, program.imms, program.args
+    for index in range(len(ops)):
+        addresses.append(address if section == TEXT else -1)
+        op_id = ops[index]
+        opcode_type = operation_types[op_id]
+        if opcode_type is None:
+            continue
+        if opcode_type == 'DIRECTIVE':
+            op = operations[op_id]
+            if op in symbol_directives:
+                continue
+            new_section = get_section(op, args[imms[index]])
+            if new_section is not None:
+                section = new_section
+            elif section == TEXT:
+                aligned = aligned or op == '.align'
+                address += data_size(op, args[imms[index]], address)
+        elif section != TEXT:
+            continue
+        elif index in lengthened:
+            address += 8
+        elif opcode_type == 'PSEUDO':
+            address += 4 * instruction_count(program, index)
+        else:
+            address += 4
+    return addresses, address, aligned
+
+def _undefined(
+    name: str
+) -> InvalidArgumentError:
+    if name.isidentifier():
+        return UndefinedLabelError(f"Undefined label: {name}", name)
+    return InvalidArgumentError(f"Invalid immediate value: {name}")
+
+def encode_row(
+    program: Program,
+    index: int,
+    metadata: dict
+) -> list[int]:
+    """
+    Encodes an instruction or .word row into 32-bit words.
+
+    :param program: parsed program
+    :type program: Program
+    :param index: row index
+    :type index: int
+    :param metadata: dictionary containing labels and address
+    :type metadata: dict
+    :return: encoded words
+    :rtype: list[int]
+    """
+    return _encode(program, program.ops[index], program.reg1[index], program.reg2[index], program.reg3[index],
+                   program.imms[index], program.symbols[index], metadata)
+
+def encode_parsed(
+    program: Program,
+    row: tuple[int, int, int, int, int, int, int, int],
+    metadata: dict
+) -> list[int]:
+    """Encodes a row returned by Program.parse without adding it to the program, as encode_row does."""
+    return _encode(program, *row[:6], metadata)
+
+def _encode(
+    program: Program,
+    op_id: int,
+    reg1: int,
+    reg2: int,
+    reg3: int,
+    imm: int,
+    symbol: int,
+    metadata: dict
+) -> list[int]:
+    op = operations[op_id]
+    opcode_type = operation_types[op_id]
+    if opcode_type == 'DIRECTIVE':
+        if op != '.word':
+            raise InvalidOperationError(f"Invalid operation: {op}")
+        return [get_imm_value(arg, metadata) & 0xFFFFFFFF for arg in program.args[imm]]
+
+    if symbol != NONE:
+        name = program.names[symbol]
+        value = metadata['labels'].get(name)
+        if value is None:
+            raise _undefined(name)
+        return _encode_instruction(op, opcode_type, reg1, reg2, reg3, imm, value, name, metadata['address'])
+
+    # Without a label the words only depend on the row
+    key = (op_id, reg1, reg2, reg3, imm)
+    words = line_cache.get(key)
+    if words is None:
+        words = _encode_instruction(op, opcode_type, reg1, reg2, reg3, imm, imm, None, 0)
+        line_cache.put(key, words)
+    return list(words)
+
+def _encode_instruction(
+    op: str,
+    opcode_type: str,
+    reg1: int,
+    reg2: int,
+    reg3: int,
+    literal: int,
+    imm: int,
+    name: str | None,
+    address: int
+) -> list[int]:
+    """Encodes an instruction, imm being the value of the label name or the literal."""
+    if opcode_type == 'PSEUDO':
+        expansion = select_expansion(op, literal, name is None)
+        regs = iter((reg1, reg2))
+        values = [next(regs) if kind == 'reg' else imm for kind in expansion.kinds]
+        return expand_operands(op, expansion, values, address, name)
+
+    if opcode_type == 'R':
+        return [encode(op, opcode_type, [reg1, reg2, reg3])]
+    if opcode_type in offset_ranges:
+        imm = check_offset(imm - address if name is not None else imm, opcode_type, name or str(imm))
+    if register_counts[opcode_type] == 1:
+        return [encode(op, opcode_type, [reg1, imm])]
+    return [encode(op, opcode_type, [reg1, reg2, imm])]
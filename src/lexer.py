@@ -0,0 +1,63 @@
+import re
+from typing import NamedTuple
+
+from src.errors import InvalidArgumentError, MissingOperationError
+
+class Statement(NamedTuple):
+    """Tokens of a single source line."""
+    label: str | None           # label defined on the line, without the ':'
+    mnemonic: str | None        # operation or directive
+    operands: list[str]         # comma-separated operands, stripped
+    comment: tuple[int, int] | None = None  # span of the comment in the line
+
+# label: mnemonic operands # comment
+_STATEMENT = re.compile(r'''
+    \s*
+    (?:(?P<label>[\w.\\@]+)\s*:)?     # \ and @ for macro parameters, see src.preprocess
+    \s*
+    (?:(?P<mnemonic>[a-z_.][\w.]*)(?:\s+(?P<operands>[^#]*?))?)?
+    \s*
+    (?P<comment>\#.*)?
+    $''', re.VERBOSE)
+
+# offset(rs), as used by loads and stores
+_MEMORY_OPERAND = re.compile(r'(-?\d+)\s*\(\s*(\w+)\s*\)')
+
+EMPTY = Statement(None, None, [])
+
+def tokenize(
+    line: str
+) -> Statement:
+    """
+    Splits a line into its label, mnemonic, operands and comment in a single match.
+
+    Labels, mnemonics and operands are lowercased. Empty and comment-only lines give a statement with neither a label nor a mnemonic.
+
+    :param line: single line of .asm file content
+    :type line: str
+    :return: tokens of the line
+    :rtype: Statement
+    """
+    match = _STATEMENT.match(line.lower())
+    if not match:
+        raise MissingOperationError(f"Missing operation in line: {line.strip()}")
+
+    label, mnemonic, operands, comment = match.group('label', 'mnemonic', 'operands', 'comment')
+    if label is None and mnemonic is None and comment is None:
+        return EMPTY
+
+    return Statement(
+        label,
+        mnemonic,
+        [operand.strip() for operand in operands.split(',')] if operands else [],
+        match.span('comment') if comment is not None else None,
+    )
+
+def split_memory_operand(
+    operand: str
+) -> tuple[str, str]:
+    """Splits an 'offset(rs)' operand into its offset and register."""
+    match = _MEMORY_OPERAND.fullmatch(operand)
+    if not match:
+        raise InvalidArgumentError(f"Invalid S-type or LI-type argument format: {operand}")
+    return match.group(1), match.group(2)
@@ -0,0 +1,144 @@
+"""
+Links relocatable objects (src.objects) into a program image.
+
+'.asm' inputs are assembled into a '.o' next to them first, unless that object is newer than the source, so that only
+the modules changed since the last build are re-assembled.
+
+Run with:
+    python -m src.link <module.asm | module.o>... -o <output_file> [-f list|bin|hex|ihex] [--base <address>]
+"""
+import argparse
+import os
+import sys
+from array import array
+from typing import NamedTuple
+
+from src.errors import AssemblyError, LinkError, UndefinedLabelError
+from src.directives import TEXT
+from src.helpers import offset_ranges
+from src.objects import ObjectFile, assemble_object_file, read_object, relocate
+
+class LinkedProgram(NamedTuple):
+    """Result of link."""
+    words: array                # encoded words, array('I')
+    symbols: dict[str, int]     # exported symbol -> address
+
+def link(
+    objects: list[ObjectFile],
+    base: int = 0
+) -> LinkedProgram:
+    """
+    Places objects one after the other, text sections first, and patches their relocations.
+
+    :param objects: objects, in link order
+    :type objects: list[ObjectFile]
+    :param base: address of the first word
+    :type base: int
+    :return: linked words and the addresses of the exported symbols
+    :rtype: LinkedProgram
+    """
+    # Layout: each section name in first-seen order, text first, with the objects' sections concatenated
+    names = list(dict.fromkeys([TEXT] + [name for obj in objects for name in obj.sections]))
+    starts = [{} for _ in objects]  # per object: section name -> address
+    address = base
+    for name in names:
+        for obj, start in zip(objects, starts):
+            start[name] = address
+            address += 4 * len(obj.sections.get(name, ()))
+
+    exported = {}   # symbol -> (address, object index)
+    for index, obj in enumerate(objects):
+        for symbol in obj.exports:
+            if symbol in exported:
+                raise LinkError(f"Symbol {symbol} is exported by objects {exported[symbol][1]} and {index}")
+            section, offset = obj.symbols[symbol]
+            exported[symbol] = (starts[index][section] + offset, index)
+
+    words = array('I')
+    for name in names:
+        for obj in objects:
+            words.extend(obj.sections.get(name, ()))
+
+    for index, obj in enumerate(objects):
+        for name, relocations in obj.relocations.items():
+            for offset, type, symbol in relocations:
+                # Local symbols shadow exported ones
+                if symbol in obj.symbols:
+                    section, symbol_offset = obj.symbols[symbol]
+                    value = starts[index][section] + symbol_offset
+                elif symbol in exported:
+                    value = exported[symbol][0]
+                else:
+                    raise UndefinedLabelError(f"Undefined symbol: {symbol}", symbol)
+                address = starts[index][name] + offset
+                if type in offset_ranges:
+                    # Branches and jumps are relative to their own address
+                    value -= address
+                    low, high = offset_ranges[type]
+                    if not low <= value <= high:
+                        raise LinkError(f"{type}-type offset to {symbol} out of range at {address:#x} ({value:+d} bytes)")
+                position = (address - base) // 4
+                words[position] = relocate(words[position], type, value)
+
+    return LinkedProgram(words, {symbol: address for symbol, (address, _) in exported.items()})
+
+def load_objects(
+    file_names: list[str],
+    include_path: list[str] | None = None
+) -> tuple[list[ObjectFile], list[str]]:
+    """
+    Reads objects, assembling '.asm' inputs whose object is missing or older than the source.
+
+    Only the source itself is compared against the object, changes to the files it includes do not trigger a rebuild.
+
+    :param file_names: '.asm' or '.o' file paths
+    :type file_names: list[str]
+    :param include_path: directories searched for included files, after the directory of each file
+    :type include_path: list[str] | None
+    :return: objects in input order, and the '.asm' files that were assembled
+    :rtype: tuple[list[ObjectFile], list[str]]
+    """
+    objects = []
+    assembled = []
+    for file_name in file_names:
+        if not file_name.endswith('.asm'):
+            objects.append(read_object(file_name))
+            continue
+
+        object_file_name = file_name.removesuffix('.asm') + '.o'
+        if os.path.exists(object_file_name) and os.path.getmtime(object_file_name) >= os.path.getmtime(file_name):
+            objects.append(read_object(object_file_name))
+        else:
+            objects.append(assemble_object_file(file_name, object_file_name, include_path or []))
+            assembled.append(file_name)
+    return objects, assembled
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m src.link', description="Links modules into a program image")
+    parser.add_argument('file_names', nargs='+', help="'.asm' modules or '.o' objects, in link order")
+    parser.add_argument('-o', '--output', required=True, help="Output file name")
+    parser.add_argument('-f', '--format', default='list', choices=['list', 'bin', 'hex', 'ihex'], help="Output format")
+    parser.add_argument('--base', default='0', help="Address of the first word, e.g. 0x1000")
+    parser.add_argument('-I', '--include', action='append', default=[], help="Directory searched for .include files (repeatable)")
+    args = parser.parse_args(argv)
+
+    from src.output import OutputFormat, write_output
+
+    try:
+        objects, assembled = load_objects(args.file_names, args.include)
+        for file_name in assembled:
+            print(f"Assembled {file_name}")
+        program = link(objects, int(args.base, 0))
+        write_output(program.words, args.output, OutputFormat(args.format))
+    except FileNotFoundError as e:
+        print(f"File not found: {e.filename}", file=sys.stderr)
+        return 1
+    except AssemblyError as ae:
+        print(f"Link error: {ae}", file=sys.stderr)
+        return 1
+
+    print(f"Linked {len(objects)} object(s) into {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
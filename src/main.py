@@ -1,68 +1,207 @@
-import typer 
-from typing import Annotated
+import sys
 
-import logging
+# Only the standard library is imported up front, the assembler and typer are imported when a command needs them
+CACHE_DIR = '.orvasm_cache'     # same as src.cache.CACHE_DIR, which is not imported just for it
+FORMATS = ['list', 'bin', 'hex', 'ihex']
 
-from src.assemble import assemble
-from src.errors import AssemblyError
-
-app = typer.Typer(add_completion=False)
-
-@app.command()
-def main(
-    file_name: Annotated[str, typer.Argument(help="Name of the file to assemble")],
-    output: Annotated[str | None, typer.Option('-o', '--output', help="Output file name (optional)")]=None
-) -> None:
+def run(
+    file_names: list[str],
+    output: str | None = None,
+    out_dir: str | None = None,
+    format: str = 'list',
+    jobs: int = 1,
+    no_cache: bool = False,
+    profile: bool = False,
+    profile_json: str | None = None,
+    include_path: list[str] | None = None,
+    optimize: bool = False,
+    watch: bool = False
+) -> int:
     """
-    This functions takes in a '.asm' file name as input and writes the assembled machine code into a file of same name but with extension 'list'
-    
-    :param file_name: '.asm' file path to be assembled
-    :type file_name: str
+    This functions takes in '.asm' file names as input and writes the assembled machine code of each into a file of same name but with the extension of the output format ('list' by default)
+
+    :param file_names: '.asm' file paths, glob patterns or directories to be assembled
+    :type file_names: list[str]
+    :param format: output format, one of 'list', 'bin', 'hex' ($readmemh) or 'ihex' (Intel HEX)
+    :type format: str
+    :param jobs: number of processes, files are assembled in parallel, a single file is parsed in parallel chunks
+    :type jobs: int
+    :param no_cache: always assemble, without reading or writing the build cache
+    :type no_cache: bool
+    :param profile: profile the run, files are then assembled in this process so that every phase is recorded
+    :type profile: bool
+    :param include_path: directories searched for included files, after the directory of each file
+    :type include_path: list[str] | None
+    :param optimize: remove redundant instructions and report them, see src.peephole
+    :type optimize: bool
+    :param watch: keep running and assemble files again whenever they are saved, re-encoding only the changed lines, see src.watch
+    :type watch: bool
+    :return: exit code, non-zero if any file failed
+    :rtype: int
     """
+    import logging
+    import os
+
+    from src.batch import assemble_batch, expand_inputs, try_assemble_file
+    from src.output import OutputFormat
+
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)
-    
-    logger.info(f"Starting assembly for file: {file_name}...")
-
-    # Check extension
-    logger.info("Checking file extension...")
-    if not file_name.endswith('.asm'):
-        logger.error("File must have a .asm extension")
-        return
-    
-    # Open file and check it exists
-    logger.info("Checking file exists...")
-    try:
-        with open(file_name, 'r') as file:
-            content = file.read()
-            logger.info("File exists")
-    except FileNotFoundError:
-        logger.error(f"File not found: {file_name}")
-        return
-    except Exception as e:
-        logger.error(f"An error occurred: {e}")
-        return
-    
-    # Assemble file
-    logger.info("Assembling file...")
-    try:
-        assembled_content = assemble(content)
-        if output:
-            output_file_name = output
+
+    format = OutputFormat(format)
+    cache_dir = None if no_cache else CACHE_DIR
+
+    profiler = None
+    if profile or profile_json:
+        from src.profiler import Profiler
+        profiler = Profiler()
+        profiler.enable()
+        jobs = 1
+
+    file_names = expand_inputs(file_names)
+    logger.info(f"Starting assembly for {len(file_names)} file(s)...")
+
+    if output and len(file_names) != 1:
+        logger.error("--output can only be used with a single file")
+        return 1
+
+    if watch:
+        from src.batch import get_output_file_name
+        from src.watch import watch_files
+
+        if out_dir is not None:
+            os.makedirs(out_dir, exist_ok=True)
+        output_file_names = [output] if output else [get_output_file_name(file_name, format, out_dir) for file_name in file_names]
+        return watch_files(file_names, output_file_names, format, include_path, optimize)
+
+    if output:
+        results = [(file_names[0], output, try_assemble_file(file_names[0], output, format, jobs, cache_dir, include_path, optimize))]
+    else:
+        results = assemble_batch(file_names, format, out_dir, jobs, cache_dir, include_path, optimize)
+
+    # Per-file results and summary
+    failed = 0
+    for file_name, output_file_name, error in results:
+        if error:
+            failed += 1
+            logger.error(f"{file_name}: {error}")
+        else:
+            logger.info(f"Assembly complete. Output written to {output_file_name}")
+
+    if len(results) > 1:
+        logger.info(f"{len(results) - failed} of {len(results)} file(s) assembled, {failed} failed")
+
+    if profiler:
+        profiler.disable()
+        print(profiler.report())
+        if profile_json:
+            with open(profile_json, 'w') as file:
+                file.write(profiler.to_json())
+            logger.info(f"Profile written to {profile_json}")
+
+    return 1 if failed else 0
+
+# Options of the fast path: option -> (run() parameter, takes a value)
+_options = {
+    '-o': ('output', True), '--output': ('output', True),
+    '--out-dir': ('out_dir', True),
+    '-f': ('format', True), '--format': ('format', True),
+    '-j': ('jobs', True), '--jobs': ('jobs', True),
+    '--no-cache': ('no_cache', False),
+    '-O': ('optimize', False), '--optimize': ('optimize', False),
+    '--watch': ('watch', False),
+    '-I': ('include_path', True), '--include': ('include_path', True),
+}
+
+_list_options = ['include_path']  # may be repeated
+
+def parse_args(
+    argv: list[str]
+) -> dict | None:
+    """
+    Parses the common command lines without typer.
+
+    :param argv: command line arguments, without the program name
+    :type argv: list[str]
+    :return: run() arguments, or None for anything else (help, profiling, invalid values), which is left to the typer app
+    :rtype: dict | None
+    """
+    kwargs = {'file_names': []}
+    args = iter(argv)
+    for arg in args:
+        if not arg.startswith('-') or arg == '-':
+            kwargs['file_names'].append(arg)
+            continue
+
+        option, has_value, value = arg.partition('=')
+        if option not in _options:
+            return None
+        name, takes_value = _options[option]
+        if not takes_value:
+            if has_value:
+                return None
+            kwargs[name] = True
+            continue
+
+        if not has_value:
+            value = next(args, None)
+            if value is None:
+                return None
+        if name in _list_options:
+            kwargs.setdefault(name, []).append(value)
         else:
-            output_file_name = file_name.replace('.asm', '.list')
-        with open(output_file_name, 'w') as output_file:
-            output_file.write(assembled_content)
-        logger.info(f"Assembly complete. Output written to {output_file_name}")
-    except AssemblyError as ae:
-        logger.error(f"Assembly error: {ae}")
-    except AssertionError as ase:
-        logger.error(f"Assertion error during assembly: {ase}")
-    except Exception as e:
-        logger.error(f"An unexpected error occurred during assembly: {e}")
-    
-    return
-
-if __name__ == "__main__":  
-    app()
-    
+            kwargs[name] = value
+
+    if not kwargs['file_names'] or kwargs.get('format', 'list') not in FORMATS:
+        return None
+    if 'jobs' in kwargs:
+        if not kwargs['jobs'].isdigit() or int(kwargs['jobs']) < 1:
+            return None
+        kwargs['jobs'] = int(kwargs['jobs'])
+    return kwargs
+
+def get_app():
+    """Full typer CLI, with help and option validation."""
+    from typing import Annotated
+
+    import typer
+
+    from src.output import OutputFormat
+
+    app = typer.Typer(add_completion=False)
+
+    @app.command()
+    def main(
+        file_names: Annotated[list[str], typer.Argument(help="Files, glob patterns or directories to assemble")],
+        output: Annotated[str | None, typer.Option('-o', '--output', help="Output file name (optional, single file only)")]=None,
+        out_dir: Annotated[str | None, typer.Option('--out-dir', help="Directory to write outputs to (optional)")]=None,
+        format: Annotated[OutputFormat, typer.Option('-f', '--format', help="Output format")]=OutputFormat.LIST,
+        jobs: Annotated[int, typer.Option('-j', '--jobs', min=1, help="Number of processes to assemble with")]=1,
+        no_cache: Annotated[bool, typer.Option('--no-cache', help=f"Do not use the build cache in {CACHE_DIR}")]=False,
+        profile: Annotated[bool, typer.Option('--profile', help="Print time per phase and instruction counts at the end")]=False,
+        profile_json: Annotated[str | None, typer.Option('--profile-json', help="Write the profile as JSON to this file (implies --profile)")]=None,
+        include_path: Annotated[list[str] | None, typer.Option('-I', '--include', help="Directory searched for .include files (repeatable)")]=None,
+        optimize: Annotated[bool, typer.Option('-O', '--optimize', help="Remove redundant instructions and report them")]=False,
+        watch: Annotated[bool, typer.Option('--watch', help="Assemble again whenever a file is saved, until interrupted")]=False
+    ) -> None:
+        """
+        Assembles '.asm' files into files of the same name with the extension of the output format ('list' by default).
+        """
+        code = run(file_names, output, out_dir, format.value, jobs, no_cache, profile, profile_json, include_path, optimize, watch)
+        if code:
+            raise typer.Exit(code=code)
+
+    return app
+
+def cli(
+    argv: list[str] | None = None
+) -> None:
+    """Entry point, common command lines skip importing typer."""
+    argv = sys.argv[1:] if argv is None else argv
+    kwargs = parse_args(argv)
+    if kwargs is not None:
+        sys.exit(run(**kwargs))
+    get_app()(args=argv, prog_name='src.main')
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,273 @@
+"""
+Relocatable object files, so that modules can be assembled separately and linked (see src.link).
+
+A module is assembled as if each of its sections started at address 0. Every immediate or .word that refers to a symbol
+gets a relocation entry, and the linker patches it once it has placed the module, with the offset from the instruction
+for branches and jumps. Labels are local unless exported with '.globl'. Symbols a module references without defining
+are imported. Only branches to local labels are relaxed, branches to imported symbols must be in range once linked.
+Sections are word-aligned when linked, so .align above 2 only aligns relative to the start of the module's section.
+
+File layout: MAGIC, header length (4 bytes, little-endian), JSON header, then the words of each section in header order.
+"""
+import json
+import os
+import sys
+from array import array
+from typing import Iterable, NamedTuple
+
+from src.constants import registers, symbol_directives
+from src.directives import DATA, TEXT, data_directives, data_size, encode_data, get_section
+from src.encoder import encode_b, encode_i, encode_j, encode_s, encode_si, encode_u
+from src.errors import AssemblyError, DirectiveError, UndefinedLabelError
+from src.ir import NONE, Program, build, encode_row, instruction_count, operation_types, operations
+from src.output import to_bytes
+from src.preprocess import preprocess
+from src.pseudo import select_expansion
+from src.relax import relax
+
+MAGIC = b'ORVO\x01'
+
+class Relocation(NamedTuple):
+    """An immediate to patch with the address of a symbol."""
+    offset: int     # byte offset of the word in its section
+    type: str       # immediate field, see relocation_fields
+    symbol: str
+
+class ObjectFile(NamedTuple):
+    """A relocatable module."""
+    sections: dict[str, array]              # section name -> words, array('I')
+    symbols: dict[str, tuple[str, int]]     # defined symbol -> (section, byte offset)
+    exports: list[str]                      # symbols visible to other modules
+    relocations: dict[str, list[Relocation]]    # section name -> relocations in it
+
+    @property
+    def imports(self) -> list[str]:
+        """Symbols referenced but not defined by the module."""
+        referenced = (relocation.symbol for relocations in self.relocations.values() for relocation in relocations)
+        return list(dict.fromkeys(symbol for symbol in referenced if symbol not in self.symbols))
+
+# Relocation type -> packs a value into the immediate field of a word with all other bits 0
+relocation_fields = {
+    'I': lambda value: encode_i(0, 0, 0, value),        # I, LI and JI-type
+    'SI': lambda value: encode_si(0, 0, 0, value),
+    'S': lambda value: encode_s(0, 0, 0, value),
+    'B': lambda value: encode_b(0, 0, 0, value),
+    'U': lambda value: encode_u(0, 0, value),
+    'J': lambda value: encode_j(0, 0, value),
+    'HI': lambda value: encode_u(0, 0, (value + 0x800) >> 12),                  # lui of %hi(value)
+    'LO': lambda value: encode_i(0, 0, 0, ((value & 0xFFF) ^ 0x800) - 0x800),   # addi of %lo(value)
+    'WORD': lambda value: value & 0xFFFFFFFF,                                   # .word
+}
+
+# Relocation type -> bits of its immediate field
+_field_masks = {
+    'I': encode_i(0, 0, 0, -1),
+    'SI': encode_si(0, 0, 0, -1),
+    'S': encode_s(0, 0, 0, -1),
+    'B': encode_b(0, 0, 0, -1),
+    'U': encode_u(0, 0, -1),
+    'J': encode_j(0, 0, -1),
+    'HI': encode_u(0, 0, -1),
+    'LO': encode_i(0, 0, 0, -1),
+    'WORD': 0xFFFFFFFF,
+}
+
+# Opcode type -> relocation type of its immediate
+_relocation_types = {'I': 'I', 'LI': 'I', 'JI': 'I', 'SI': 'SI', 'S': 'S', 'B': 'B', 'U': 'U', 'J': 'J'}
+
+def relocate(
+    word: int,
+    type: str,
+    value: int
+) -> int:
+    """Replaces the immediate field of a word."""
+    return word & ~_field_masks[type] | relocation_fields[type](value)
+
+def _is_symbol(
+    operand: str
+) -> bool:
+    return operand.isidentifier() and operand not in registers
+
+def get_relocations(
+    program: Program,
+    index: int,
+    offset: int
+) -> list[Relocation]:
+    """Relocations of the words an instruction row assembles into, at offset in its section."""
+    symbol = program.symbols[index]
+    if symbol == NONE or not _is_symbol(program.names[symbol]):
+        return []
+    symbol = program.names[symbol]
+
+    op_id = program.ops[index]
+    opcode_type = operation_types[op_id]
+    if opcode_type == 'PSEUDO':
+        expansion = select_expansion(operations[op_id], 0, False)
+        relocations = []
+        for index, (_, instruction_type, slots) in enumerate(expansion.instructions):
+            for kind, value in slots:
+                if kind != 'const' and expansion.kinds[value] == 'imm':
+                    type = {'hi': 'HI', 'lo': 'LO'}.get(kind, _relocation_types[instruction_type])
+                    relocations.append(Relocation(offset + 4 * index, type, symbol))
+        return relocations
+    return [Relocation(offset, _relocation_types[opcode_type], symbol)]
+
+def assemble_object(
+    source: str | Iterable[str],
+    include_path: Iterable[str] = ()
+) -> ObjectFile:
+    """
+    Assembles a module into a relocatable object.
+
+    :param source: .asm file content, or its lines
+    :type source: str | Iterable[str]
+    :param include_path: directories searched for included files
+    :type include_path: Iterable[str]
+    :return: object with its words, symbols and relocations
+    :rtype: ObjectFile
+    """
+    if isinstance(source, str):
+        source = source.splitlines()
+
+    # Pass 1: symbols and the offset of every instruction and data directive
+    symbols = {}
+    exports = []
+    rows = []           # (section, row, offset)
+    offsets = {TEXT: 0, DATA: 0}
+    section = TEXT
+    program = relax(build(preprocess(source, include_path)))
+    for row in range(len(program)):
+        if program.labels[row] != NONE:
+            symbols[program.names[program.labels[row]]] = (section, offsets[section])
+        op = program.operation(row)
+        if op is None:
+            continue
+        args = program.operands(row)
+        if op in symbol_directives:
+            exports.extend(args)
+            continue
+        new_section = get_section(op, args)
+        if new_section is not None:
+            section = new_section
+            continue
+
+        offset = offsets[section]
+        if op in data_directives:
+            size = data_size(op, args, offset)
+        elif section == DATA:
+            raise DirectiveError(f"Only data directives are allowed in .data: {op}")
+        else:
+            size = 4 * instruction_count(program, row)
+        if (op == '.word' and section == TEXT or op not in data_directives) and offset % 4:
+            raise DirectiveError(f"Unaligned {op} at offset {offset:#x}, use .align 2")
+        rows.append((section, row, offset))
+        offsets[section] += size
+
+    for symbol in exports:
+        if symbol not in symbols:
+            raise UndefinedLabelError(f"Exported symbol is not defined: {symbol}", symbol)
+
+    # Pass 2: encode with imported symbols at the address of each reference, the linker patches every symbol reference
+    metadata = {
+        'labels': {symbol: offset for symbol, (_, offset) in symbols.items()},
+        'address': 0,
+    }
+    imported = []
+    contents = {TEXT: bytearray(), DATA: bytearray()}
+    relocations = {TEXT: [], DATA: []}
+    for section, row, metadata['address'] in rows:
+        op = program.operation(row)
+        # Keeps branches to imported symbols in range until they are linked
+        for symbol in imported:
+            metadata['labels'][symbol] = metadata['address']
+        while True:
+            try:
+                if op in data_directives:
+                    emitted = encode_data(op, program.operands(row), metadata['address'], metadata)
+                else:
+                    emitted = to_bytes(encode_row(program, row, metadata))
+                break
+            except UndefinedLabelError as e:
+                imported.append(e.label)
+                metadata['labels'][e.label] = metadata['address']
+        contents[section] += emitted
+
+        if op == '.word':
+            relocations[section].extend(
+                Relocation(metadata['address'] + 4 * index, 'WORD', arg)
+                for index, arg in enumerate(program.operands(row)) if _is_symbol(arg)
+            )
+        elif op not in data_directives:
+            relocations[section].extend(get_relocations(program, row, metadata['address']))
+
+    # Sections are padded to whole words
+    sections = {}
+    for name, content in contents.items():
+        if content or name == TEXT:
+            content += bytes(-len(content) % 4)
+            words = array('I', bytes(content))
+            if sys.byteorder == 'big':
+                words.byteswap()
+            sections[name] = words
+
+    return ObjectFile(
+        sections,
+        symbols,
+        list(dict.fromkeys(exports)),
+        {name: relocations[name] for name in sections},
+    )
+
+def write_object(
+    obj: ObjectFile,
+    file_name: str
+) -> None:
+    """Writes an object file."""
+    header = json.dumps({
+        'sections': {name: len(words) for name, words in obj.sections.items()},
+        'symbols': obj.symbols,
+        'exports': obj.exports,
+        'relocations': obj.relocations,
+    }).encode()
+    with open(file_name, 'wb') as file:
+        file.write(MAGIC + len(header).to_bytes(4, 'little') + header)
+        for words in obj.sections.values():
+            file.write(to_bytes(words))
+
+def read_object(
+    file_name: str
+) -> ObjectFile:
+    """Reads an object file written by write_object."""
+    with open(file_name, 'rb') as file:
+        data = file.read()
+    if not data.startswith(MAGIC):
+        raise AssemblyError(f"Not an object file: {file_name}")
+
+    start = len(MAGIC) + 4
+    end = start + int.from_bytes(data[len(MAGIC):start], 'little')
+    header = json.loads(data[start:end])
+
+    sections = {}
+    for name, count in header['sections'].items():
+        words = array('I', data[end:end + 4 * count])
+        if sys.byteorder == 'big':
+            words.byteswap()
+        sections[name] = words
+        end += 4 * count
+
+    return ObjectFile(
+        sections,
+        {symbol: (section, offset) for symbol, (section, offset) in header['symbols'].items()},
+        header['exports'],
+        {name: [Relocation(*relocation) for relocation in relocations] for name, relocations in header['relocations'].items()},
+    )
+
+def assemble_object_file(
+    file_name: str,
+    object_file_name: str,
+    include_path: Iterable[str] = ()
+) -> ObjectFile:
+    """Assembles a '.asm' file into an object file, includes are searched next to it first."""
+    with open(file_name) as file:
+        obj = assemble_object(file, [os.path.dirname(file_name) or '.', *include_path])
+    write_object(obj, object_file_name)
+    return obj
@@ -0,0 +1,164 @@
+import sys
+from array import array
+from enum import Enum
+
+from src.encoder import to_binary
+
+class OutputFormat(str, Enum):
+    """Supported output formats for assembled machine code."""
+    LIST = 'list'   # one 32-character binary string per line
+    BIN = 'bin'     # raw little-endian words
+    HEX = 'hex'     # one 8-digit hex word per line, for Verilog $readmemh
+    IHEX = 'ihex'   # Intel HEX records
+
+extensions = {
+    OutputFormat.LIST: '.list',
+    OutputFormat.BIN: '.bin',
+    OutputFormat.HEX: '.hex',
+    OutputFormat.IHEX: '.ihex',
+}
+
+IHEX_RECORD_SIZE = 16
+
+def to_bytes(
+    words: list[int] | memoryview
+) -> bytes | memoryview:
+    """Packs words into little-endian bytes in a single pass, a view of words (e.g. of an .incbin file) is returned as is."""
+    if isinstance(words, memoryview) and sys.byteorder == 'little':
+        return words.cast('B')
+    packed = array('I', words)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+def to_list(
+    words: list[int]
+) -> str:
+    """Formats words as one binary string per line."""
+    return '\n'.join(map(to_binary, words))
+
+def to_readmemh(
+    words: list[int]
+) -> str:
+    """Formats words as one hex word per line, as read by $readmemh."""
+    return ''.join(f'{word:08x}\n' for word in words)
+
+def _ihex_record(
+    address: int,
+    record_type: int,
+    data: bytes
+) -> str:
+    """Builds a single Intel HEX record with its checksum."""
+    record = bytes([len(data), address >> 8 & 0xFF, address & 0xFF, record_type]) + data
+    checksum = -sum(record) & 0xFF
+    return f':{record.hex().upper()}{checksum:02X}\n'
+
+def _ihex_records(
+    data: bytes,
+    address: int,
+    upper: int
+) -> tuple[list[str], int]:
+    """Splits data starting at address into Intel HEX data records, returns them with the current upper address."""
+    records = []
+    for offset in range(0, len(data), IHEX_RECORD_SIZE):
+        record_address = address + offset
+        # Extended linear address record whenever the upper 16 bits change
+        if record_address >> 16 != upper:
+            upper = record_address >> 16
+            records.append(_ihex_record(0, 0x04, upper.to_bytes(2, 'big')))
+        records.append(_ihex_record(record_address & 0xFFFF, 0x00, data[offset:offset + IHEX_RECORD_SIZE]))
+    return records, upper
+
+def to_ihex(
+    words: list[int]
+) -> str:
+    """Formats words as Intel HEX, starting at address 0."""
+    records, _ = _ihex_records(to_bytes(words), 0, 0)
+    records.append(_ihex_record(0, 0x01, b''))
+    return ''.join(records)
+
+def write_output(
+    words: list[int],
+    file_name: str,
+    format: OutputFormat = OutputFormat.LIST
+) -> None:
+    """
+    Writes encoded words to a file in the given format with a single write.
+
+    :param words: encoded 32-bit words
+    :type words: list[int]
+    :param file_name: output file path
+    :type file_name: str
+    :param format: output format
+    :type format: OutputFormat
+    """
+    if format == OutputFormat.BIN:
+        with open(file_name, 'wb') as output_file:
+            output_file.write(to_bytes(words))
+        return
+
+    if format == OutputFormat.HEX:
+        content = to_readmemh(words)
+    elif format == OutputFormat.IHEX:
+        content = to_ihex(words)
+    else:
+        content = to_list(words)
+
+    with open(file_name, 'wb') as output_file:
+        output_file.write(content.encode())
+
+class StreamWriter:
+    """
+    Incrementally writes encoded words to a binary file object in the given format.
+
+    Produces the same bytes as write_output would for all the words written, call close() once done.
+    """
+
+    def __init__(
+        self,
+        file,
+        format: OutputFormat = OutputFormat.LIST
+    ) -> None:
+        self.file = file
+        self.format = format
+        self.count = 0          # words written so far
+        self.ihex_tail = b''    # bytes not yet emitted as a full Intel HEX record
+        self.ihex_upper = 0
+
+    def write(
+        self,
+        words: list[int]
+    ) -> None:
+        """Writes a chunk of words."""
+        if not words:
+            return
+
+        if self.format == OutputFormat.BIN:
+            self.file.write(to_bytes(words))
+        elif self.format == OutputFormat.HEX:
+            self.file.write(to_readmemh(words).encode())
+        elif self.format == OutputFormat.IHEX:
+            data = self.ihex_tail + to_bytes(words)
+            full = len(data) - len(data) % IHEX_RECORD_SIZE
+            address = self.count * 4 - len(self.ihex_tail)
+            records, self.ihex_upper = _ihex_records(data[:full], address, self.ihex_upper)
+            self.file.write(''.join(records).encode())
+            self.ihex_tail = data[full:]
+        else:
+            # Lines are separated, not terminated, by newlines
+            content = to_list(words)
+            if self.count:
+                content = '\n' + content
+            self.file.write(content.encode())
+
+        self.count += len(words)
+
+    def close(
+        self
+    ) -> None:
+        """Writes any trailing records, does not close the underlying file."""
+        if self.format == OutputFormat.IHEX:
+            records, self.ihex_upper = _ihex_records(self.ihex_tail, self.count * 4 - len(self.ihex_tail), self.ihex_upper)
+            records.append(_ihex_record(0, 0x01, b''))
+            self.file.write(''.join(records).encode())
+            self.ihex_tail = b''
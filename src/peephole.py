@@ -0,0 +1,126 @@
+"""
+Peephole optimizer, run on the parsed program (src.ir) before it is laid out and encoded (-O).
+
+Removes instructions that have no effect:
+    mv r1, r1 / addi r1, r1, 0      moves a register to itself
+    li r1, 5 followed by li r1, 7   the first li is overwritten before it is read
+    beq r1, r2, next / j next       branches to the instruction that follows anyway
+
+Labels of removed instructions are kept, so they now refer to the instruction that followed, and every address is laid
+out again when the program is assembled. Removing an instruction can make another one redundant, so the rules are
+applied until nothing changes.
+"""
+from typing import NamedTuple
+
+from src.constants import symbol_directives
+from src.directives import TEXT, get_section
+from src.ir import NONE, Program, operation_ids, operation_types, operations
+
+# Rule -> description, for the report
+rules = {
+    'self-move': "moves a register to itself",
+    'dead-li': "overwritten by the next li",
+    'branch-next': "branches to the next instruction",
+}
+
+_MV, _ADDI, _LI, _J, _JAL = (operation_ids[op] for op in ['mv', 'addi', 'li', 'j', 'jal'])
+_symbol_directives = {operation_ids[op] for op in symbol_directives}
+
+class Removal(NamedTuple):
+    """An instruction removed by the peephole optimizer."""
+    line_number: int
+    rule: str
+    instruction: str    # as it would be written in the source
+
+def _is_self_move(
+    program: Program,
+    index: int
+) -> bool:
+    op_id = program.ops[index]
+    if op_id == _MV:
+        return program.reg1[index] == program.reg2[index]
+    return (op_id == _ADDI and program.reg1[index] == program.reg2[index]
+            and program.symbols[index] == NONE and program.imms[index] == 0)
+
+def _jump_target(
+    program: Program,
+    index: int
+) -> int:
+    """Symbol an instruction only transfers control to, or NONE."""
+    op_id = program.ops[index]
+    if operation_types[op_id] == 'B' or op_id == _J or op_id == _JAL and program.reg1[index] == 0:
+        return program.symbols[index]
+    return NONE
+
+def _find_removals(
+    program: Program
+) -> dict[int, str]:
+    """Row index -> rule, for one pass over the program."""
+    removals = {}
+    section = TEXT
+    ops, labels = program.ops, program.labels
+    for index in range(len(ops)):
+        op_id = ops[index]
+        if op_id == 0 or op_id in _symbol_directives:
+            continue
+        if operation_types[op_id] == 'DIRECTIVE':
+            section = get_section(operations[op_id], program.args[program.imms[index]]) or section
+            continue
+        if section != TEXT:
+            continue
+
+        if _is_self_move(program, index):
+            removals[index] = 'self-move'
+            continue
+
+        # The next row that emits anything, and the labels in front of it
+        targets = set()
+        following = None
+        for next_index in range(index + 1, len(ops)):
+            if labels[next_index] != NONE:
+                targets.add(labels[next_index])
+            if ops[next_index] != 0 and ops[next_index] not in _symbol_directives:
+                following = next_index
+                break
+
+        if op_id == _LI and following is not None and ops[following] == _LI and program.reg1[following] == program.reg1[index]:
+            removals[index] = 'dead-li'
+        elif _jump_target(program, index) in targets:
+            removals[index] = 'branch-next'
+    return removals
+
+def peephole(
+    program: Program
+) -> tuple[Program, list[Removal]]:
+    """
+    Removes redundant instructions from a program.
+
+    :param program: whole program, as built by src.ir.build
+    :type program: Program
+    :return: optimized program, and the removed instructions in the order they were removed
+    :rtype: tuple[Program, list[Removal]]
+    """
+    removed = []
+    while True:
+        removals = _find_removals(program)
+        if not removals:
+            return program, removed
+
+        replacements = {}
+        for index, rule in removals.items():
+            line_number = program.lines[index]
+            instruction = f"{program.operation(index)} {', '.join(program.operands(index))}"
+            removed.append(Removal(line_number, rule, instruction))
+            label = program.labels[index]
+            replacements[index] = [(0, 0, 0, 0, 0, NONE, label, line_number)] if label != NONE else []
+        program = program.splice(replacements)
+
+def format_report(
+    name: str,
+    removed: list[Removal]
+) -> str:
+    """Human-readable report of the instructions removed from a program."""
+    lines = [f"{name}: removed {len(removed)} instruction(s)"]
+    for line_number, rule, instruction in sorted(removed, key=lambda removal: removal.line_number):
+        lines.append(f"  line {line_number}: {instruction} ({rules[rule]})")
+    return '\n'.join(lines)
@@ -0,0 +1,191 @@
+"""
+Expands '.include' and '.macro' directives into a stream of statements, ahead of assembly.
+
+    .include "common.asm"       # searched next to the including file, then in the include path
+    .macro push reg, off        # parameters are referenced as \\reg and \\off in the body
+        sw \\reg, \\off(r2)
+    .endm
+    .incbin "table.bin"         # searched like .include, the path is made absolute for the assembler
+
+\\@ in a macro body is replaced by the number of macro expansions so far, to give labels a unique name.
+Included files are tokenized once and cached by path and modification time, and macro bodies are kept tokenized, so
+that repeated includes and expansions never lex their text again.
+"""
+import os
+import re
+from typing import Iterable, Iterator, NamedTuple
+
+from src.errors import DirectiveError, InvalidArgumentError
+from src.lexer import Statement, tokenize
+
+MAX_DEPTH = 64  # nested includes and macro expansions, also stops recursive ones
+
+# File names of .include and .incbin are taken from the raw line, tokenize lowercases them
+_FILE_DIRECTIVE = re.compile(r'\s*(?:[\w.]+\s*:)?\s*\.(?:include|incbin)\s+(?:"([^"]*)"|([^\s,#]+))\s*(,[^#]*)?', re.IGNORECASE)
+_file_directives = ['.include', '.incbin']
+_PARAMETER = re.compile(r'\\(\w+|@)')
+
+class Macro(NamedTuple):
+    """A macro definition with its body already tokenized."""
+    parameters: tuple[str, ...]
+    body: tuple[Statement, ...]
+    substituted: tuple[bool, ...]  # whether each body statement references a parameter or \@
+
+def tokenize_line(
+    line: str
+) -> Statement:
+    """Tokenizes a line as tokenize does, keeping the case of '.include' and '.incbin' file names."""
+    statement = tokenize(line)
+    if statement.mnemonic in _file_directives:
+        match = _FILE_DIRECTIVE.match(line)
+        if not match:
+            raise DirectiveError(f"Invalid {statement.mnemonic}: {line.strip()}")
+        rest = match.group(3)
+        operands = [operand.strip() for operand in rest.split(',')[1:]] if rest else []
+        statement = statement._replace(operands=[match.group(1) or match.group(2), *operands])
+    return statement
+
+_include_cache = {}     # path -> (modification time, statements)
+
+def load_include(
+    path: str
+) -> tuple[Statement, ...]:
+    """Tokenized statements of an included file, cached until the file changes."""
+    mtime = os.stat(path).st_mtime_ns
+    cached = _include_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(path) as file:
+        statements = tuple(tokenize_line(line) for line in file)
+    _include_cache[path] = (mtime, statements)
+    return statements
+
+def find_include(
+    name: str,
+    directory: str | None,
+    include_path: Iterable[str]
+) -> str:
+    """Resolves an included file name, relative to the including file's directory, then the include path and the working directory."""
+    for base in [directory, *include_path, '.']:
+        if base is None:
+            continue
+        path = os.path.join(base, name)
+        if os.path.isfile(path):
+            return os.path.abspath(path)
+    raise DirectiveError(f"Included file not found: {name}")
+
+def _parse_macro(
+    statement: Statement,
+    items: Iterator[tuple[int, Statement]]
+) -> tuple[str, Macro]:
+    """Reads a macro definition up to its '.endm' from items."""
+    # '.macro name a, b' is tokenized as operands ['name a', 'b']
+    name, *parameters = [token for token in re.split(r'[\s,]+', ' '.join(statement.operands)) if token]
+    if not name:
+        raise DirectiveError("Missing macro name")
+
+    body = []
+    for _, body_statement in items:
+        if body_statement.mnemonic == '.endm':
+            break
+        if body_statement.mnemonic == '.macro':
+            raise DirectiveError(f"Nested macro definition in macro {name}")
+        body.append(body_statement)
+    else:
+        raise DirectiveError(f"Missing .endm for macro {name}")
+
+    substituted = tuple(
+        '\\' in (body_statement.label or '') or any('\\' in operand for operand in body_statement.operands)
+        for body_statement in body
+    )
+    return name, Macro(tuple(parameters), tuple(body), substituted)
+
+def _substitute(
+    text: str | None,
+    values: dict[str, str]
+) -> str | None:
+    if text is None or '\\' not in text:
+        return text
+    try:
+        return _PARAMETER.sub(lambda match: values[match.group(1)], text)
+    except KeyError as e:
+        raise InvalidArgumentError(f"Unknown macro parameter: \\{e.args[0]}")
+
+def preprocess(
+    lines: Iterable[str],
+    include_path: Iterable[str] = (),
+    directory: str | None = None,
+    includes: list[str] | None = None
+) -> Iterator[tuple[int, Statement]]:
+    """
+    Tokenizes lines lazily, expanding includes and macros.
+
+    :param lines: .asm file lines
+    :type lines: Iterable[str]
+    :param include_path: directories searched for included files
+    :type include_path: Iterable[str]
+    :param directory: directory of the file being read, None to search the include path only
+    :type directory: str | None
+    :param includes: optional list every included file path is appended to
+    :type includes: list[str] | None
+    :return: (1-based line number in lines, statement), statements from includes and macros have the line number of the directive or macro use
+    :rtype: Iterator[tuple[int, Statement]]
+    """
+    include_path = list(include_path)
+    macros = {}
+    expansions = 0
+
+    def expand(
+        items: Iterator[tuple[int, Statement]],
+        directory: str | None,
+        depth: int
+    ) -> Iterator[tuple[int, Statement]]:
+        nonlocal expansions
+        if depth > MAX_DEPTH:
+            raise DirectiveError(f"Includes or macros nested more than {MAX_DEPTH} levels deep")
+
+        for line_number, statement in items:
+            op = statement.mnemonic
+            # Plain statements, by far the most common
+            if op is None or (op[0] != '.' and op not in macros):
+                yield line_number, statement
+                continue
+
+            # Definitions and expansions keep their label
+            if statement.label is not None and (op in ['.macro', '.include'] or op in macros):
+                yield line_number, Statement(statement.label, None, [])
+
+            if op == '.macro':
+                name, macros[name] = _parse_macro(statement, items)
+            elif op == '.endm':
+                raise DirectiveError(".endm without .macro")
+            elif op == '.include':
+                path = find_include(statement.operands[0], directory, include_path)
+                if includes is not None:
+                    includes.append(path)
+                yield from expand(((line_number, included) for included in load_include(path)), os.path.dirname(path), depth + 1)
+            elif op in macros:
+                macro = macros[op]
+                if len(statement.operands) != len(macro.parameters):
+                    raise InvalidArgumentError(f"Macro {op} takes {len(macro.parameters)} argument(s), got {len(statement.operands)}")
+                values = dict(zip(macro.parameters, statement.operands))
+                values['@'] = str(expansions)
+                expansions += 1
+
+                body = (
+                    Statement(_substitute(body_statement.label, values), body_statement.mnemonic, [_substitute(operand, values) for operand in body_statement.operands])
+                    if substituted else body_statement
+                    for body_statement, substituted in zip(macro.body, macro.substituted)
+                )
+                yield from expand(((line_number, body_statement) for body_statement in body), directory, depth + 1)
+            elif op == '.incbin':
+                path = find_include(statement.operands[0], directory, include_path)
+                if includes is not None:
+                    includes.append(path)
+                yield line_number, statement._replace(operands=[path, *statement.operands[1:]])
+            else:
+                # Other directives are left to the assembler
+                yield line_number, statement
+
+    return expand(((line_number, tokenize_line(line)) for line_number, line in enumerate(lines, 1)), directory, 0)
@@ -0,0 +1,152 @@
+import functools
+import json
+import time
+from collections import Counter
+
+import src.assemble
+import src.cache
+import src.helpers
+import src.ir
+import src.preprocess
+import src.pseudo
+from src.output import StreamWriter
+
+# phase -> functions timed for it, as (owner, attribute name); every module that imported a function by name is patched
+PHASES = {
+    'parse': [(src.preprocess, 'tokenize'), (src.assemble, 'tokenize'), (src.helpers, 'tokenize')],
+    'build': [(src.assemble, 'build'), (src.ir.Program, 'parse')],
+    'labels': [(src.assemble, 'handle_address_and_label')],
+    'relax': [(src.assemble, 'relax')],
+    'pseudo': [(src.ir, 'expand_operands')],
+    'encode': [(src.ir, 'encode'), (src.pseudo, 'encode')],
+    'output': [(StreamWriter, 'write'), (StreamWriter, 'close')],
+    'cache': [(src.cache, 'source_key'), (src.cache, 'load'), (src.cache, 'store')],
+}
+
+class Profiler:
+    """
+    Records the wall time spent in each assembler phase and counts encoded instructions by opcode type and mnemonic.
+
+    Enabling it swaps the phase functions for timed wrappers and disabling it puts the originals back, so that it costs nothing when disabled.
+    The line cache (src.cache.line_cache) and the batch encoder are turned off meanwhile, so that every instruction is
+    encoded and counted by the functions above.
+    Times are self times: time spent in a nested phase (e.g. parse within build) is only counted for the nested phase.
+    """
+
+    def __init__(self) -> None:
+        self.phases = {phase: [0, 0.0] for phase in PHASES}   # phase -> [calls, self seconds]
+        self.types = Counter()
+        self.mnemonics = Counter()
+        self.seconds = 0.0
+        self._stack = []        # time spent in nested phases, per active call
+        self._originals = []    # (owner, name, original function)
+        self._line_cache_size = None
+        self._batch_min_size = None
+        self._start = None
+
+    def _timed(
+        self,
+        phase: str,
+        function
+    ):
+        """Wraps a function so that its calls are timed for a phase."""
+        stats = self.phases[phase]
+        stack = self._stack
+        perf_counter = time.perf_counter
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stack.append(0.0)
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                stats[0] += 1
+                stats[1] += elapsed - stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+        return wrapper
+
+    def _counted(
+        self,
+        phase: str,
+        function
+    ):
+        """Wraps encode or expand_operands, whose first arguments are the mnemonic and, for encode, the opcode type."""
+        timed = self._timed(phase, function)
+        types, mnemonics = self.types, self.mnemonics
+        is_pseudo = phase == 'pseudo'
+
+        @functools.wraps(function)
+        def wrapper(op, *args, **kwargs):
+            mnemonics[op] += 1
+            types['PSEUDO' if is_pseudo else args[0]] += 1
+            return timed(op, *args, **kwargs)
+        return wrapper
+
+    def enable(self) -> None:
+        """Starts profiling."""
+        if self._originals:
+            return
+        for phase, targets in PHASES.items():
+            for owner, name in targets:
+                original = getattr(owner, name)
+                self._originals.append((owner, name, original))
+                wrap = self._counted if phase in ['encode', 'pseudo'] else self._timed
+                setattr(owner, name, wrap(phase, original))
+        self._line_cache_size = src.cache.line_cache.max_size
+        src.cache.line_cache.resize(0)
+        self._batch_min_size, src.assemble.BATCH_MIN_SIZE = src.assemble.BATCH_MIN_SIZE, None
+        self._start = time.perf_counter()
+
+    def disable(self) -> None:
+        """Stops profiling and restores the original functions."""
+        for owner, name, original in reversed(self._originals):
+            setattr(owner, name, original)
+        self._originals = []
+        if self._line_cache_size is not None:
+            src.cache.line_cache.resize(self._line_cache_size)
+            src.assemble.BATCH_MIN_SIZE = self._batch_min_size
+            self._line_cache_size = None
+        if self._start is not None:
+            self.seconds += time.perf_counter() - self._start
+            self._start = None
+
+    def __enter__(self) -> 'Profiler':
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.disable()
+
+    def to_dict(self) -> dict:
+        """Profile as plain data, for JSON output."""
+        return {
+            'seconds': self.seconds,
+            'phases': {phase: {'calls': calls, 'seconds': seconds} for phase, (calls, seconds) in self.phases.items()},
+            'types': dict(self.types.most_common()),
+            'mnemonics': dict(self.mnemonics.most_common()),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def report(self) -> str:
+        """Profile as text tables."""
+        lines = [f"{'phase':<10} {'calls':>10} {'seconds':>10} {'%':>6}"]
+        for phase, (calls, seconds) in sorted(self.phases.items(), key=lambda item: -item[1][1]):
+            share = 100 * seconds / self.seconds if self.seconds else 0.0
+            lines.append(f"{phase:<10} {calls:>10} {seconds:>10.4f} {share:>6.1f}")
+        other = self.seconds - sum(seconds for _, seconds in self.phases.values())
+        lines.append(f"{'other':<10} {'':>10} {other:>10.4f}")
+        lines.append(f"{'total':<10} {'':>10} {self.seconds:>10.4f}")
+
+        lines.append('')
+        lines.append(f"{'type':<10} {'count':>10}")
+        lines.extend(f"{opcode_type:<10} {count:>10}" for opcode_type, count in self.types.most_common())
+
+        lines.append('')
+        lines.append(f"{'mnemonic':<10} {'count':>10}")
+        lines.extend(f"{op:<10} {count:>10}" for op, count in self.mnemonics.most_common())
+        return '\n'.join(lines)
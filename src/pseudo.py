@@ -0,0 +1,130 @@
+import re
+from typing import NamedTuple
+
+from src.constants import opcode, pseudo, pseudo_long
+from src.encoder import encode
+from src.errors import InvalidRegisterError
+from src.helpers import check_args, check_offset, get_register_num, offset_ranges
+from src.lexer import tokenize
+
+class Expansion(NamedTuple):
+    """A pseudo-instruction compiled into the instructions it expands to."""
+    kinds: tuple[str, ...]      # 'reg' or 'imm' for each operand of the pseudo-instruction
+    instructions: tuple[tuple[str, str, tuple], ...]  # (mnemonic, opcode type, operand slots)
+
+# Operand slots are (kind, value): ('const', value), ('arg', n), ('hi', n) or ('lo', n)
+_SLOT = re.compile(r'(?:%(hi|lo)\()?\{(\d+)\}\)?')
+
+def _compile_slot(
+    operand: str
+) -> tuple[str, int]:
+    """Compiles a template operand into an operand slot."""
+    match = _SLOT.fullmatch(operand)
+    if match:
+        return (match.group(1) or 'arg', int(match.group(2)))
+    try:
+        return ('const', get_register_num(operand))
+    except InvalidRegisterError:
+        return ('const', int(operand))
+
+def compile_pseudo(
+    templates: list[str]
+) -> Expansion:
+    """Compiles the text templates of a pseudo-instruction into an expansion."""
+    kinds = {}
+    instructions = []
+    for template in templates:
+        statement = tokenize(template)
+        opcode_type = opcode[statement.mnemonic][1]
+        operands = check_args(statement.mnemonic, statement.operands, opcode_type)
+        slots = tuple(_compile_slot(operand) for operand in operands)
+
+        # Every operand but the immediate is a register, R-type has no immediate
+        for position, (kind, value) in enumerate(slots):
+            if kind != 'const':
+                is_imm = opcode_type != 'R' and position == len(slots) - 1
+                kinds[value] = 'imm' if is_imm else 'reg'
+
+        instructions.append((statement.mnemonic, opcode_type, slots))
+
+    return Expansion(tuple(kinds[n] for n in range(len(kinds))), tuple(instructions))
+
+# Compiled once at import
+expansions = {op: compile_pseudo(templates) for op, templates in pseudo.items()}
+expansions_long = {op: compile_pseudo(templates) for op, templates in pseudo_long.items()}
+
+def _fits_imm12(
+    imm_str: str
+) -> bool:
+    """Whether an operand is a literal that fits in a 12-bit signed immediate."""
+    try:
+        return -2048 <= int(imm_str) < 2048
+    except ValueError:
+        return False
+
+def get_expansion(
+    op: str,
+    args: list[str]
+) -> Expansion:
+    """Selects the expansion of a pseudo-instruction, sized from its operands only so that addresses do not depend on label values."""
+    if op in expansions_long and not (args and _fits_imm12(args[-1])):
+        return expansions_long[op]
+    return expansions[op]
+
+def select_expansion(
+    op: str,
+    imm: int,
+    literal: bool
+) -> Expansion:
+    """Selects the expansion of a pseudo-instruction from its parsed immediate, as get_expansion does from its text."""
+    if op in expansions_long and not (literal and -2048 <= imm < 2048):
+        return expansions_long[op]
+    return expansions[op]
+
+def _slot_value(
+    slot: tuple[str, int],
+    values: list[int]
+) -> int:
+    """Resolves an operand slot against the parsed operands."""
+    kind, value = slot
+    if kind == 'const':
+        return value
+    elif kind == 'arg':
+        return values[value]
+    elif kind == 'hi':
+        return (values[value] + 0x800) >> 12
+    else:
+        return ((values[value] & 0xFFF) ^ 0x800) - 0x800
+
+def expand_operands(
+    op: str,
+    expansion: Expansion,
+    values: list[int],
+    address: int,
+    symbol: str | None = None
+) -> list[int]:
+    """
+    Encodes an expansion from parsed operands.
+
+    :param op: pseudo-instruction mnemonic
+    :type op: str
+    :param expansion: expansion of op selected for its operands
+    :type expansion: Expansion
+    :param values: register numbers and the resolved immediate, in operand order
+    :type values: list[int]
+    :param address: address of the first instruction
+    :type address: int
+    :param symbol: label the immediate was resolved from, branch and jump targets are then made relative to each instruction
+    :type symbol: str | None
+    :return: encoded words
+    :rtype: list[int]
+    """
+    words = []
+    for index, (mnemonic, opcode_type, slots) in enumerate(expansion.instructions):
+        operands = [_slot_value(slot, values) for slot in slots]
+        kind, value = slots[-1]
+        if opcode_type in offset_ranges and kind == 'arg':
+            offset = values[value] - (address + 4 * index) if symbol is not None else values[value]
+            operands[-1] = check_offset(offset, opcode_type, symbol or str(values[value]))
+        words.append(encode(mnemonic, opcode_type, operands))
+    return words
@@ -0,0 +1,77 @@
+"""
+Branch relaxation: conditional branches to a label out of the B-type range (±4 KiB) are rewritten into the inverted
+branch over a jal, which reaches ±1 MiB.
+
+    beq r1, r2, far     ->      bne r1, r2, 8
+                                jal r0, far
+
+Branches start short and are only ever lengthened, so relaxation converges. Each round lengthens every branch that is
+out of range, and addresses are then shifted by 4 bytes per lengthened branch before them, found by bisecting the
+sorted branch positions, rather than laying the program out again. Only .text with .align, whose padding depends on
+addresses, is laid out again after each round.
+"""
+from bisect import bisect_left
+
+from src.helpers import offset_ranges
+from src.ir import NONE, Program, layout, operation_ids
+
+# Conditional branch -> branch taken on the opposite condition
+inverted_branches = {'beq': 'bne', 'bne': 'beq', 'blt': 'bge', 'bge': 'blt', 'bltu': 'bgeu', 'bgeu': 'bltu'}
+_inverted_ids = {operation_ids[op]: operation_ids[inverted] for op, inverted in inverted_branches.items()}
+_JAL = operation_ids['jal']
+
+def relax(
+    program: Program
+) -> Program:
+    """
+    Lengthens the conditional branches whose label is out of range.
+
+    :param program: whole program, as built by src.ir.build
+    :type program: Program
+    :return: program with each long branch replaced by the inverted branch and a jal, on the same line; program itself if no branch is out of range
+    :rtype: Program
+    """
+    addresses, end, aligned = layout(program)
+    low, high = offset_ranges['B']
+    if end <= high:
+        # Every offset within .text is in range
+        return program
+
+    targets = {}    # label in .text -> row index
+    for index, label in enumerate(program.labels):
+        if label != NONE and addresses[index] >= 0:
+            targets[label] = index
+    branches = [
+        (index, targets[symbol])
+        for index, (op_id, symbol) in enumerate(zip(program.ops, program.symbols))
+        if op_id in _inverted_ids and addresses[index] >= 0 and symbol in targets
+    ]
+
+    lengthened = set()
+    shifts = []     # sorted indices of the branches lengthened since addresses were laid out
+    while branches:
+        def address(index: int) -> int:
+            return addresses[index] + 4 * bisect_left(shifts, index)
+
+        out_of_range = [index for index, target in branches if not low <= address(target) - address(index) <= high]
+        if not out_of_range:
+            break
+
+        lengthened.update(out_of_range)
+        branches = [(index, target) for index, target in branches if index not in lengthened]
+        if aligned:
+            addresses = layout(program, lengthened)[0]
+        else:
+            shifts = sorted(shifts + out_of_range)
+
+    if not lengthened:
+        return program
+
+    replacements = {}
+    for index in lengthened:
+        op_id, rs1, rs2, _, _, symbol, label, line_number = program.row(index)
+        replacements[index] = [
+            (_inverted_ids[op_id], rs1, rs2, 0, 8, NONE, label, line_number),
+            (_JAL, 0, 0, 0, 0, symbol, NONE, line_number),
+        ]
+    return program.splice(replacements)
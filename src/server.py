@@ -0,0 +1,162 @@
+"""
+Persistent assembler server, so that editors and build tools pay the interpreter and import startup only once.
+
+Speaks a JSON-lines protocol, one request object per line and one response object per line, over stdin/stdout or a Unix socket:
+    {"id": 1, "source": "addi r1, r0, 1", "format": "hex"}
+    {"id": 1, "ok": true, "format": "hex", "data": "00100093\\n", "labels": {}}
+
+A request gives either "source" text or a "path" to read, and optionally "format" ('list' by default). With both "path" and
+"output", the output file is written as the CLI would, using the build cache, and only {"id", "ok", "output"} is returned.
+'bin' data is base64-encoded. Failed requests return {"id", "ok": false, "error": message}.
+
+Run with:
+    uv run -m src.server [socket path]
+"""
+import base64
+import json
+import os
+import socket
+import socketserver
+import sys
+from typing import IO
+
+from src.assemble import assemble_program
+from src.batch import try_assemble_file
+from src.cache import CACHE_DIR
+from src.errors import AssemblyError
+from src.output import OutputFormat, to_bytes, to_ihex, to_list, to_readmemh
+
+_formatters = {
+    OutputFormat.LIST: to_list,
+    OutputFormat.HEX: to_readmemh,
+    OutputFormat.IHEX: to_ihex,
+    OutputFormat.BIN: lambda words: base64.b64encode(to_bytes(words)).decode(),
+}
+
+def handle_request(
+    request: dict,
+    cache_dir: str | None = CACHE_DIR
+) -> dict:
+    """
+    Serves one assemble request, errors are returned in the response rather than raised.
+
+    :param request: decoded request object, see the module docstring
+    :type request: dict
+    :param cache_dir: build cache directory used for requests with an output file, None to disable the cache
+    :type cache_dir: str | None
+    :return: response object
+    :rtype: dict
+    """
+    response = {'id': request.get('id'), 'ok': False}
+    try:
+        format = OutputFormat(request.get('format', OutputFormat.LIST))
+        path, output = request.get('path'), request.get('output')
+
+        if path is not None and output is not None:
+            error = try_assemble_file(path, output, format, cache_dir=cache_dir)
+            if error:
+                response['error'] = error
+            else:
+                response.update(ok=True, output=output)
+            return response
+
+        include_path = ()
+        if 'source' in request:
+            source = request['source']
+        elif path is not None:
+            with open(path) as file:
+                source = file.read()
+            # Included files are searched next to the file, as the CLI does
+            include_path = (os.path.dirname(path) or '.',)
+        else:
+            raise ValueError("Request has neither 'source' nor 'path'")
+
+        program = assemble_program(source, include_path)
+        response.update(ok=True, format=format.value, data=_formatters[format](program.words), labels=program.labels)
+    except FileNotFoundError:
+        response['error'] = f"File not found: {request.get('path')}"
+    except AssemblyError as ae:
+        response['error'] = f"Assembly error: {ae}"
+    except Exception as e:
+        response['error'] = f"Invalid request: {e}"
+    return response
+
+def serve(
+    input: IO[str],
+    output: IO[str],
+    cache_dir: str | None = CACHE_DIR
+) -> None:
+    """
+    Answers JSON-lines requests from input until it is closed, flushing after every response.
+
+    :param input: text stream of requests
+    :type input: IO[str]
+    :param output: text stream responses are written to
+    :type output: IO[str]
+    :param cache_dir: build cache directory, None to disable the cache
+    :type cache_dir: str | None
+    """
+    for line in input:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = {'id': None, 'ok': False, 'error': f"Invalid request: {e}"}
+        else:
+            response = handle_request(request, cache_dir) if isinstance(request, dict) else {'id': None, 'ok': False, 'error': "Invalid request: not an object"}
+        output.write(json.dumps(response) + '\n')
+        output.flush()
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Serves the requests of one socket connection."""
+
+    def handle(self) -> None:
+        input = (line.decode() for line in self.rfile)
+        output = _SocketWriter(self.wfile)
+        serve(input, output, self.server.cache_dir)
+
+class _SocketWriter:
+    """Text writer over a socket's binary file object."""
+
+    def __init__(self, file) -> None:
+        self.file = file
+
+    def write(self, text: str) -> None:
+        self.file.write(text.encode())
+
+    def flush(self) -> None:
+        self.file.flush()
+
+# Unix sockets are not available on every platform (e.g. Windows), stdin/stdout mode always is
+if hasattr(socket, 'AF_UNIX'):
+    class AssemblerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        """Unix socket server, each connection is served in its own thread."""
+        daemon_threads = True
+
+        def __init__(
+            self,
+            socket_path: str,
+            cache_dir: str | None = CACHE_DIR
+        ) -> None:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self.cache_dir = cache_dir
+            super().__init__(socket_path, _Handler)
+
+        def server_close(self) -> None:
+            super().server_close()
+            if os.path.exists(self.server_address):
+                os.unlink(self.server_address)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        if not hasattr(socket, 'AF_UNIX'):
+            sys.exit("Unix sockets are not supported on this platform, run without a socket path to serve stdin/stdout")
+        with AssemblerServer(sys.argv[1]) as server:
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    else:
+        serve(sys.stdin, sys.stdout)
@@ -0,0 +1,277 @@
+import sys
+import time
+
+import numpy as np
+
+from src.disassemble import decode, load_image, mnemonics, opcode_types
+from src.errors import AssemblyError
+
+MASK = 0xFFFFFFFF
+MEMORY_SIZE = 1 << 20   # bytes
+
+class SimulatorError(AssemblyError):
+    """Exception raised for faults while simulating a program."""
+    pass
+
+def _signed(value: int) -> int:
+    return (value ^ 0x80000000) - 0x80000000
+
+# Handlers of straight-line instructions: (regs, rd, rs1, operand) where operand is rs2 or a predecoded immediate
+def _add(regs, rd, rs1, rs2): regs[rd] = (regs[rs1] + regs[rs2]) & MASK
+def _sub(regs, rd, rs1, rs2): regs[rd] = (regs[rs1] - regs[rs2]) & MASK
+def _sll(regs, rd, rs1, rs2): regs[rd] = (regs[rs1] << (regs[rs2] & 0x1F)) & MASK
+def _slt(regs, rd, rs1, rs2): regs[rd] = int(_signed(regs[rs1]) < _signed(regs[rs2]))
+def _sltu(regs, rd, rs1, rs2): regs[rd] = int(regs[rs1] < regs[rs2])
+def _xor(regs, rd, rs1, rs2): regs[rd] = regs[rs1] ^ regs[rs2]
+def _sra(regs, rd, rs1, rs2): regs[rd] = (_signed(regs[rs1]) >> (regs[rs2] & 0x1F)) & MASK
+def _or(regs, rd, rs1, rs2): regs[rd] = regs[rs1] | regs[rs2]
+def _and(regs, rd, rs1, rs2): regs[rd] = regs[rs1] & regs[rs2]
+
+# Immediates are predecoded masked to 32 bits, except for slti
+def _addi(regs, rd, rs1, imm): regs[rd] = (regs[rs1] + imm) & MASK
+def _slti(regs, rd, rs1, imm): regs[rd] = int(_signed(regs[rs1]) < imm)
+def _sltiu(regs, rd, rs1, imm): regs[rd] = int(regs[rs1] < imm)
+def _xori(regs, rd, rs1, imm): regs[rd] = regs[rs1] ^ imm
+def _ori(regs, rd, rs1, imm): regs[rd] = regs[rs1] | imm
+def _andi(regs, rd, rs1, imm): regs[rd] = regs[rs1] & imm
+def _slli(regs, rd, rs1, shamt): regs[rd] = (regs[rs1] << shamt) & MASK
+def _srli(regs, rd, rs1, shamt): regs[rd] = regs[rs1] >> shamt
+def _srai(regs, rd, rs1, shamt): regs[rd] = (_signed(regs[rs1]) >> shamt) & MASK
+def _set(regs, rd, rs1, value): regs[rd] = value  # lui and auipc, value computed at predecode
+
+_handlers = {
+    'add': _add, 'sub': _sub, 'sll': _sll, 'slt': _slt, 'sltu': _sltu,
+    'xor': _xor, 'sra': _sra, 'or': _or, 'and': _and,
+    'addi': _addi, 'slti': _slti, 'sltiu': _sltiu, 'xori': _xori, 'ori': _ori, 'andi': _andi,
+    'slli': _slli, 'srli': _srli, 'srai': _srai,
+    'lui': _set, 'auipc': _set,
+}
+
+# Loads: (size in bytes, sign-extend), stores: size in bytes
+_loads = {'lb': (1, True), 'lh': (2, True), 'lw': (4, False), 'lbu': (1, False), 'lhu': (2, False)}
+_stores = {'sb': 1, 'sh': 2, 'sw': 4}
+
+# Branch conditions on (rs1 value, rs2 value)
+_branches = {
+    'beq': lambda a, b: a == b,
+    'bne': lambda a, b: a != b,
+    'blt': lambda a, b: _signed(a) < _signed(b),
+    'bge': lambda a, b: _signed(a) >= _signed(b),
+    'bltu': lambda a, b: a < b,
+    'bgeu': lambda a, b: a >= b,
+}
+
+class Simulator:
+    """
+    RV32I/ORV instruction-set simulator.
+
+    Each word is predecoded once into a (handler, operands) record cached by PC, and straight-line runs of records are
+    cached as basic blocks, so execution never decodes an instruction twice. Stores into the program invalidate the caches.
+    """
+
+    def __init__(
+        self,
+        words: list[int] | np.ndarray,
+        memory_size: int = MEMORY_SIZE
+    ) -> None:
+        words = np.asarray(words, dtype=np.uint32)
+        if len(words) * 4 > memory_size:
+            raise SimulatorError(f"Program of {len(words)} words does not fit in {memory_size} bytes of memory")
+
+        self.regs = [0] * 32
+        self.pc = 0
+        self.memory = bytearray(memory_size)
+        self.memory[:len(words) * 4] = words.astype('<u4').tobytes()
+        self.text_end = len(words) * 4  # the program halts when it reaches the end of its text
+        self.instructions = 0
+        self.seconds = 0.0
+        self.halted = False
+
+        self.records = {}   # pc -> predecoded record
+        self.blocks = {}    # pc -> basic block, see _block
+        self._predecode_range(0, self.text_end)
+
+    def _predecode_range(
+        self,
+        start: int,
+        end: int
+    ) -> None:
+        """Predecodes the words in [start, end) into records, vectorized over the range."""
+        words = np.frombuffer(self.memory, dtype='<u4', count=(end - start) // 4, offset=start)
+        decoded = decode(words)
+        for index, fields in enumerate(zip(*(field.tolist() for field in decoded))):
+            pc = start + index * 4
+            self.records[pc] = self._make_record(pc, *fields)
+
+    def _make_record(
+        self,
+        pc: int,
+        mnemonic_id: int,
+        rd: int,
+        rs1: int,
+        rs2: int,
+        imm: int
+    ) -> tuple:
+        """
+        Builds the record of one decoded word: (kind, handler, a, b, c).
+
+        kind is 'op' for straight-line instructions, 'nop' for those without effect (writes to r0), or 'jump', 'store' and 'invalid', which end a basic block.
+        """
+        if mnemonic_id < 0:
+            return ('invalid', None, 0, 0, 0)
+
+        op, opcode_type = mnemonics[mnemonic_id], opcode_types[mnemonic_id]
+        if opcode_type == 'B':
+            return ('jump', _branches[op], rs1, rs2, pc + imm)
+        elif opcode_type == 'J':
+            return ('jump', 'jal', rd, 0, pc + imm)
+        elif opcode_type == 'JI':
+            return ('jump', 'jalr', rd, rs1, imm)
+        elif opcode_type == 'S':
+            return ('store', _stores[op], rs2, rs1, imm)
+        elif rd == 0:
+            return ('nop', None, 0, 0, 0)
+        elif opcode_type == 'LI':
+            size, signed = _loads[op]
+            return ('op', self._loader(size, signed), rd, rs1, imm)
+        elif op == 'lui':
+            return ('op', _set, rd, 0, (imm << 12) & MASK)
+        elif op == 'auipc':
+            return ('op', _set, rd, 0, (pc + (imm << 12)) & MASK)
+        elif op == 'slti':
+            return ('op', _handlers[op], rd, rs1, imm)
+        elif opcode_type == 'R':
+            return ('op', _handlers[op], rd, rs1, rs2)
+        else:
+            return ('op', _handlers[op], rd, rs1, imm & MASK)
+
+    def _loader(
+        self,
+        size: int,
+        signed: bool
+    ):
+        """Handler of a load of size bytes from this simulator's memory."""
+        memory = self.memory
+        def load(regs, rd, rs1, imm):
+            address = (regs[rs1] + imm) & MASK
+            if address + size > len(memory):
+                raise SimulatorError(f"Memory access out of range: {address:#x}")
+            regs[rd] = int.from_bytes(memory[address:address + size], 'little', signed=signed) & MASK
+        return load
+
+    def _block(
+        self,
+        pc: int
+    ) -> tuple:
+        """
+        Basic block starting at pc, built from the record cache on first use.
+
+        :return: (straight-line records, number of instructions in them, terminator record or None at the end of the text, pc of the terminator)
+        """
+        block = self.blocks.get(pc)
+        if block is not None:
+            return block
+
+        start = pc
+        body = []
+        terminator = None
+        while pc != self.text_end:
+            record = self.records.get(pc)
+            if record is None:
+                raise SimulatorError(f"PC out of program: {pc:#x}")
+            if record[0] not in ['op', 'nop']:
+                terminator = record
+                break
+            if record[0] == 'op':
+                body.append(record[1:])
+            pc += 4
+
+        block = (body, (pc - start) // 4, terminator, pc)
+        self.blocks[start] = block
+        return block
+
+    def step_block(self) -> None:
+        """Executes one basic block and its terminator."""
+        body, count, terminator, pc = self._block(self.pc)
+        regs = self.regs
+        for handler, a, b, c in body:
+            handler(regs, a, b, c)
+        self.instructions += count
+
+        if terminator is None:
+            self.pc = pc
+            self.halted = True
+            return
+
+        kind, handler, a, b, c = terminator
+        self.instructions += 1
+        next_pc = pc + 4
+        if kind == 'jump':
+            if handler == 'jal':
+                if a:
+                    regs[a] = pc + 4
+                next_pc = c
+            elif handler == 'jalr':
+                target = (regs[b] + c) & MASK & ~1
+                if a:
+                    regs[a] = pc + 4
+                next_pc = target
+            elif handler(regs[a], regs[b]):
+                next_pc = c
+            # A jump to itself never changes state again
+            if next_pc == pc:
+                self.halted = True
+        elif kind == 'store':
+            address = (regs[b] + c) & MASK
+            if address + handler > len(self.memory):
+                raise SimulatorError(f"Memory access out of range: {address:#x}")
+            self.memory[address:address + handler] = (regs[a] & ((1 << handler * 8) - 1)).to_bytes(handler, 'little')
+            if address < self.text_end:
+                # Self-modifying code
+                self._predecode_range(address & ~3, min(self.text_end, (address + handler + 3) & ~3))
+                self.blocks.clear()
+        else:
+            raise SimulatorError(f"Invalid instruction at {pc:#x}")
+
+        self.pc = next_pc
+        if next_pc == self.text_end:
+            self.halted = True
+
+    def run(
+        self,
+        max_instructions: int = 10_000_000
+    ) -> int:
+        """
+        Runs until the program reaches the end of its text, jumps to itself or executes max_instructions.
+
+        :param max_instructions: instruction budget
+        :type max_instructions: int
+        :return: number of instructions executed
+        :rtype: int
+        """
+        start = time.perf_counter()
+        try:
+            while not self.halted and self.instructions < max_instructions:
+                self.step_block()
+        finally:
+            self.seconds += time.perf_counter() - start
+        return self.instructions
+
+    @property
+    def instructions_per_second(self) -> float:
+        return self.instructions / self.seconds if self.seconds else 0.0
+
+if __name__ == "__main__":
+    file_name = sys.argv[1]
+    if file_name.endswith('.asm'):
+        from src.assemble import assemble_words
+        with open(file_name) as file:
+            words = assemble_words(file.read())
+    else:
+        words = load_image(file_name)
+
+    simulator = Simulator(words)
+    simulator.run()
+    for reg in range(32):
+        print(f'r{reg:<2} = {simulator.regs[reg]:#010x}')
+    print(f'{simulator.instructions} instructions in {simulator.seconds:.3f}s ({simulator.instructions_per_second:,.0f} instructions/s)')
@@ -171,25 +171,64 @@ def test_addi_invalid_imm():
     except InvalidArgumentError as e:
         assert isinstance(e, InvalidArgumentError)
 
-def test_get_pseudo_args():
-    from src.assemble import get_pseudo_args
-    metadata = {}
-    op = "mv"
-    non_op = "r1, r2"
-    args = get_pseudo_args(op, non_op, metadata)
-    assert args == ['00001', '00010']
-
-    op = "li"
-    non_op = "r3, 1000"
-    args = get_pseudo_args(op, non_op, metadata)
-    assert args == ['00011', '001111101000']
-
-def test_replace_args_in_pseudo():
-    from src.assemble import replace_args_in_pseudo
-    pseudo_inst = "addi x0, x0, IMM"
-    args = ['00001', '001111101000']  # rd = r1, imm = 1000
-    replaced_inst = replace_args_in_pseudo(pseudo_inst, args)
-    assert replaced_inst == "addi r1, r1, 1000"
+def test_pseudo_li():
+    from src.assemble import assemble_line
+    metadata = {
+        'labels': {},
+        'address': 0,
+    }
+    instructions = assemble_line("li r3, 1000", metadata)
+    assert instructions == ['001111101000' + '00000' + '000' + '00011' + '0010011']  # addi r3, r0, 1000
+
+    instructions = assemble_line("li r3, 305422335", metadata)  # 0x12345fff
+    assert instructions == [
+        '00010010001101000110' + '00011' + '0110111',                  # lui r3, 0x12346
+        '111111111111' + '00011' + '000' + '00011' + '0010011',         # addi r3, r3, -1
+    ]
+
+def test_pseudo_li_range():
+    import pytest
+    from src.assemble import assemble_words
+    from src.errors import AssemblyError
+    # Unsigned and signed 32-bit constants load the same bits
+    assert assemble_words("li r1, 4294967295\nli r2, 2147483648") == assemble_words("lui r1, 0\naddi r1, r1, -1\nli r2, -2147483648")
+    for imm in ['99999999999', '4294967296', '-2147483649']:
+        with pytest.raises(AssemblyError, match='out of range'):
+            assemble_words(f"li r1, {imm}")
+
+def test_pseudo_expansion_size_with_labels():
+    from src.assemble import assemble
+    instructions = \
+    """    li r1, target
+        la r2, target
+    target:
+        ret"""
+
+    assembled = assemble(instructions).splitlines()
+    assert len(assembled) == 5
+    assert assembled[1] == '000000010000' + '00001' + '000' + '00001' + '0010011'  # addi r1, r1, 16
+    assert assembled[4] == '000000000000' + '00001' + '000' + '00000' + '1100111'  # jalr r0, r1, 0
+
+def test_pseudo_not_neg():
+    from src.assemble import assemble_line
+    metadata = {
+        'labels': {},
+        'address': 0,
+    }
+    assert assemble_line("not r1, r2", metadata) == ['111111111111' + '00010' + '100' + '00001' + '0010011']
+    assert assemble_line("neg r1, r2", metadata) == ['0100000' + '00010' + '00000' + '000' + '00001' + '0110011']
+
+def test_pseudo_invalid_args():
+    from src.assemble import assemble_line
+    metadata = {
+        'labels': {},
+        'address': 0,
+    }
+    try:
+        assemble_line("mv r1", metadata)
+        assert False, "Expected InvalidArgumentError"
+    except InvalidArgumentError as e:
+        assert isinstance(e, InvalidArgumentError)
 
 def test_pseudo_mv():
     from src.assemble import assemble_line
@@ -221,7 +260,126 @@ def test_instructions():
 """00000000101000000000000010010011
 00000001010000000000000100010011
 00000000001000001000000110110011
-00000000000000011000101001100011
+00000000000000011000010001100011
 01000000000100010000001000110011
 00000000000000000000000000010011"""
 
+
+def test_forward_and_backward_labels():
+    from src.assemble import assemble
+    instructions = \
+    """loop:
+        beq r1, r0, end
+        addi r1, r1, -1
+        beq r0, r0, loop
+    end:
+        addi r0, r0, 0"""
+
+    assembled = assemble(instructions).splitlines()
+    assert len(assembled) == 4
+    assert assembled[0] == '0000000' + '00000' + '00001' + '000' + '0110' + '0' + '1100011'  # end - 0 = 12
+    assert assembled[2] == '1111111' + '00000' + '00000' + '000' + '1100' + '1' + '1100011'  # loop - 8 = -8
+
+def test_undefined_label():
+    from src.assemble import assemble
+    from src.errors import UndefinedLabelError
+    try:
+        assemble("beq r1, r0, nowhere")
+        assert False, "Expected UndefinedLabelError"
+    except UndefinedLabelError as e:
+        assert isinstance(e, UndefinedLabelError)
+
+def test_assemble_stream_matches_assemble():
+    from src.assemble import assemble_stream, assemble_words
+    lines = ["start:\n"]
+    for i in range(50):
+        lines.append(f"    beq r1, r0, skip{i}\n")
+        lines.append(f"    addi r1, r1, {i}\n")
+        lines.append(f"skip{i}:\n")
+    lines.append("    beq r0, r0, start\n")
+
+    chunks = []
+    metadata = assemble_stream(iter(lines), chunks.append, flush_size=8)
+    assert len(chunks) > 1
+    assert [word for chunk in chunks for word in chunk] == assemble_words(''.join(lines))
+    assert metadata['labels']['skip49'] == 400
+
+def test_assemble_stream_builds_no_program(monkeypatch):
+    import src.assemble
+    from src.assemble import assemble_stream, assemble_words
+    source = "start:\n" + "    addi r1, r1, 1\n    bne r1, r0, start\n" * 300
+    monkeypatch.setattr(src.assemble, 'build', None)
+
+    words = []
+    assemble_stream(iter(source.splitlines()), words.extend, flush_size=8)
+    monkeypatch.undo()
+    assert words == assemble_words(source)
+
+def test_assemble_stream_relaxes_far_branch(tmp_path):
+    from src.assemble import assemble_stream, assemble_words
+    lines = ["start: beq r1, r0, far\n"] + ["    addi r1, r1, 1\n"] * 1100 + ["far: bne r1, r0, start\n", "    j far\n"]
+    path = tmp_path / "far.asm"
+    path.write_text(''.join(lines))
+
+    # The beq is only known to be out of range once far is defined, long after the first words were written; the bne back
+    # to start is out of range too
+    with open(path) as file:
+        for source in (lines, iter(lines), file):
+            words, line_numbers = [], []
+            metadata = assemble_stream(source, words.extend, flush_size=8, line_out=line_numbers.extend)
+            assert words[:2] == assemble_words("bne r1, r0, 8\njal r0, 4404")
+            assert len(words) == len(line_numbers) == 1105
+            assert line_numbers[:3] == [1, 1, 2]
+            assert metadata['labels'] == {'start': 0, 'far': 4408}
+
+def test_assemble_parallel_matches_assemble():
+    from src.assemble import assemble_parallel, assemble_program
+    lines = ["start:"]
+    for i in range(40):
+        lines.append(f"    beq r1, r0, skip{i}")
+        lines.append(f"    li r2, {i * 1000}")
+        lines.append(f"skip{i}: sw r2, {i}(r3)")
+    lines.append("    j start")
+    lines.append("    .word skip3, 7")
+
+    program = assemble_program('\n'.join(lines))
+    chunks = []
+    metadata = assemble_parallel(lines, chunks.append, jobs=2, chunk_size=7, flush_size=16)
+    assert len(chunks) > 1
+    assert [word for chunk in chunks for word in chunk] == list(program.words)
+    assert metadata['labels'] == program.labels and metadata['address'] == 4 * len(program.words)
+
+def test_assemble_parallel_streams_data(monkeypatch, tmp_path):
+    import src.assemble
+    from src.assemble import assemble_parallel, assemble_words
+    source = "la r1, value\nlw r2, 0(r1)\n.data\nvalue: .word 5"
+    path = tmp_path / "data.asm"
+    path.write_text(source)
+
+    # Decided before parsing, nothing is built twice
+    monkeypatch.setattr(src.assemble, 'build', None)
+    words = []
+    with open(path) as file:
+        assert assemble_parallel(file, words.extend)['labels'] == {'value': 12}
+    monkeypatch.undo()
+    assert words == assemble_words(source)
+
+def test_assemble_program():
+    from src.assemble import assemble_program, assemble_words
+    source = """# header
+    start:
+        li r1, 100000
+        beq r1, r0, end
+
+    end: addi r2, r0, 1"""
+
+    program = assemble_program(source)
+    assert program.words.typecode == 'I'
+    assert list(program.words) == assemble_words(source)
+    assert program.labels == {'start': 0, 'end': 12}
+    assert list(program.lines) == [3, 3, 4, 6]
+
+    view = program.to_numpy()
+    assert view.tolist() == list(program.words)
+    program.words[0] = 0
+    assert view[0] == 0  # shares memory with the array
@@ -0,0 +1,67 @@
+import os
+
+from src.batch import assemble_batch, expand_inputs
+from src.output import OutputFormat
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return str(path)
+
+def test_expand_inputs(tmp_path):
+    a = _write(tmp_path / 'a.asm', 'nop\n')
+    b = _write(tmp_path / 'sub' / 'b.asm', 'nop\n')
+    _write(tmp_path / 'notes.txt', '')
+    assert expand_inputs([str(tmp_path)]) == [a, b]
+    assert expand_inputs([str(tmp_path / '*.asm'), a]) == [a]
+    assert expand_inputs(['missing.asm']) == ['missing.asm']
+
+def test_assemble_batch_continues_after_failure(tmp_path):
+    good = _write(tmp_path / 'good.asm', 'addi r1, r0, 1\n')
+    bad = _write(tmp_path / 'bad.asm', 'add r1, r2\n')
+    results = assemble_batch([bad, good, str(tmp_path / 'missing.asm')], OutputFormat.HEX)
+
+    assert [error is None for _, _, error in results] == [False, True, False]
+    assert 'Assembly error' in results[0][2]
+    assert 'File not found' in results[2][2]
+    assert not os.path.exists(tmp_path / 'bad.hex')
+    assert (tmp_path / 'good.hex').read_text() == '00100093\n'
+
+def test_assemble_batch_out_dir_collision(tmp_path):
+    first = _write(tmp_path / 'a' / 'x.asm', 'nop\n')
+    second = _write(tmp_path / 'b' / 'x.asm', 'nop\n')
+    results = assemble_batch([first, second], out_dir=str(tmp_path / 'out'))
+
+    assert results[0] == (first, str(tmp_path / 'out' / 'x.list'), None)
+    assert 'already written' in results[1][2]
+
+def test_assemble_file_with_include_is_not_cached(tmp_path):
+    from src.batch import assemble_file
+    source = _write(tmp_path / 'main.asm', '.include "inc/common.asm"\n')
+    include = _write(tmp_path / 'inc' / 'common.asm', 'nop\n')
+    output = str(tmp_path / 'main.hex')
+    cache_dir = str(tmp_path / 'cache')
+
+    assemble_file(source, output, OutputFormat.HEX, cache_dir=cache_dir)
+    assert (tmp_path / 'main.hex').read_text() == '00000013\n'
+
+    _write(tmp_path / 'inc' / 'common.asm', 'addi r1, r0, 1\n')
+    os.utime(include, (1, 1))   # distinct modification time for the include cache
+    assemble_file(source, output, OutputFormat.HEX, cache_dir=cache_dir)
+    assert (tmp_path / 'main.hex').read_text() == '00100093\n'
+
+def test_large_files_use_batch_encoder(tmp_path, monkeypatch):
+    import src.vector
+    from src.assemble import assemble_words
+    from src.batch import assemble_file
+    source = "start: addi r1, r0, 1\nli r2, 100000\nloop: beq r1, r2, end\naddi r1, r1, 1\nj loop\nend: la r3, start"
+    batches = []
+    encode_batch = src.vector.encode_batch
+    monkeypatch.setattr(src.vector, 'encode_batch', lambda *args: batches.append(1) or encode_batch(*args))
+
+    assemble_file(_write(tmp_path / 'a.asm', source), str(tmp_path / 'a.hex'), OutputFormat.HEX)
+    assert not batches
+    monkeypatch.setattr('src.assemble.BATCH_MIN_SIZE', 0)
+    assemble_file(_write(tmp_path / 'b.asm', source), str(tmp_path / 'b.hex'), OutputFormat.HEX)
+    assert batches
+    assert (tmp_path / 'b.hex').read_text() == ''.join(f'{word:08x}\n' for word in assemble_words(source))
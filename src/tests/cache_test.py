@@ -0,0 +1,82 @@
+import os
+
+from src import cache
+from src.batch import assemble_file
+from src.output import OutputFormat
+
+def test_store_and_load(tmp_path):
+    cache_dir = str(tmp_path)
+    assert cache.load('missing', cache_dir) is None
+    cache.store('key', [1, 0xFFFFFFFF], cache_dir)
+    assert list(cache.load('key', cache_dir)) == [1, 0xFFFFFFFF]
+
+def test_evicts_least_recently_used(tmp_path):
+    cache_dir = str(tmp_path)
+    cache.store('old', [0] * 4, cache_dir)
+    cache.store('new', [0] * 4, cache_dir)
+    os.utime(tmp_path / 'old.bin', (0, 0))
+    os.utime(tmp_path / 'new.bin', (1, 1))
+    cache.load('old', cache_dir)  # now the most recently used
+
+    cache.store('newest', [0] * 4, cache_dir, max_size=32)
+    assert sorted(os.listdir(tmp_path)) == ['newest.bin', 'old.bin']
+
+    # Larger than the whole cache, not stored and nothing evicted
+    cache.store('huge', [0] * 9, cache_dir, max_size=32)
+    assert sorted(os.listdir(tmp_path)) == ['newest.bin', 'old.bin']
+
+def test_source_key_changes_with_content(tmp_path):
+    source = tmp_path / 'a.asm'
+    source.write_text('nop\n')
+    key = cache.source_key(str(source))
+    assert cache.source_key(str(source)) == key
+    source.write_text('addi r1, r0, 1\n')
+    assert cache.source_key(str(source)) != key
+
+def test_assemble_file_served_from_cache(tmp_path, monkeypatch):
+    source = tmp_path / 'a.asm'
+    source.write_text('addi r1, r0, 1\n')
+    cache_dir = str(tmp_path / 'cache')
+    assemble_file(str(source), str(tmp_path / 'a.hex'), OutputFormat.HEX, cache_dir=cache_dir)
+
+    def fail(*args):
+        raise AssertionError("source parsed despite cache hit")
+    monkeypatch.setattr('src.batch.assemble_stream', fail)
+    assemble_file(str(source), str(tmp_path / 'b.hex'), OutputFormat.HEX, cache_dir=cache_dir)
+    assert (tmp_path / 'b.hex').read_text() == '00100093\n'
+
+def test_assemble_file_output_too_large_to_cache(tmp_path, monkeypatch):
+    source = tmp_path / 'a.asm'
+    source.write_text('addi r1, r0, 1\n' * 3)
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr(cache, 'CACHE_MAX_SIZE', 8)
+    assemble_file(str(source), str(tmp_path / 'a.hex'), OutputFormat.HEX, cache_dir=str(cache_dir))
+    assert (tmp_path / 'a.hex').read_text() == '00100093\n' * 3
+    assert not cache_dir.exists()
+
+def test_line_cache_evicts_least_recently_used():
+    lines = cache.LineCache(max_size=2)
+    lines.put(('nop',), [0x13])
+    lines.put(('add', 'r1', 'r2', 'r3'), [1])
+    assert lines.get(('nop',)) == (0x13,)   # now the most recently used
+    lines.put(('sub', 'r1', 'r2', 'r3'), [2])
+    assert lines.get(('add', 'r1', 'r2', 'r3')) is None
+    assert lines.stats() == cache.LineCacheStats(hits=1, misses=1, size=2, max_size=2)
+    lines.resize(0)
+    lines.put(('nop',), [0x13])
+    assert lines.stats().size == 0
+
+def test_assemble_uses_line_cache(monkeypatch):
+    from src.assemble import assemble_words, encode_line
+    line_cache = cache.LineCache()
+    monkeypatch.setattr('src.ir.line_cache', line_cache)
+    source = "loop: addi r1, r1, 1\nli r2, 100000\naddi r1, r1, 1\nli r2, 100000\nj loop\nj loop"
+    words = assemble_words(source)
+    # Label references depend on the address, they are never cached
+    assert line_cache.stats() == cache.LineCacheStats(hits=2, misses=2, size=2, max_size=cache.LINE_CACHE_SIZE)
+    assert assemble_words(source) == words
+    assert line_cache.stats().hits == 6
+
+    first = encode_line("addi r1, r1, 1", {'labels': {}, 'address': 0})
+    first.append(0)     # callers get their own list
+    assert encode_line("addi  r1, r1, 1  # again", {'labels': {}, 'address': 0}) == words[:1]
@@ -0,0 +1,64 @@
+import pytest
+
+from src.assemble import assemble_program, assemble_stream, assemble_words
+from src.errors import DirectiveError, InvalidArgumentError
+from src.link import link
+from src.objects import assemble_object
+
+def test_data_in_text_values():
+    words = assemble_words(".byte 1, 2, 3, -1\n.half 16, -2\n.half 258\n.space 2, 7\nend: .word 5, end\n.byte 9")
+    assert words == [0xFF030201, 0xFFFE0010, 0x07070102, 5, 12, 9]
+
+def test_unaligned_instruction():
+    with pytest.raises(DirectiveError):
+        assemble_words('.byte 1\nnop')
+    assert assemble_words('.byte 1\n.align 2\nnop') == [1, 0x13]
+    with pytest.raises(InvalidArgumentError):
+        assemble_words('.byte 256')
+
+def test_data_section():
+    program = assemble_program("""
+    .data
+    table: .word 1, start, table
+    .align 3
+    bytes: .byte 7
+    .text
+    start: la r1, table
+    lw r2, 0(r1)
+    """)
+    # .text is 12 bytes, .data starts at the next multiple of 8
+    assert program.labels == {'table': 16, 'bytes': 32, 'start': 0}
+    words = list(program.words)
+    assert words[:3] == assemble_words('lui r1, 0\naddi r1, r1, 16\nlw r2, 0(r1)')
+    assert words[3:] == [0, 1, 0, 16, 0, 7]
+    assert list(program.lines) == [7, 7, 8, 3, 3, 3, 3, 4, 5]
+
+    with pytest.raises(DirectiveError):
+        assemble_words('.data\nnop')
+    with pytest.raises(DirectiveError):
+        assemble_words('.section .bss')
+
+def test_incbin(tmp_path, monkeypatch):
+    blob = bytes(range(256)) * 64
+    (tmp_path / 'blob.bin').write_bytes(blob)
+    monkeypatch.chdir(tmp_path)
+
+    chunks = []
+    assemble_stream(['nop', '.incbin "blob.bin"', '.incbin "blob.bin", 1, 3'], chunks.append, flush_size=16)
+    assert any(isinstance(chunk, memoryview) for chunk in chunks)
+    words = [word for chunk in chunks for word in chunk]
+    assert words[0] == 0x13
+    assert bytes(b for word in words[1:] for b in word.to_bytes(4, 'little')) == blob + bytes([1, 2, 3, 0])
+
+    program = assemble_program('.data\nblob: .incbin "blob.bin", 0, 8\n.text\nla r1, blob')
+    assert program.labels['blob'] == 8
+    assert list(program.words[2:]) == [0x03020100, 0x07060504]
+
+def test_link_data_sections():
+    first = ".globl value\n.data\nvalue: .word 3\n.text\nla r1, value\nj next"
+    second = ".globl next\nnext: la r2, local\n.data\nlocal: .word next, value"
+    program = link([assemble_object(first), assemble_object(second)])
+    # Text of both modules, then their data
+    assert list(program.words) == assemble_words(
+        "la r1, value\nj next\nnext: la r2, local\nvalue: .word 3\nlocal: .word next, value"
+    )
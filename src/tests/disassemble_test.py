@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from benchmarks.generate import generate_program
+from src.assemble import assemble_words
+from src.disassemble import decode, disassemble, load_image, mnemonics, verify
+from src.output import OutputFormat, write_output
+
+def test_disassemble():
+    words = assemble_words("add r3, r1, r2\naddi r1, r0, -5\nlw r4, -8(r2)\nsw r4, 12(r2)\nsrai r1, r2, 3\nlui r5, 74565")
+    assert disassemble(np.array(words)) == [
+        'add r3, r1, r2',
+        'addi r1, r0, -5',
+        'lw r4, -8(r2)',
+        'sw r4, 12(r2)',
+        'srai r1, r2, 3',
+        'lui r5, 74565',
+    ]
+
+def test_decode_branch_and_jump_immediates():
+    words = assemble_words("beq r1, r2, -8\njal r1, -2048\njal r0, 1048574")
+    decoded = decode(np.array(words))
+    assert [mnemonics[i] for i in decoded.mnemonic] == ['beq', 'jal', 'jal']
+    assert decoded.imm.tolist() == [-8, -2048, 1048574]
+
+def test_round_trip_generated_program():
+    words = assemble_words('\n'.join(generate_program(3000, seed=2)))
+    text = disassemble(np.array(words, dtype=np.uint32))
+    assert assemble_words('\n'.join(text)) == words
+
+def test_invalid_word():
+    assert disassemble(np.array([0xFFFFFFFF, 0])) == ['<invalid>', '<invalid>']
+
+def test_load_image_and_verify(tmp_path):
+    words = assemble_words('\n'.join(generate_program(500, seed=4)))
+    for format in [OutputFormat.LIST, OutputFormat.BIN, OutputFormat.HEX]:
+        file_name = str(tmp_path / f'image.{format.value}')
+        write_output(words, file_name, format)
+        assert load_image(file_name).tolist() == words
+
+    for format in [OutputFormat.LIST, OutputFormat.BIN, OutputFormat.HEX]:
+        file_name = str(tmp_path / f'empty.{format.value}')
+        write_output(assemble_words('start:'), file_name, format)
+        assert load_image(file_name).tolist() == []
+
+    (tmp_path / 'bad.hex').write_text('00000013\n0000001g\n')
+    with pytest.raises(ValueError, match='bad.hex: invalid word on line 2'):
+        load_image(str(tmp_path / 'bad.hex'))
+    (tmp_path / 'bad.list').write_text('0101\n')
+    with pytest.raises(ValueError, match='bad.list: expected lines of 32 binary digits'):
+        load_image(str(tmp_path / 'bad.list'))
+
+    image = np.array(words, dtype=np.uint32)
+    image[7] ^= 1 << 20
+    assert verify(image, words).tolist() == [7]
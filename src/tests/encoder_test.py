@@ -0,0 +1,37 @@
+from src.encoder import base_words, encode, to_binary
+from src.errors import InvalidOperationError
+
+def test_base_words():
+    assert to_binary(base_words['add']) == '0000000' + '00000' + '00000' + '000' + '00000' + '0110011'
+    assert to_binary(base_words['srai']) == '0100000' + '00000' + '00000' + '101' + '00000' + '0010011'
+    assert to_binary(base_words['sw']) == '0000000' + '00000' + '00000' + '010' + '00000' + '0100011'
+    assert to_binary(base_words['lui']) == '0' * 25 + '0110111'
+
+def test_encode_r():
+    word = encode('sub', 'R', [4, 2, 1])
+    assert to_binary(word) == '0100000' + '00001' + '00010' + '000' + '00100' + '0110011'
+
+def test_encode_i_negative():
+    word = encode('addi', 'I', [3, 4, -50])
+    assert to_binary(word) == '111111001110' + '00100' + '000' + '00011' + '0010011'
+
+def test_encode_s():
+    # sw r5, -4(r2)
+    word = encode('sw', 'S', [5, 2, -4])
+    assert to_binary(word) == '1111111' + '00101' + '00010' + '010' + '11100' + '0100011'
+
+def test_encode_b():
+    # beq r3, r0, -8
+    word = encode('beq', 'B', [3, 0, -8])
+    assert to_binary(word) == '1' + '111111' + '00000' + '00011' + '000' + '1100' + '1' + '1100011'
+
+def test_encode_j():
+    # jal r1, 2048
+    word = encode('jal', 'J', [1, 2048])
+    assert to_binary(word) == '0' + '0000000000' + '1' + '00000000' + '00001' + '1101111'
+
+def test_encode_invalid_type():
+    try:
+        encode('add', 'X', [1, 2, 3])
+    except InvalidOperationError as e:
+        assert isinstance(e, InvalidOperationError)
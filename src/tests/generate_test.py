@@ -0,0 +1,14 @@
+from benchmarks.generate import generate_program, parse_mix
+from src.assemble import assemble_words
+from src.constants import opcode, pseudo
+
+def test_generated_program_covers_all_mnemonics():
+    program = generate_program(5000, seed=1)
+    mnemonics = {line.split()[0] for line in program if not line.endswith(':')}
+    assert mnemonics == set(opcode) | set(pseudo)
+    assert len(assemble_words('\n'.join(program))) >= 5000
+
+def test_generated_program_is_deterministic():
+    mix = parse_mix('R=1,B=1')
+    assert generate_program(200, mix, seed=3) == generate_program(200, mix, seed=3)
+    assert {line.split()[0] for line in generate_program(200, mix) if not line.endswith(':')} <= set(opcode)
@@ -0,0 +1,80 @@
+import pickle
+
+import pytest
+
+from src.assemble import assemble_words
+from src.errors import DuplicateLabelError, InvalidOperationError, InvalidRegisterError, UndefinedLabelError
+from src.ir import NONE, build, concatenate, encode_row, instruction_count, layout
+from src.preprocess import preprocess
+
+SOURCE = """start: add r3, r1, r2
+    sw r5, -8(r6)
+    li r1, 100000
+    beq r1, r0, start
+loop:
+    .word 1, start
+    j loop"""
+
+def _build(source: str):
+    return build(preprocess(source.splitlines()))
+
+def test_columns():
+    program = _build(SOURCE)
+    assert len(program) == 7
+    assert program.row(0) == (program.ops[0], 3, 1, 2, 0, NONE, program.symbol_ids['start'], 1)
+    # Base register second, in encoder order
+    assert (program.reg1[1], program.reg2[1], program.imms[1]) == (5, 6, -8)
+    assert program.names[program.symbols[3]] == 'start'
+    assert program.operation(4) is None and program.names[program.labels[4]] == 'loop'
+    assert list(program.lines) == [1, 2, 3, 4, 5, 6, 7]
+    assert [instruction_count(program, row) for row in [2, 5]] == [2, 2]
+    assert list(layout(program)[0]) == [0, 4, 8, 16, 20, 20, 28]
+
+def test_operands_round_trip():
+    program = _build(SOURCE)
+    lines = [f"{program.operation(row)} {', '.join(program.operands(row))}" for row in range(len(program)) if program.operation(row)]
+    assert lines == ["add r3, r1, r2", "sw r5, -8(r6)", "li r1, 100000", "beq r1, r0, start", ".word 1, start", "j loop"]
+
+def test_errors_in_line_order():
+    with pytest.raises(InvalidRegisterError, match='r32'):
+        _build("add r1, r32, r3\nfoo r1")
+    with pytest.raises(InvalidOperationError, match='foo'):
+        _build("add r1, r2, r3\nfoo r1")
+
+def test_encode_row():
+    program = _build(SOURCE)
+    metadata = {'labels': {'start': 0, 'loop': 20}, 'address': 0}
+    words = []
+    for row, metadata['address'] in zip(range(len(program)), layout(program)[0]):
+        if program.operation(row):
+            words.extend(encode_row(program, row, metadata))
+    assert words == assemble_words(SOURCE)
+    with pytest.raises(UndefinedLabelError):
+        encode_row(_build("j nowhere"), 0, {'labels': {}, 'address': 0})
+
+def test_splice_take_and_pickle():
+    program = _build(SOURCE)
+    spliced = program.splice({0: [], 2: [program.row(2), program.row(2)]})
+    assert [spliced.lines[row] for row in range(len(spliced))] == [2, 3, 3, 4, 5, 6, 7]
+    taken = pickle.loads(pickle.dumps(program.take([6, 1])))
+    assert taken.row(0) == program.row(6) and taken.row(1) == program.row(1)
+    assert taken.names == program.names
+
+def test_concatenate():
+    lines = SOURCE.splitlines()
+    program = _build(SOURCE)
+    joined = concatenate([_build('\n'.join(lines[:4])), _build('\n'.join(lines[4:]))])
+    for column in ['ops', 'reg1', 'reg2', 'reg3', 'imms']:
+        assert getattr(joined, column) == getattr(program, column)
+    assert [joined.names[symbol] for symbol in joined.symbols if symbol != NONE] == ['start', 'loop']
+    assert joined.operands(5) == ['1', 'start']
+
+    with pytest.raises(DuplicateLabelError, match='defined more than once: loop'):
+        concatenate([_build(SOURCE), _build("loop: nop")])
+
+def test_duplicate_labels():
+    from src.assemble import assemble_parallel
+    source = "a: nop\nj a\na: nop\nj a"
+    for assemble in [assemble_words, lambda source: assemble_parallel(source.splitlines(), print)]:
+        with pytest.raises(DuplicateLabelError, match='defined more than once: a'):
+            assemble(source)
@@ -0,0 +1,42 @@
+from src.errors import InvalidArgumentError, InvalidRegisterError
+from src.lexer import Statement, split_memory_operand, tokenize
+
+def test_tokenize_instruction():
+    statement = tokenize("    ADDI R1, R2, -5   # decrement")
+    assert statement.label is None
+    assert statement.mnemonic == 'addi'
+    assert statement.operands == ['r1', 'r2', '-5']
+    assert statement.comment == (22, 33)
+
+def test_tokenize_label_and_instruction():
+    statement = tokenize("loop: beq r1, r0, end")
+    assert statement == Statement('loop', 'beq', ['r1', 'r0', 'end'])
+
+def test_tokenize_no_operands():
+    assert tokenize("nop") == Statement(None, 'nop', [])
+    assert tokenize("end:") == Statement('end', None, [])
+
+def test_tokenize_empty_and_comment():
+    assert tokenize("").mnemonic is None
+    assert tokenize("   \n").mnemonic is None
+    statement = tokenize("    # only a comment")
+    assert statement.mnemonic is None and statement.label is None
+    assert statement.comment == (4, 20)
+
+def test_split_memory_operand():
+    assert split_memory_operand('-8(r2)') == ('-8', 'r2')
+    assert split_memory_operand('4 ( r31 )') == ('4', 'r31')
+    try:
+        split_memory_operand('r2')
+        assert False, "Expected InvalidArgumentError"
+    except InvalidArgumentError as e:
+        assert isinstance(e, InvalidArgumentError)
+
+def test_get_register_anchored():
+    from src.helpers import get_register_num
+    for reg_str in ['r99', 'r32', '12abc', 'r1x', 'x1', '']:
+        try:
+            get_register_num(reg_str)
+            assert False, f"Expected InvalidRegisterError for {reg_str}"
+        except InvalidRegisterError as e:
+            assert isinstance(e, InvalidRegisterError)
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from src.assemble import assemble_words
+from src.encoder import encode
+from src.errors import LinkError, UndefinedLabelError
+from src.link import link, load_objects, main
+from src.objects import Relocation, assemble_object, read_object, write_object
+
+MAIN = """
+.globl main
+main:
+    addi r1, r0, 1
+    call helper
+    li r3, helper
+    beq r1, r0, main
+    j main
+"""
+
+HELPER = """
+.globl helper
+helper:
+    la r2, table
+    ret
+table:
+    nop
+"""
+
+def test_assemble_object():
+    obj = assemble_object(MAIN)
+    assert obj.exports == ['main']
+    assert obj.imports == ['helper']
+    assert obj.symbols == {'main': ('.text', 0)}
+    assert obj.relocations['.text'] == [
+        Relocation(4, 'J', 'helper'),
+        Relocation(8, 'HI', 'helper'),
+        Relocation(12, 'LO', 'helper'),
+        Relocation(16, 'B', 'main'),
+        Relocation(20, 'J', 'main'),
+    ]
+
+def test_link_matches_single_program():
+    program = link([assemble_object(MAIN), assemble_object(HELPER)])
+    assert list(program.words) == assemble_words(MAIN + HELPER)
+    assert program.symbols == {'main': 0, 'helper': 24}
+
+def test_link_base_and_local_symbols():
+    # Both modules define a local 'loop', each reference stays in its module
+    first = assemble_object('loop: j loop')
+    second = assemble_object('nop\nloop: j loop')
+    program = link([first, second], base=0x100)
+    assert list(program.words) == assemble_words('nop\n' * 0x40 + 'a: j a\nnop\nb: j b')[0x40:]
+
+def test_link_errors():
+    with pytest.raises(UndefinedLabelError):
+        link([assemble_object(MAIN)])
+    with pytest.raises(LinkError):
+        link([assemble_object(HELPER), assemble_object(HELPER)])
+
+def test_link_branch_offsets():
+    far = assemble_object('.globl far\n' + 'nop\n' * 1100 + 'far: nop')
+    branch = assemble_object('beq r1, r0, far')
+    # Branches are relative to their own address once linked
+    assert link([far, branch]).words[-1] == encode('beq', 'B', [1, 0, -4])
+    with pytest.raises(LinkError):
+        link([branch, far])     # branches to imported symbols are not relaxed
+
+def test_object_file_round_trip(tmp_path):
+    obj = assemble_object(MAIN)
+    write_object(obj, tmp_path / 'main.o')
+    assert read_object(tmp_path / 'main.o') == obj
+
+def test_load_objects_reassembles_changed_modules(tmp_path):
+    main_asm, helper_asm = tmp_path / 'main.asm', tmp_path / 'helper.asm'
+    main_asm.write_text(MAIN)
+    helper_asm.write_text(HELPER)
+    files = [str(main_asm), str(helper_asm)]
+
+    assert load_objects(files)[1] == files
+    assert load_objects(files)[1] == []
+
+    os.utime(helper_asm, (os.path.getmtime(tmp_path / 'helper.o') + 1,) * 2)
+    assert load_objects(files)[1] == [str(helper_asm)]
+
+    assert main(files + ['-o', str(tmp_path / 'out.hex'), '-f', 'hex']) == 0
+    words = [int(line, 16) for line in (tmp_path / 'out.hex').read_text().split()]
+    assert words == assemble_words(MAIN + HELPER)
@@ -0,0 +1,59 @@
+import subprocess
+import sys
+
+from src import cache
+from src.main import CACHE_DIR, parse_args, run
+
+# Modules a common command line must not import, they are only needed by options that import them when used
+LAZY_MODULES = ['typer', 'numpy', 'concurrent.futures', 'multiprocessing', 'mmap', 'src.peephole', 'src.profiler', 'src.vector', 'src.watch', 'src.objects']
+
+# Self import time of the src modules a common command line imports, in microseconds; generous, they take about 20 ms
+IMPORT_BUDGET = 200_000
+
+def test_parse_args():
+    assert parse_args(['a.asm', '-f', 'hex', '--jobs=2', '--no-cache']) == {
+        'file_names': ['a.asm'], 'format': 'hex', 'jobs': 2, 'no_cache': True,
+    }
+    assert parse_args(['a.asm', '-o', 'out.list']) == {'file_names': ['a.asm'], 'output': 'out.list'}
+    assert parse_args(['-O', 'a.asm']) == {'file_names': ['a.asm'], 'optimize': True}
+    assert parse_args(['--watch', 'a.asm']) == {'file_names': ['a.asm'], 'watch': True}
+
+    # Left to the typer app
+    for argv in [[], ['--help'], ['a.asm', '--profile'], ['a.asm', '-f', 'elf'], ['a.asm', '-j', '0'], ['a.asm', '-o']]:
+        assert parse_args(argv) is None
+
+def test_cache_dir_matches():
+    assert CACHE_DIR == cache.CACHE_DIR
+
+def test_run(tmp_path):
+    source = tmp_path / 'a.asm'
+    source.write_text('addi r1, r0, 1\n')
+    assert run([str(source)], format='hex', no_cache=True) == 0
+    assert (tmp_path / 'a.hex').read_text() == '00100093\n'
+    assert run([str(tmp_path / 'missing.asm')], no_cache=True) == 1
+
+def test_lazy_imports():
+    # Modules imported by a common command line, in a fresh interpreter
+    result = subprocess.run(
+        [sys.executable, '-c', 'import sys, src.main, src.batch; print(*sys.modules)'],
+        capture_output=True, text=True, check=True,
+    )
+    imported = set(result.stdout.split())
+    assert 'src.assemble' in imported
+    assert not imported & set(LAZY_MODULES)
+
+def test_import_time_budget():
+    # Best of a few fresh interpreters, counting only the time spent in the src modules themselves
+    times = []
+    for _ in range(5):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import src.main, src.batch'],
+            capture_output=True, text=True, check=True,
+        )
+        total = 0
+        for line in result.stderr.splitlines():
+            self_time, _, name = line.removeprefix('import time:').split('|')
+            if name.strip().partition('.')[0] == 'src':
+                total += int(self_time)
+        times.append(total)
+    assert min(times) < IMPORT_BUDGET
@@ -0,0 +1,44 @@
+from src.output import OutputFormat, to_bytes, to_ihex, to_list, to_readmemh, write_output
+
+WORDS = [0x00A00093, 0x01400113]
+
+def test_to_bytes_little_endian():
+    assert to_bytes(WORDS) == bytes([0x93, 0x00, 0xA0, 0x00, 0x13, 0x01, 0x40, 0x01])
+
+def test_to_list():
+    assert to_list(WORDS) == '00000000101000000000000010010011\n00000001010000000000000100010011'
+
+def test_to_readmemh():
+    assert to_readmemh(WORDS) == '00a00093\n01400113\n'
+
+def test_to_ihex():
+    assert to_ihex(WORDS) == ':080000009300A0001301400170\n:00000001FF\n'
+
+def test_to_ihex_extended_address():
+    records = to_ihex([0] * 0x4001).splitlines()
+    assert records[-3] == ':020000040001F9'
+    assert records[-2] == ':0400000000000000FC'
+    assert records[-1] == ':00000001FF'
+
+def test_write_output_bin(tmp_path):
+    file_name = tmp_path / 'out.bin'
+    write_output(WORDS, str(file_name), OutputFormat.BIN)
+    assert file_name.read_bytes() == to_bytes(WORDS)
+
+def test_stream_writer_matches_write_output():
+    import io
+    from src.output import StreamWriter
+    words = list(range(1000, 1037))
+    for format in OutputFormat:
+        file = io.BytesIO()
+        writer = StreamWriter(file, format)
+        for start in range(0, len(words), 5):
+            writer.write(words[start:start + 5])
+        writer.close()
+        expected = {
+            OutputFormat.LIST: to_list(words).encode(),
+            OutputFormat.BIN: to_bytes(words),
+            OutputFormat.HEX: to_readmemh(words).encode(),
+            OutputFormat.IHEX: to_ihex(words).encode(),
+        }[format]
+        assert file.getvalue() == expected
@@ -0,0 +1,46 @@
+import logging
+
+from src.assemble import assemble_parallel, assemble_program, assemble_words
+from src.main import run
+
+def _optimized(source: str) -> list[int]:
+    return list(assemble_program(source, optimize=True).words)
+
+def test_self_moves():
+    source = "start: mv r1, r1\naddi r2, r2, 0\nadd r3, r1, r2\nbeq r3, r0, start"
+    assert _optimized(source) == assemble_words("start: add r3, r1, r2\nbeq r3, r0, start")
+    assert _optimized("mv r1, r2\naddi r2, r2, 1") == assemble_words("mv r1, r2\naddi r2, r2, 1")
+
+def test_back_to_back_li():
+    source = "li r1, 5\nloop: li r1, 100000\nli r2, 1\nli r3, 1\nj loop"
+    assert _optimized(source) == assemble_words("loop: li r1, 100000\nli r2, 1\nli r3, 1\nj loop")
+
+def test_branches_to_next_instruction():
+    # Removing the mv makes the j a branch to the next instruction
+    source = "j next\nmv r1, r1\nnext: beq r1, r2, done\n.globl done\ndone: call done\nbne r1, r0, end\nend: .word 7"
+    program = assemble_program(source, optimize=True)
+    assert list(program.words) == assemble_words("done: call done\n.word 7")
+    assert program.labels == {'next': 0, 'done': 0, 'end': 4}
+
+def test_data_is_left_alone():
+    source = "addi r1, r1, 0\n.data\n.word 1\n.text\nmv r2, r2"
+    assert _optimized(source) == [1]
+
+def test_parallel_report_matches():
+    source = ["li r1, 1", "li r1, 2", "mv r3, r3"] * 20
+    words = []
+    removed = assemble_parallel(source, words.extend, jobs=2, optimize=True)['removed']
+    assert words == _optimized('\n'.join(source))
+    # Once the mv are gone, every li but the last is overwritten
+    assert len(removed) == 20 + 39
+    assert [removal.rule for removal in removed[:2]] == ['dead-li', 'self-move']
+
+def test_report(tmp_path, caplog):
+    source = tmp_path / 'a.asm'
+    source.write_text("li r1, 1\nli r1, 2\nmv r2, r2\n")
+    with caplog.at_level(logging.INFO):
+        assert run([str(source)], format='hex', no_cache=True, optimize=True) == 0
+    assert (tmp_path / 'a.hex').read_text() == '00200093\n'
+    assert f"{source}: removed 2 instruction(s)" in caplog.text
+    assert "line 1: li r1, 1 (overwritten by the next li)" in caplog.text
+    assert "line 3: mv r2, r2 (moves a register to itself)" in caplog.text
@@ -0,0 +1,70 @@
+import pytest
+
+from src.assemble import assemble_program, assemble_words
+from src.errors import DirectiveError, InvalidArgumentError
+from src.lexer import Statement
+from src.preprocess import _include_cache, load_include, preprocess
+
+def test_macro_expansion():
+    source = """
+    .macro push reg, off
+        sw \\reg, \\off(r2)
+    .endm
+    .macro loop_until_zero reg
+    loop_\\@:
+        addi \\reg, \\reg, -1
+        bne \\reg, r0, loop_\\@
+    .endm
+    start: push r1, 4
+    loop_until_zero r3
+    loop_until_zero r4
+    """
+    expected = """
+    start: sw r1, 4(r2)
+    loop_1:
+        addi r3, r3, -1
+        bne r3, r0, loop_1
+    loop_2:
+        addi r4, r4, -1
+        bne r4, r0, loop_2
+    """
+    assert assemble_words(source) == assemble_words(expected)
+
+def test_macro_body_statements_are_reused():
+    lines = ['.macro twice', 'nop', 'nop', '.endm', 'twice', 'twice']
+    statements = [statement for _, statement in preprocess(lines)]
+    assert statements[0] == Statement(None, 'nop', [])
+    assert len(statements) == 4
+    assert statements[0] is statements[2]
+
+def test_macro_errors():
+    with pytest.raises(DirectiveError):
+        list(preprocess(['.macro m', 'nop']))
+    with pytest.raises(InvalidArgumentError):
+        list(preprocess(['.macro m a', 'nop', '.endm', 'm r1, r2']))
+    with pytest.raises(DirectiveError):
+        list(preprocess(['.macro m', 'm', '.endm', 'm']))
+
+def test_include(tmp_path, monkeypatch):
+    (tmp_path / 'lib').mkdir()
+    (tmp_path / 'lib' / 'Common.asm').write_text('.macro clear reg\naddi \\reg, r0, 0\n.endm\n.include "nested.asm"\n')
+    (tmp_path / 'lib' / 'nested.asm').write_text('helper: nop\n')
+    monkeypatch.chdir(tmp_path)
+
+    source = 'entry: .include "Common.asm"\nclear r5\nj helper'
+    program = assemble_program(source, include_path=[str(tmp_path / 'lib')])
+    assert list(program.words) == assemble_words('entry:\nhelper: nop\naddi r5, r0, 0\nj helper')
+    assert program.lines.tolist() == [1, 2, 3]
+
+    with pytest.raises(DirectiveError):
+        assemble_words('.include "missing.asm"')
+
+def test_include_cache(tmp_path):
+    path = tmp_path / 'a.asm'
+    path.write_text('nop\n')
+    first = load_include(str(path))
+    assert load_include(str(path)) is first
+
+    path.write_text('nop\nnop\n')
+    _include_cache[str(path)] = (0, first)  # stale modification time
+    assert len(load_include(str(path))) == 2
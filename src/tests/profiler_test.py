@@ -0,0 +1,39 @@
+import json
+
+import src.ir
+from src.assemble import assemble_words
+from src.profiler import Profiler
+
+PROGRAM = """start:
+    addi r1, r0, 1
+    li r2, 100000
+    beq r1, r2, start
+    add r3, r1, r2"""
+
+def test_profiler_counts_and_phases():
+    with Profiler() as profiler:
+        assemble_words(PROGRAM)
+
+    assert profiler.types == {'I': 2, 'U': 1, 'B': 1, 'R': 1, 'PSEUDO': 1}
+    assert profiler.mnemonics['addi'] == 2
+    assert profiler.mnemonics['li'] == 1
+    assert profiler.phases['parse'][0] == 5
+    assert profiler.phases['build'][0] == 5
+    assert profiler.phases['labels'][0] == 1
+    assert profiler.phases['pseudo'][0] == 1
+    assert all(seconds >= 0 for _, seconds in profiler.phases.values())
+    assert json.loads(profiler.to_json())['types']['PSEUDO'] == 1
+    assert 'parse' in profiler.report()
+
+def test_profiler_disable_restores_functions():
+    encode = src.ir.encode
+    profiler = Profiler()
+    profiler.enable()
+    assert src.ir.encode is not encode
+    profiler.disable()
+    assert src.ir.encode is encode
+    assert 'wrapper' not in repr(src.ir.Program.parse)
+
+    # Nothing is recorded once disabled
+    assemble_words(PROGRAM)
+    assert not profiler.mnemonics
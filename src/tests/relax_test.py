@@ -0,0 +1,59 @@
+import pytest
+
+from src.assemble import assemble_parallel, assemble_program, assemble_words
+from src.encoder import encode
+from src.errors import InvalidArgumentError
+from src.simulator import Simulator
+
+def _nops(count: int) -> str:
+    return "nop\n" * count
+
+def test_short_branches_stay_compact():
+    source = "beq r1, r0, end\n" + _nops(1000) + "end: nop"
+    words = assemble_words(source)
+    assert len(words) == 1002
+    assert words[0] == encode('beq', 'B', [1, 0, 4004])
+
+def test_far_branch_is_relaxed():
+    source = "start: blt r1, r2, far\n" + _nops(1100) + "far: nop\nbgeu r3, r0, start"
+    program = assemble_program(source)
+    assert program.labels['far'] == 4 * 1102
+    assert list(program.words[:2]) == [encode('bge', 'B', [1, 2, 8]), encode('jal', 'J', [0, 4 * 1101])]
+    assert program.words[-2:].tolist() == [encode('bltu', 'B', [3, 0, 8]), encode('jal', 'J', [0, -4 * 1104])]
+    assert list(program.lines[:2]) == [1, 1]
+    words = []
+    assert assemble_parallel(source.splitlines(), words.extend, jobs=2)['labels'] == program.labels
+    assert words == list(program.words)
+
+def test_relaxation_cascades():
+    # Lengthening the second branch pushes 'near' out of the first one's range
+    source = "beq r1, r0, near\nbeq r2, r0, far\n" + _nops(1021) + "near: nop\n" + _nops(1100) + "far: nop"
+    words = assemble_words(source)
+    assert len(words) == 2 + 1021 + 1 + 1100 + 1 + 2
+    assert words[:4] == [
+        encode('bne', 'B', [1, 0, 8]), encode('jal', 'J', [0, 4 * 1024]),
+        encode('bne', 'B', [2, 0, 8]), encode('jal', 'J', [0, 4 * 2123]),
+    ]
+
+def test_relaxation_with_align():
+    source = "beq r1, r0, far\n" + _nops(1100) + ".align 4\nfar: nop"
+    words = assemble_words(source)
+    # The jal moves the nops 4 bytes down, .align pads to 16 bytes after them
+    assert len(words) == 1104 + 1
+    assert words[1] == encode('jal', 'J', [0, 4 * 1104 - 4])
+
+def test_relaxed_branch_runs():
+    source = "addi r1, r0, 1\nbne r1, r0, far\naddi r2, r0, 1\n" + _nops(1100) + "far: addi r3, r0, 1"
+    simulator = Simulator(assemble_words(source))
+    simulator.run()
+    assert simulator.regs[2] == 0
+    assert simulator.regs[3] == 1
+
+def test_offset_range_errors():
+    with pytest.raises(InvalidArgumentError):
+        assemble_words("beq r1, r0, 4096")   # literal offsets are not relaxed
+    with pytest.raises(InvalidArgumentError):
+        assemble_words("beq r1, r0, 6\nbeq r1, r0, 3")
+    with pytest.raises(InvalidArgumentError):
+        assemble_words("jal r0, 1048576")
+    assert assemble_words("j -1048576") == [encode('jal', 'J', [0, -1048576])]
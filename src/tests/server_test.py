@@ -0,0 +1,58 @@
+import base64
+import io
+import json
+import socket
+import threading
+
+import pytest
+
+import src.server
+from src.client import Client
+from src.server import handle_request, serve
+
+def test_handle_request():
+    response = handle_request({'id': 7, 'source': 'start: addi r1, r0, 1', 'format': 'hex'})
+    assert response == {'id': 7, 'ok': True, 'format': 'hex', 'data': '00100093\n', 'labels': {'start': 0}}
+
+    response = handle_request({'source': 'nop', 'format': 'bin'})
+    assert base64.b64decode(response['data']) == bytes.fromhex('13000000')
+
+    assert 'Assembly error' in handle_request({'source': 'add r1, r2'})['error']
+    assert 'File not found' in handle_request({'path': 'missing.asm'})['error']
+    assert 'Invalid request' in handle_request({'source': 'nop', 'format': 'elf'})['error']
+
+def test_handle_request_includes(tmp_path):
+    (tmp_path / 'common.asm').write_text('addi r1, r0, 1\n')
+    (tmp_path / 'main.asm').write_text('.include "common.asm"\nnop\n')
+    response = handle_request({'path': str(tmp_path / 'main.asm'), 'format': 'hex'})
+    assert response['ok'] and response['data'] == '00100093\n00000013\n'
+
+def test_serve_json_lines():
+    requests = [{'id': 1, 'source': 'nop'}, 'not json', {'id': 2, 'source': 'bad'}]
+    input = io.StringIO('\n'.join(r if isinstance(r, str) else json.dumps(r) for r in requests) + '\n')
+    output = io.StringIO()
+    serve(input, output, cache_dir=None)
+
+    responses = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [response['ok'] for response in responses] == [True, False, False]
+    assert responses[0]['data'] == '00000000000000000000000000010011'
+    assert responses[2]['id'] == 2
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="Unix sockets are not available")
+def test_socket_client(tmp_path):
+    source = tmp_path / 'a.asm'
+    source.write_text('addi r1, r0, 1\n')
+    socket_path = str(tmp_path / 'asm.sock')
+
+    with src.server.AssemblerServer(socket_path, cache_dir=None) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with Client(socket_path) as client:
+                assert client.request(source='nop', format='hex')['data'] == '00000013\n'
+                response = client.request(path=str(source), output=str(tmp_path / 'a.hex'), format='hex')
+                assert response['ok']
+        finally:
+            server.shutdown()
+
+    assert (tmp_path / 'a.hex').read_text() == '00100093\n'
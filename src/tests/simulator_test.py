@@ -0,0 +1,78 @@
+from src.assemble import assemble_words
+from src.errors import AssemblyError
+from src.simulator import Simulator, SimulatorError
+
+def _run(program: str, **kwargs) -> Simulator:
+    simulator = Simulator(assemble_words(program), **kwargs)
+    simulator.run()
+    return simulator
+
+def test_loop_sum():
+    simulator = _run("""
+        addi r1, r0, 10         # counter
+        addi r2, r0, 0          # sum
+        add r2, r2, r1
+        addi r1, r1, -1
+        bne r1, r0, -8          # back to add
+    """)
+    assert simulator.halted
+    assert simulator.regs[2] == 55
+    assert simulator.instructions == 2 + 3 * 10
+    # The loop body was predecoded into a single cached block
+    assert 8 in simulator.blocks
+
+def test_memory_and_sign_extension():
+    simulator = _run("""
+        li r1, -2
+        li r2, 1024
+        sw r1, 4(r2)
+        lb r3, 4(r2)
+        lbu r4, 4(r2)
+        lh r5, 4(r2)
+        lw r6, 4(r2)
+    """)
+    assert simulator.regs[3] == 0xFFFFFFFE
+    assert simulator.regs[4] == 0xFE
+    assert simulator.regs[5] == 0xFFFFFFFE
+    assert simulator.regs[6] == 0xFFFFFFFE
+
+def test_call_ret_and_halt():
+    simulator = _run("""
+        jal r1, 12              # call
+        addi r3, r0, 7
+        jal r0, 0               # halt
+        lui r2, 1
+        ret
+    """)
+    assert simulator.halted
+    assert simulator.regs[1] == 4
+    assert simulator.regs[2] == 4096
+    assert simulator.regs[3] == 7
+    assert simulator.pc == 8
+
+def test_r0_is_hardwired():
+    simulator = _run("addi r0, r0, 5\nadd r1, r0, r0")
+    assert simulator.regs[0] == 0
+    assert simulator.regs[1] == 0
+
+def test_self_modifying_store_invalidates_cache():
+    # Overwrites the 'addi r2, r0, 1' at address 12 with the word in r1 ('addi r2, r0, 9')
+    words = assemble_words("lui r1, 0\naddi r1, r0, 0\nsw r1, 12(r0)\naddi r2, r0, 1")
+    patched = assemble_words("addi r2, r0, 9")[0]
+    words[0] = assemble_words(f"lui r1, {(patched + 0x800) >> 12}")[0]
+    words[1] = assemble_words(f"addi r1, r1, {((patched & 0xFFF) ^ 0x800) - 0x800}")[0]
+    simulator = Simulator(words)
+    simulator.run()
+    assert simulator.regs[2] == 9
+
+def test_faults():
+    try:
+        _run("jalr r0, r0, 64")
+        assert False, "Expected SimulatorError"
+    except SimulatorError as e:
+        assert isinstance(e, AssemblyError)
+    try:
+        _run("lui r1, 1048575\nlw r2, 0(r1)", memory_size=4096)
+        assert False, "Expected SimulatorError"
+    except SimulatorError as e:
+        assert isinstance(e, SimulatorError)
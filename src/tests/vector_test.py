@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from benchmarks.generate import generate_program
+from src.assemble import assemble_parallel, assemble_words, encode_op
+from src.errors import InvalidArgumentError, UndefinedLabelError
+from src.ir import NONE, Program, build, layout
+from src.preprocess import preprocess
+from src.vector import encode_batch
+
+def _layout(lines: list[str]) -> tuple[Program, list[int], dict[str, int]]:
+    """Instruction rows, their addresses and the labels of a program without data."""
+    program = build(preprocess(lines))
+    addresses = layout(program)[0]
+    labels = {program.names[label]: addresses[row] for row, label in enumerate(program.labels) if label != NONE}
+    rows = [row for row, op_id in enumerate(program.ops) if op_id]
+    return program.take(rows), [addresses[row] for row in rows], labels
+
+def test_matches_scalar_encoding():
+    program = generate_program(5000, seed=1)
+    words = encode_batch(*_layout(program))
+    assert words.dtype == np.uint32
+    assert words.tolist() == assemble_words('\n'.join(program))
+
+def test_immediate_scatter():
+    # Negative S and B immediates, both li expansions in one group, labels in every relative and absolute field
+    lines = [
+        "back: sw r1, -4(r2)", "sb r3, 2047(r4)", "beq r1, r2, back", "bgeu r5, r6, fwd", "li r1, -2048",
+        "li r2, 2048", "li r3, fwd", "la r4, back", "j back", "call fwd", "fwd: jal r1, -1048576", "lw r7, -2048(r8)",
+    ]
+    program, addresses, labels = _layout(lines)
+    metadata = {'labels': labels}
+    expected = []
+    for row, metadata['address'] in enumerate(addresses):
+        expected.extend(encode_op(program.operation(row), program.operands(row), metadata))
+    assert encode_batch(program, addresses, labels).tolist() == expected
+
+def test_errors_match_scalar_encoding():
+    with pytest.raises(InvalidArgumentError, match='offset out of range: 4096'):
+        encode_batch(*_layout(["beq r1, r2, 8", "beq r1, r2, 4096"]))
+    with pytest.raises(InvalidArgumentError, match='offset is odd: 3'):
+        encode_batch(*_layout(["j 4", "j 3"]))
+    with pytest.raises(UndefinedLabelError, match='missing'):
+        encode_batch(*_layout(["j 4", "la r1, missing"]))
+
+def test_assemble_parallel_in_process():
+    program = generate_program(2000, seed=2)
+    words = []
+    assemble_parallel(program, words.extend, flush_size=500)
+    assert words == assemble_words('\n'.join(program))
@@ -0,0 +1,76 @@
+import logging
+
+import pytest
+
+import src.watch
+from src.assemble import assemble_words
+from src.errors import UndefinedLabelError
+from src.output import OutputFormat, write_output
+from src.watch import Watch, watch_files
+
+PROGRAM = ["start: addi r1, r0, 1", "li r2, 100000", "loop: beq r1, r2, end", "addi r1, r1, 1", "j loop", "end: la r3, start", ".word end"]
+
+def _check(watch: Watch, tmp_path, lines: list[str]) -> int | None:
+    (tmp_path / 'a.asm').write_text('\n'.join(lines))
+    encoded = watch.update()
+    expected = assemble_words('\n'.join(lines))
+    assert list(watch.words) == expected
+    write_output(expected, str(tmp_path / 'expected'), watch.format)
+    assert (tmp_path / 'a.out').read_bytes() == (tmp_path / 'expected').read_bytes()
+    return encoded
+
+@pytest.mark.parametrize('format', list(OutputFormat))
+def test_edits_match_full_assembly(tmp_path, format):
+    watch = Watch(str(tmp_path / 'a.asm'), str(tmp_path / 'a.out'), format)
+    lines = list(PROGRAM)
+    assert _check(watch, tmp_path, lines) == len(lines)
+    assert watch.update() is None
+
+    lines[3] = "addi r1, r1, 2"
+    assert _check(watch, tmp_path, lines) == 1
+    # One more word moves the labels after it: the branch and the jump across the edit and .word are encoded again
+    lines.insert(3, "add r4, r4, r1")
+    assert _check(watch, tmp_path, lines) == 4
+    # Everything after the nop moves by 4 bytes, only la and .word, whose values are absolute, are encoded again
+    lines.insert(0, "nop")
+    assert _check(watch, tmp_path, lines) == 3
+    del lines[-1]
+    assert _check(watch, tmp_path, lines) == 0
+    lines[-1] = "end: la r3, loop"
+    assert _check(watch, tmp_path, lines) == 1
+    assert watch.program is not None
+
+def test_full_assembly_fallback(tmp_path):
+    watch = Watch(str(tmp_path / 'a.asm'), str(tmp_path / 'a.out'), OutputFormat.HEX)
+    lines = PROGRAM + [".data", "value: .word 7"]
+    _check(watch, tmp_path, lines)
+    assert watch.program is None
+
+    # Back to one word per line once the data is gone
+    _check(watch, tmp_path, PROGRAM)
+    assert watch.program is not None
+
+    # A branch out of range is relaxed by the full assembly
+    _check(watch, tmp_path, ["beq r1, r0, far", *["nop"] * 1100, "far: nop"])
+    assert watch.program is None
+
+def test_errors_keep_last_output(tmp_path):
+    watch = Watch(str(tmp_path / 'a.asm'), str(tmp_path / 'a.out'), OutputFormat.HEX)
+    _check(watch, tmp_path, PROGRAM)
+    output = (tmp_path / 'a.out').read_bytes()
+
+    (tmp_path / 'a.asm').write_text('\n'.join(PROGRAM[1:]))
+    with pytest.raises(UndefinedLabelError):
+        watch.update()
+    assert (tmp_path / 'a.out').read_bytes() == output
+    assert _check(watch, tmp_path, ["start: nop", *PROGRAM[1:]]) is not None
+
+def test_watch_files(tmp_path, monkeypatch, caplog):
+    (tmp_path / 'a.asm').write_text("nop")
+    def interrupt(seconds: float) -> None:
+        raise KeyboardInterrupt
+    monkeypatch.setattr(src.watch.time, 'sleep', interrupt)
+    with caplog.at_level(logging.INFO):
+        assert watch_files([str(tmp_path / 'a.asm')], [str(tmp_path / 'a.hex')], OutputFormat.HEX) == 0
+    assert (tmp_path / 'a.hex').read_text() == '00000013\n'
+    assert "1 line(s) encoded" in caplog.text
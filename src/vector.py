@@ -0,0 +1,159 @@
+"""
+Batch encoder: encodes every instruction of a program at once with NumPy instead of one call per line.
+
+The columns of the parsed program (src.ir) are viewed as NumPy arrays without a copy, rows are grouped by operation
+(pseudo-instructions by operation and expansion), and the encoders of src.encoder, whose shifts and masks work as is on
+arrays, pack each group in one shot, S and B immediate bit scatters included. The words are then scattered back into
+program order. Any error falls back to encoding one row at a time, so that errors are raised for the first failing
+line, with the same message as the sequential assembler.
+"""
+import numpy as np
+
+from src.encoder import base_words, encoders
+from src.errors import AssemblyError, InvalidArgumentError, UndefinedLabelError
+from src.helpers import offset_ranges
+from src.ir import NONE, Program, encode_row, instruction_count, operation_types, operations, register_counts
+from src.pseudo import Expansion, expansions, expansions_long
+
+def _offsets(
+    values: np.ndarray,
+    is_label: np.ndarray,
+    addresses: np.ndarray,
+    opcode_type: str
+) -> np.ndarray:
+    """B or J-type offsets, labels are made relative to the addresses of the instructions."""
+    offsets = np.where(is_label, values - addresses, values)
+    low, high = offset_ranges[opcode_type]
+    if ((offsets < low) | (offsets > high) | (offsets % 2 != 0)).any():
+        raise InvalidArgumentError(f"{opcode_type}-type offset out of range")
+    return offsets
+
+def _encode_pseudo(
+    expansion: Expansion,
+    regs: list[np.ndarray],
+    imms: np.ndarray,
+    is_label: np.ndarray,
+    addresses: np.ndarray
+) -> list[np.ndarray]:
+    """Words of a group of pseudo-instructions with the same expansion, one array per expanded instruction."""
+    columns = iter(regs)
+    values = [next(columns) if kind == 'reg' else imms for kind in expansion.kinds]
+
+    words = []
+    for index, (mnemonic, opcode_type, slots) in enumerate(expansion.instructions):
+        operands = []
+        for position, (kind, value) in enumerate(slots):
+            if kind == 'const':
+                operands.append(np.full(len(addresses), value, np.int64))
+                continue
+            column = values[value]
+            if expansion.kinds[value] == 'reg':
+                operands.append(column)
+            elif kind == 'hi':
+                operands.append((column + 0x800) >> 12)
+            elif kind == 'lo':
+                operands.append(((column & 0xFFF) ^ 0x800) - 0x800)
+            elif opcode_type in offset_ranges and position == len(slots) - 1:
+                operands.append(_offsets(column, is_label, addresses + 4 * index, opcode_type))
+            else:
+                operands.append(column)
+        words.append(encoders[opcode_type](base_words[mnemonic], *operands))
+    return words
+
+def _encode_groups(
+    program: Program,
+    addresses: np.ndarray,
+    labels: dict[str, int],
+    count: int
+) -> np.ndarray:
+    base = addresses[0]
+    positions = (addresses - base) // 4
+    ops = np.frombuffer(program.ops, np.uint16)
+    regs = [np.frombuffer(column, np.uint8).astype(np.int64) for column in [program.reg1, program.reg2, program.reg3]]
+
+    # Label immediates replaced by the address of their label
+    symbols = np.frombuffer(program.symbols, np.int32)
+    is_label = symbols != NONE
+    imms = np.frombuffer(program.imms, np.int64)
+    if is_label.any():
+        values = [labels.get(name) for name in program.names]
+        if any(values[symbol] is None for symbol in np.unique(symbols[is_label]).tolist()):
+            raise UndefinedLabelError("Undefined label")
+        table = np.array([0 if value is None else value for value in values], np.int64)
+        imms = np.where(is_label, table[symbols], imms)
+
+    # Row indices grouped by operation, in program order within each group
+    order = np.argsort(ops, kind='stable')
+    starts = np.flatnonzero(np.diff(ops[order].astype(np.int64), prepend=-1))
+
+    words = np.zeros(count, np.uint32)
+    for indices in np.split(order, starts[1:]):
+        op_id = int(ops[indices[0]])
+        op, opcode_type = operations[op_id], operation_types[op_id]
+        group_positions = positions[indices]
+        group_addresses = addresses[indices]
+
+        if opcode_type == 'DIRECTIVE':
+            metadata = {'labels': labels}
+            for index, position in zip(indices.tolist(), group_positions.tolist()):
+                metadata['address'] = int(addresses[index])
+                values = encode_row(program, index, metadata)
+                words[position:position + len(values)] = values
+        elif opcode_type != 'PSEUDO':
+            values = imms[indices]
+            if opcode_type in offset_ranges:
+                values = _offsets(values, is_label[indices], group_addresses, opcode_type)
+            operands = [column[indices] for column in regs[:register_counts[opcode_type]]]
+            if opcode_type != 'R':
+                operands.append(values)
+            words[group_positions] = encoders[opcode_type](base_words[op], *operands)
+        else:
+            group_imms, group_labels = imms[indices], is_label[indices]
+            if op in expansions_long:
+                # The short expansion only for literals that fit in 12 bits, as select_expansion does
+                short = ~group_labels & (group_imms >= -2048) & (group_imms < 2048)
+                parts = [(expansions[op], short), (expansions_long[op], ~short)]
+            else:
+                parts = [(expansions[op], np.ones(len(indices), bool))]
+            for expansion, mask in parts:
+                if not mask.any():
+                    continue
+                part_words = _encode_pseudo(
+                    expansion, [column[indices[mask]] for column in regs[:2]],
+                    group_imms[mask], group_labels[mask], group_addresses[mask],
+                )
+                for index, instruction_words in enumerate(part_words):
+                    words[group_positions[mask] + index] = instruction_words
+    return words
+
+def encode_batch(
+    program: Program,
+    addresses: np.ndarray,
+    labels: dict[str, int]
+) -> np.ndarray:
+    """
+    Encodes a program of instructions whose labels and addresses are all resolved, vectorized over each operation.
+
+    :param program: consecutive instruction and .word rows, as laid out by the assembler pre-pass
+    :type program: Program
+    :param addresses: address of each row
+    :type addresses: np.ndarray
+    :param labels: label -> address, for every label the rows reference
+    :type labels: dict[str, int]
+    :return: encoded words, in program order
+    :rtype: np.ndarray
+    """
+    if not len(program):
+        return np.zeros(0, np.uint32)
+    addresses = np.asarray(addresses, np.int64)
+    count = int(addresses[-1] - addresses[0]) // 4 + instruction_count(program, len(program) - 1)
+    try:
+        return _encode_groups(program, addresses, labels, count)
+    except (AssemblyError, ValueError, OverflowError):
+        # Encode one at a time, raising the error of the first failing row
+        metadata = {'labels': labels}
+        words = []
+        for index, address in enumerate(addresses.tolist()):
+            metadata['address'] = address
+            words.extend(encode_row(program, index, metadata))
+        return np.array(words, np.uint32)
@@ -0,0 +1,314 @@
+"""
+Watch mode: assembles files again whenever they change, keeping the last assembly in memory (--watch).
+
+A Watch holds one IR row per source line (src.ir), the number of words of each line, the words and the label table.
+On a change, the lines before the first and after the last changed line are kept, only the lines in between are
+tokenized, parsed and encoded. Labels are resolved again only when the edit moves code, i.e. changes the number of
+words or the labels defined in the edited lines. Rows are then encoded again if they use a label that moved, or, for
+branches and jumps, if they moved by a different amount than their label. Every other word is kept. Outputs with one
+fixed-width record per word (list, hex and bin) are patched in place, the records after an edit that changes the number
+of words are moved as they are.
+
+Files with .include, macros, data or section directives, files that need branch relaxation and optimized builds are
+assembled in full on every change, as their lines do not map one to one to words.
+"""
+import logging
+import os
+import time
+from array import array
+from itertools import accumulate
+
+from src.assemble import assemble_stream
+from src.constants import symbol_directives
+from src.errors import AssemblyError, DuplicateLabelError
+from src.helpers import offset_ranges
+from src.ir import NONE, Program, encode_row, instruction_count, operation_ids, operation_types, operations
+from src.output import OutputFormat, to_bytes, to_list, to_readmemh, write_output
+from src.preprocess import tokenize_line
+from src.pseudo import expansions
+
+logger = logging.getLogger(__name__)
+
+# Output format -> bytes per word, for formats with one fixed-width record per word
+_record_sizes = {OutputFormat.BIN: 4, OutputFormat.HEX: 9, OutputFormat.LIST: 33}
+
+_WORD = operation_ids['.word']
+
+# Operations whose label operand is encoded relative to the instruction
+_relative_ops = {
+    op_id for op_id, op in enumerate(operations)
+    if operation_types[op_id] in offset_ranges
+    or op in expansions and any(opcode_type in offset_ranges for _, opcode_type, _ in expansions[op].instructions)
+}
+_line_directives = {_WORD, *(operation_ids[op] for op in symbol_directives)}
+
+class Watch:
+    """A file assembled in memory, updated line by line as it changes."""
+
+    def __init__(
+        self,
+        file_name: str,
+        output_file_name: str,
+        format: OutputFormat = OutputFormat.LIST,
+        include_path: list[str] | None = None,
+        optimize: bool = False
+    ) -> None:
+        self.file_name = file_name
+        self.output_file_name = output_file_name
+        self.format = format
+        self.include_path = [os.path.dirname(file_name) or '.', *(include_path or [])]
+        self.optimize = optimize
+        self.lines = None       # source lines of the last assembly
+        self.program = None     # one row per source line, None when the file is assembled in full
+        self.counts = array('I')    # words of each line
+        self.words = array('I')
+        self.labels = {}
+
+    def update(self) -> int | None:
+        """
+        Assembles the file again if it changed since the last update, and rewrites the output.
+
+        :return: number of lines encoded, None if the file did not change
+        :rtype: int | None
+        """
+        with open(self.file_name) as file:
+            lines = file.read().splitlines()
+        if lines == self.lines:
+            return None
+
+        if self.program is not None:
+            try:
+                return self._patch(lines)
+            except AssemblyError:
+                # Assembled in full, which relaxes branches or raises the error
+                pass
+        return self._assemble(lines)
+
+    def _parse(
+        self,
+        program: Program,
+        lines: list[str],
+        first: int
+    ) -> list[tuple]:
+        """Rows of lines, for line numbers from first + 1; raises AssemblyError for lines that need preprocessing."""
+        rows = [program.parse(first + number, tokenize_line(line)) for number, line in enumerate(lines, 1)]
+        for row in rows:
+            if operation_types[row[0]] == 'DIRECTIVE' and row[0] not in _line_directives:
+                raise AssemblyError("Directive needs a full assembly")
+        return rows
+
+    def _count(
+        self,
+        program: Program,
+        row: int
+    ) -> int:
+        op_id = program.ops[row]
+        if op_id == 0 or op_id in _line_directives and op_id != _WORD:
+            return 0
+        return instruction_count(program, row)
+
+    def _assemble(
+        self,
+        lines: list[str]
+    ) -> int:
+        """Assembles every line, keeping the rows to patch later when lines map to words one to one."""
+        self.program = None
+        try:
+            if self.optimize:
+                raise AssemblyError("Optimized builds are assembled in full")
+            program = Program()
+            program.extend(self._parse(program, lines, 0))
+            counts = array('I', [self._count(program, row) for row in range(len(program))])
+            starts = list(accumulate(counts, initial=0))
+            labels = _labels(program, starts)
+            metadata = {'labels': labels}
+            words = array('I')
+            for row, count in enumerate(counts):
+                if count:
+                    metadata['address'] = 4 * starts[row]
+                    words.extend(encode_row(program, row, metadata))
+        except AssemblyError:
+            words = array('I')
+            assemble_stream(lines, words.extend, include_path=self.include_path, optimize=self.optimize)
+        else:
+            self.program, self.counts, self.labels = program, counts, labels
+
+        self.lines, self.words = lines, words
+        self._write(None)
+        return len(lines)
+
+    def _patch(
+        self,
+        lines: list[str]
+    ) -> int:
+        """Encodes the changed lines again, and the lines whose labels moved."""
+        old = self.lines
+        limit = min(len(old), len(lines))
+        start = next((index for index in range(limit) if old[index] != lines[index]), limit)
+        suffix = next((index for index in range(limit - start) if old[-1 - index] != lines[-1 - index]), limit - start)
+        old_stop, stop = len(old) - suffix, len(lines) - suffix
+
+        program = self.program.replace(start, old_stop, self._parse(self.program, lines[start:stop], start))
+        if len(lines) != len(old):
+            program.lines = array('I', range(1, len(lines) + 1))
+        counts = self.counts[:start] + array('I', [self._count(program, row) for row in range(start, stop)]) + self.counts[old_stop:]
+        starts = list(accumulate(counts, initial=0))
+        delta = starts[stop] - starts[start] - sum(self.counts[start:old_stop])
+
+        # Labels defined in the edited lines, as (name, word offset from the start of the edit)
+        old_offsets = accumulate(self.counts[start:old_stop], initial=0)
+        old_defined = [(self.program.names[label], offset) for label, offset in zip(self.program.labels[start:old_stop], old_offsets) if label != NONE]
+        defined = [(program.names[label], starts[row] - starts[start]) for row, label in enumerate(program.labels[start:stop], start) if label != NONE]
+
+        rows = list(range(start, stop))
+        labels = self.labels
+        if delta or defined != old_defined:
+            labels = _labels(program, starts)
+            # Label -> bytes it moved by, None if it was added or removed
+            shifts = {
+                name: None if name not in labels or name not in self.labels else labels[name] - self.labels[name]
+                for name in labels.keys() | self.labels.keys()
+            }
+            for row, (op_id, symbol) in enumerate(zip(program.ops, program.symbols)):
+                if start <= row < stop or symbol == NONE and op_id != _WORD:
+                    continue
+                if op_id == _WORD:
+                    rows.append(row)
+                    continue
+                shift = shifts.get(program.names[symbol], 0)
+                # Offsets from the row only change if the row and its label moved by different amounts
+                if op_id in _relative_ops and shift != (4 * delta if row >= stop else 0) or op_id not in _relative_ops and shift != 0:
+                    rows.append(row)
+
+        words = self.words[:starts[start]] + array('I', [0]) * (starts[stop] - starts[start]) + self.words[starts[stop] - delta:]
+        changed = []
+        metadata = {'labels': labels}
+        for row in rows:
+            if counts[row]:
+                metadata['address'] = 4 * starts[row]
+                words[starts[row]:starts[row + 1]] = array('I', encode_row(program, row, metadata))
+                changed.append((starts[row], starts[row + 1]))
+
+        moved = None
+        if delta:
+            # The records after the edit are moved as they are
+            moved = (starts[stop] - delta, starts[stop])
+            if delta > 0 and self.format == OutputFormat.LIST and self.words:
+                # The old last line gets a newline
+                changed.append((len(self.words) - 1, len(self.words)))
+
+        self.lines, self.program, self.counts, self.words, self.labels = lines, program, counts, words, labels
+        self._write(changed, moved)
+        return len(rows)
+
+    def _write(
+        self,
+        changed: list[tuple[int, int]] | None,
+        moved: tuple[int, int] | None = None
+    ) -> None:
+        """
+        Writes the output, only the changed records if it has one fixed-width record per word.
+
+        :param changed: ranges of words to write, None to rewrite the whole output
+        :type changed: list[tuple[int, int]] | None
+        :param moved: (old index, new index) of the first word of the records after an edit that changed the number of words
+        :type moved: tuple[int, int] | None
+        """
+        size = _record_sizes.get(self.format)
+        if changed is None or size is None or not os.path.exists(self.output_file_name):
+            write_output(self.words, self.output_file_name, self.format)
+            return
+
+        count = len(self.words)
+        with open(self.output_file_name, 'r+b') as file:
+            if moved is not None:
+                file.seek(size * moved[0])
+                tail = file.read()
+                file.seek(size * moved[1])
+                file.write(tail)
+            for start, stop in changed:
+                file.seek(size * start)
+                file.write(_records(self.words[start:stop], self.format, stop == count))
+            # List lines are separated, not terminated, by newlines
+            file.truncate(max(0, size * count - (self.format == OutputFormat.LIST)))
+
+def _labels(
+    program: Program,
+    starts: list[int]
+) -> dict[str, int]:
+    """Label -> address, starts being the first word of each row."""
+    labels = {}
+    for row, label in enumerate(program.labels):
+        if label != NONE:
+            name = program.names[label]
+            if name in labels:
+                raise DuplicateLabelError(f"Label defined more than once: {name}")
+            labels[name] = 4 * starts[row]
+    return labels
+
+def _records(
+    words: array,
+    format: OutputFormat,
+    last: bool
+) -> bytes:
+    """Output records of consecutive words, last if they end the output."""
+    if format == OutputFormat.BIN:
+        return bytes(to_bytes(words))
+    if format == OutputFormat.HEX:
+        return to_readmemh(words).encode()
+    return (to_list(words) + ('' if last or not words else '\n')).encode()
+
+def watch_files(
+    file_names: list[str],
+    output_file_names: list[str],
+    format: OutputFormat = OutputFormat.LIST,
+    include_path: list[str] | None = None,
+    optimize: bool = False,
+    interval: float = 0.2
+) -> int:
+    """
+    Assembles files, then again each time one is saved, until interrupted.
+
+    Errors are logged and the last output is kept, so that a file can be fixed and saved again.
+
+    :param file_names: '.asm' file paths
+    :type file_names: list[str]
+    :param output_file_names: output file path of each file
+    :type output_file_names: list[str]
+    :param format: output format
+    :type format: OutputFormat
+    :param include_path: directories searched for included files, after the directory of each file
+    :type include_path: list[str] | None
+    :param optimize: remove redundant instructions, see src.peephole
+    :type optimize: bool
+    :param interval: seconds between checks for changes
+    :type interval: float
+    :return: exit code, 0 once interrupted
+    :rtype: int
+    """
+    watches = [Watch(file_name, output_file_name, format, include_path, optimize) for file_name, output_file_name in zip(file_names, output_file_names)]
+    mtimes = [None] * len(watches)
+    logger.info(f"Watching {len(watches)} file(s) for changes, press Ctrl+C to stop")
+    try:
+        while True:
+            for index, watch in enumerate(watches):
+                try:
+                    mtime = os.stat(watch.file_name).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                if mtime == mtimes[index]:
+                    continue
+                mtimes[index] = mtime
+
+                start = time.perf_counter()
+                try:
+                    encoded = watch.update()
+                except AssemblyError as ae:
+                    logger.error(f"{watch.file_name}: Assembly error: {ae}")
+                    continue
+                if encoded is not None:
+                    elapsed = 1000 * (time.perf_counter() - start)
+                    logger.info(f"{watch.file_name}: {encoded} line(s) encoded in {elapsed:.1f} ms, written to {watch.output_file_name}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        return 0